@@ -18,9 +18,10 @@ def get_config_value(config_name, config_key=None, force_refresh=False):
 	PARAMETERS: config_name (REQ, str) - the name of the config file to be retrieved,
 									unincluding extension.
 				config_key (REQ, str) - the key to retrieve from the config file
-									(if omitted, the entire thresholds file is returned)
+									(if omitted, the entire thresholds file is returned).
+									A list of keys reads all of them in a single pass.
 				force_refresh (OPT, bool) - force a refresh of the config file
-	RETURNS: String - the value of the key in the config file
+	RETURNS: String - the value of the key in the config file, or a dict of values by key for a list of keys
 	"""
 
 	file_path = '%s/%s.json' % (CONFIG_SOURCE_DIRECTORY, config_name)
@@ -30,4 +31,7 @@ def get_config_value(config_name, config_key=None, force_refresh=False):
 	if config_key is None:
 		return config
 
+	if isinstance(config_key, (list, tuple)):
+		return General.Utilities.read_json_paths(config, config_key)
+
 	return General.Utilities.read_json_path(config, config_key)
@@ -7,68 +7,428 @@ This module should not have any dependencies on any other Ignition modules.
 """
 import re
 import collections
+from itertools import izip
+from java.lang import Object as JavaObject
 from java.util import Date as JavaDate
 
 LOGGER = system.util.getLogger("General.Conversion")
 
 
-def convert_dataset_to_list(dataset, date_to_millis=False):
+class DatasetRow(object):
+	"""
+	DESCRIPTION: A read-only row of a DatasetView. Values are read from the dataset when they are accessed,
+				 using the column indexes shared by every row of the view.
+	"""
+	__slots__ = ("view", "row")
+
+	def __init__(self, view, row):
+		self.view = view
+		self.row = row
+
+	def __getitem__(self, column_name):
+		return self.view.get_value(self.row, self.view.column_indexes[column_name])
+
+	def get(self, column_name, default=None):
+		"""
+		DESCRIPTION: Returns the value of a column, or a default if the dataset does not have the column
+		PARAMETERS: column_name (REQ, str): The name of the column
+					default (OPT, obj): The value to return if the column does not exist
+		RETURNS: obj: The value
+		"""
+		column = self.view.column_indexes.get(column_name)
+		if column is None:
+			return default
+		return self.view.get_value(self.row, column)
+
+	def keys(self):
+		"""
+		DESCRIPTION: Returns the column names of the row
+		RETURNS: list (list): The column names, in column order
+		"""
+		return list(self.view.column_names)
+
+	def values(self):
+		"""
+		DESCRIPTION: Returns the values of the row
+		RETURNS: list (list): The values, in column order
+		"""
+		return [self.view.get_value(self.row, column) for column in range(len(self.view.column_names))]
+
+	def items(self):
+		"""
+		DESCRIPTION: Returns the column names and values of the row
+		RETURNS: list (list): A (column name, value) tuple per column
+		"""
+		return zip(self.view.column_names, self.values())
+
+	def to_dict(self):
+		"""
+		DESCRIPTION: Copies the row into a dictionary, for callers that need to serialize or change it
+		RETURNS: dict (dict): The values of the row by column name
+		"""
+		return dict(self.items())
+
+	def __contains__(self, column_name):
+		return column_name in self.view.column_indexes
+
+	def __iter__(self):
+		return iter(self.view.column_names)
+
+	def __len__(self):
+		return len(self.view.column_names)
+
+	def __repr__(self):
+		return "DatasetRow(%d, %r)" % (self.row, self.to_dict())
+
+#NOTE: Lets isinstance checks for collections.Mapping accept rows, like the other dictionary-like objects
+collections.Mapping.register(DatasetRow)
+
+
+class DatasetBuilder(object):
+	"""
+	DESCRIPTION: Builds a dataset from rows added one at a time, so the rows do not have to be collected into a list
+				 first. Column types are inferred from the first schema_rows rows, and then locked, so later rows are
+				 converted as they are added. A value that can not be converted to its locked column type raises a
+				 ValueError. Use iter_chunks to build a dataset every chunk_size rows instead of holding every row.
+	"""
+	def __init__(self, column_names=None, headers=None, column_types=None, schema_rows=100, titalize_headers=False):
+		self.column_names = column_names
+		self.headers = headers
+		self.column_types = dict(column_types or {})
+		self.schema_rows = schema_rows
+		self.titalize_headers = titalize_headers
+		self.column_value_types = None
+		self.schema = None
+		self.rows = []
+		self.row_count = 0
+
+	def set_columns(self, row):
+		"""
+		DESCRIPTION: Takes the column names from the first row, if they were not given
+		PARAMETERS: row (REQ, dict): The first row
+		"""
+		if self.column_names is None:
+			self.column_names = sorted(row.keys())
+		#NOTE: Headers that were given are used as they are, only headers taken from the column names are titalized
+		if self.headers is None:
+			self.headers = [name.title() for name in self.column_names] if self.titalize_headers else self.column_names
+		self.column_value_types = [set() for _ in self.column_names]
+
+	def lock_schema(self):
+		"""
+		DESCRIPTION: Fixes the type of each column from the rows added so far, and converts those rows to it
+		RETURNS: list (list): The column type and whether mixed types are kept, per column, or None if there are no
+							  columns to lock yet
+		"""
+		if self.schema is not None:
+			return self.schema
+		if self.column_value_types is None:
+			#NOTE: Without a row or column names there is nothing to infer the schema from
+			if self.column_names is None:
+				return None
+			self.set_columns({})
+
+		self.schema = []
+		for position, column in enumerate(self.column_names):
+			if column in self.column_types:
+				self.schema.append((self.column_types[column], False))
+			else:
+				self.schema.append(infer_column_type(self.column_value_types[position]))
+		first_row_index = self.row_count - len(self.rows)
+		self.rows = [self.convert_row(row, first_row_index + offset) for offset, row in enumerate(self.rows)]
+		return self.schema
+
+	def convert_row(self, values, row_index):
+		"""
+		DESCRIPTION: Converts each value of a row to the locked type of its column
+		PARAMETERS: values (REQ, list): The values of the row, in column order
+					row_index (REQ, int): The position of the row among every row added, for errors
+		RETURNS: list (list): The converted values
+		"""
+		converted = []
+		for position, (value, (target_type, allow_mixed)) in enumerate(izip(values, self.schema)):
+			converted_value = type_conversion(value, target_type, allow_mixed=allow_mixed)
+			if converted_value is None and value is not None:
+				raise ValueError("Row %d: value %r of column %s can not be converted to %s"
+									% (row_index, value, self.column_names[position], target_type.__name__))
+			converted.append(converted_value)
+		return converted
+
+	def append(self, row):
+		"""
+		DESCRIPTION: Adds a row to the dataset
+		PARAMETERS: row (REQ, dict): The values of the row by column name, styled values are unwrapped
+		RETURNS: DatasetBuilder: The builder, so calls can be chained
+		"""
+		if self.column_value_types is None:
+			self.set_columns(row)
+
+		values = []
+		for column in self.column_names:
+			value = row.get(column)
+			#NOTE: Handle styled values
+			if hasattr(value, "get"):
+				value = value.get("value")
+			values.append(value)
+
+		self.row_count += 1
+		if self.schema is not None:
+			self.rows.append(self.convert_row(values, self.row_count - 1))
+			return self
+
+		for position, value in enumerate(values):
+			if value is not None:
+				self.column_value_types[position].add(type(value))
+		self.rows.append(values)
+		if self.row_count >= self.schema_rows:
+			self.lock_schema()
+		return self
+
+	def extend(self, rows):
+		"""
+		DESCRIPTION: Adds every row from a list or iterator
+		PARAMETERS: rows (REQ, iterable): The rows to add, see append
+		RETURNS: DatasetBuilder: The builder, so calls can be chained
+		"""
+		for row in rows:
+			self.append(row)
+		return self
+
+	def build(self):
+		"""
+		DESCRIPTION: Builds a dataset from the rows added since the last build, locking the schema if needed.
+					 Before any row is added the dataset is empty, and the schema is left to be inferred from the
+					 rows added later.
+		RETURNS: Dataset: The dataset
+		"""
+		if not self.row_count:
+			if self.column_value_types is None and self.column_names is not None:
+				self.set_columns({})
+			return system.dataset.toDataSet(list(self.headers or []), [])
+		self.lock_schema()
+		rows, self.rows = self.rows, []
+		return system.dataset.toDataSet(self.headers, rows)
+
+	def iter_chunks(self, rows, chunk_size=1000):
+		"""
+		DESCRIPTION: Adds rows from a list or iterator, building a dataset every chunk_size rows.
+					 Every chunk has the same columns and types, so they can be written out one at a time.
+		PARAMETERS: rows (REQ, iterable): The rows to add, see append
+					chunk_size (OPT, int): The number of rows in each dataset
+		RETURNS: generator: The datasets, with the last one holding the rows that are left over
+		"""
+		for row in rows:
+			self.append(row)
+			if len(self.rows) >= chunk_size:
+				yield self.build()
+		if self.rows:
+			yield self.build()
+
+
+class DatasetView(object):
+	"""
+	DESCRIPTION: A read-only sequence of rows over a dataset, for callers that only read a few rows or loop over
+				 them once. Nothing is copied out of the dataset until a value is read.
+	"""
+	def __init__(self, dataset, date_to_millis=False):
+		self.dataset = dataset
+		self.date_to_millis = date_to_millis
+		self.column_names = list(dataset.getColumnNames())
+		self.column_indexes = dict((name, column) for column, name in enumerate(self.column_names))
+		self.row_count = dataset.getRowCount()
+
+	def get_value(self, row, column):
+		"""
+		DESCRIPTION: Reads a single value from the dataset
+		PARAMETERS: row (REQ, int): The index of the row
+					column (REQ, int): The index of the column
+		RETURNS: obj: The value, with dates in milliseconds if the view was created with date_to_millis
+		"""
+		value = self.dataset.getValueAt(row, column)
+		if self.date_to_millis and isinstance(value, JavaDate):
+			return value.getTime()
+		return value
+
+	def __getitem__(self, index):
+		if isinstance(index, slice):
+			return [DatasetRow(self, row) for row in range(*index.indices(self.row_count))]
+		if index < 0:
+			index += self.row_count
+		if not 0 <= index < self.row_count:
+			raise IndexError("Row %s is out of range for a dataset with %d rows" % (index, self.row_count))
+		return DatasetRow(self, index)
+
+	def __iter__(self):
+		for row in range(self.row_count):
+			yield DatasetRow(self, row)
+
+	def __len__(self):
+		return self.row_count
+
+	def to_list(self):
+		"""
+		DESCRIPTION: Copies every row into a list of dictionaries, see convert_dataset_to_list
+		RETURNS: list (list): The rows as dictionaries
+		"""
+		return convert_dataset_to_list(self.dataset, self.date_to_millis)
+
+	def __repr__(self):
+		return "DatasetView(%d rows, columns=%s)" % (self.row_count, self.column_names)
+
+
+def get_column_values(dataset, column, date_to_millis=False):
+	"""
+	DESCRIPTION: Reads every value of a dataset column in one call
+	PARAMETERS: dataset (REQ, dataset): The dataset to read from
+				column (REQ, int): The index of the column
+				date_to_millis (OPT, bool): True if dates should be converted to milliseconds
+	RETURNS: list (list): The values of the column, in row order
+	"""
+	try:
+		values = list(dataset.getColumnAsList(column))
+	except AttributeError:
+		#NOTE: Datasets that do not have getColumnAsList are read one cell at a time
+		values = [dataset.getValueAt(row, column) for row in range(dataset.getRowCount())]
+
+	if not date_to_millis:
+		return values
+
+	#NOTE: Only date columns and untyped columns can hold dates, so other columns are returned as they are
+	column_type = dataset.getColumnType(column)
+	if issubclass(column_type, JavaDate):
+		return [value.getTime() if value is not None else None for value in values]
+	if column_type is JavaObject:
+		return [value.getTime() if isinstance(value, JavaDate) else value for value in values]
+	return values
+
+
+def convert_dataset_to_view(dataset, date_to_millis=False):
+	"""
+	DESCRIPTION: This function wraps a dataset in a lazy, read-only sequence of rows, instead of copying it
+	PARAMETERS: dataset (REQ, dataset): The dataset to be wrapped
+				date_to_millis (OPT, bool): True if the date should be converted to milliseconds
+	RETURNS: DatasetView (DatasetView): The rows of the dataset, which can be indexed like a list of dictionaries
+	"""
+	LOGGER.trace("convert_dataset_to_view(dataset=%s)" % (dataset))
+
+	if not hasattr(dataset, "getColumnNames"):
+		return dataset
+
+	return DatasetView(dataset, date_to_millis)
+
+
+def convert_dataset_to_columns(dataset, date_to_millis=False):
+	"""
+	DESCRIPTION: This function converts a dataset to a dictionary of columns, which is smaller and faster to build
+				 than a list of dictionaries
+	PARAMETERS: dataset (REQ, dataset): The dataset to be converted
+				date_to_millis (OPT, bool): True if the date should be converted to milliseconds
+	RETURNS: dict (dict): The values of each column in row order, by column name
+	"""
+	LOGGER.trace("convert_dataset_to_columns(dataset=%s)" % (dataset))
+
+	if not hasattr(dataset, "getColumnNames"):
+		return dataset
+
+	column_names = list(dataset.getColumnNames())
+	return dict((column_names[column], get_column_values(dataset, column, date_to_millis))
+				for column in range(len(column_names)))
+
+
+def convert_dataset_to_list(dataset, date_to_millis=False, columnar=False):
 	"""
 	DESCRIPTION: This function converts a dataset to a list of dictionaries 
 	PARAMETERS: dataset (REQ, dataset): The dataset to be converted to a list of dictionaries
 				date_to_millis (OPT, bool): True if the date should be converted to milliseconds
+				columnar (OPT, bool): True to return a dictionary of columns instead, see convert_dataset_to_columns
 	"""
 	LOGGER.trace("convert_dataset_to_list(dataset=%s)" % (dataset))
 
 	if not hasattr(dataset, "getColumnNames"):
 		return dataset
 
-	column_names = dataset.getColumnNames()
+	if columnar:
+		return convert_dataset_to_columns(dataset, date_to_millis)
 
-	data = []
+	#NOTE: Each column is read in one call, then the columns are zipped into rows
+	column_names = list(dataset.getColumnNames())
+	columns = [get_column_values(dataset, column, date_to_millis) for column in range(len(column_names))]
+	if not columns:
+		return [{} for _ in range(dataset.getRowCount())]
+	return [dict(izip(column_names, row)) for row in izip(*columns)]
 
-	for row in range(dataset.getRowCount()):
-		row_data = {}
-		for column in range(dataset.getColumnCount()):
-			value = dataset.getValueAt(row, column)
-			if date_to_millis and value and isinstance(value, JavaDate):
-				value = system.date.toMillis(value)
 
-			row_data[column_names[column]] = value
-		data.append(row_data)
-	return data
+def type_conversion(value, target_type, allow_mixed=False):
+	"""
+	DESCRIPTION: This function converts a value to the type of its dataset column
+	PARAMETERS: value (REQ, obj): The value to be converted
+				target_type (REQ, type): The type of the column
+				allow_mixed (OPT, bool): True to keep values that can not be converted, instead of replacing them with None
+	RETURNS: obj: The converted value
+	"""
+	if value is None:
+		return None
+	#NOTE: If the value is already the target type, return it
+	if isinstance(value, target_type):
+		return value
+	#NOTE: Attempt to convert the value to the target type
+	try:
+		return target_type(value)
+	except (ValueError, TypeError):
+		#NOTE: Return original value if mixed types are allowed, otherwise None
+		return value if allow_mixed else None
+
+
+def infer_column_type(types):
+	"""
+	DESCRIPTION: Picks the dataset column type for the types of values found in a column
+	PARAMETERS: types (REQ, set): The types of the values in the column, excluding None
+	RETURNS: tuple (tuple): The column type, and True if the column has mixed types and is stored as strings
+	"""
+	if float in types:
+		return float, False
+	#NOTE: If we have mixed types, default to string
+	if len(types) > 1:
+		return str, True
+	return (list(types)[0] if types else str), False
 
 
-def convert_list_to_dataset(list_var, titalize_headers=False, column_order=None, headers_list=None):
+def convert_sampled_column(values, sampled_types):
+	"""
+	DESCRIPTION: Converts the values of a column whose type was inferred from a sample of its rows. If a value has a
+				 type the sample missed, the type is inferred again from every value, so the column is widened the
+				 same way it would have been without sampling, instead of the value being lost.
+	PARAMETERS: values (REQ, list): The values of the column
+				sampled_types (REQ, set): The types of the values found in the sample, excluding None
+	RETURNS: list (list): The converted values
+	"""
+	target_type, allow_mixed = infer_column_type(sampled_types)
+	converted = []
+	for value in values:
+		value_type = type(value)
+		if value is not None and value_type not in sampled_types:
+			types = set(type(item) for item in values if item is not None)
+			target_type, allow_mixed = infer_column_type(types)
+			return [type_conversion(item, target_type, allow_mixed=allow_mixed) for item in values]
+		converted.append(type_conversion(value, target_type, allow_mixed=allow_mixed))
+	return converted
+
+
+def convert_list_to_dataset(list_var, titalize_headers=False, column_order=None, headers_list=None,
+							column_types=None, sample_size=None):
 	"""
 	DESCRIPTION: This function converts list of dictionaries to a dataset
 	PARAMETERS: list_var (REQ, list): The list of dictionaries to be converted
 				titalize_headers (OPT, bool): True in the case of the ability to get the names of the header in list_var
 				column_order (OPT, list): List of columns to include and their order in the resulting dataset
 				headers_list (OPT, list): List of headers to use instead of keys from list_var
+				column_types (OPT, dict): The type of specific columns by column name, which skips inferring them
+				sample_size (OPT, int): If set, column types are inferred from this many rows spread across the list
+										instead of every row. A column with a value of a type the sample missed is
+										inferred from every row instead, so the value is not lost.
 	RETURN: Compiled dataset from the list of dictionaries
 	"""
 
-	def type_conversion(value, target_type, allow_mixed=False):
-		"""
-		DESCRIPTION: This function converts list of dictionaries to a dataset
-		PARAMETERS: list_var (REQ, list): The list of dictionaries to be converted
-					titalize_headers (OPT, bool): True in the case of the ability to get the names of the header in list_var
-					column_order (OPT, list): List of columns to include and their order in the resulting dataset
-					headers_list (OPT, list): List of headers to use instead of keys from list_var
-		"""
-		if value is None:
-			return None
-		#NOTE: If the value is already the target type, return it
-		if isinstance(value, target_type):
-			return value
-		#NOTE: Attempt to convert the value to the target type
-		try:
-			return target_type(value)
-		except (ValueError, TypeError):
-			#NOTE: Return original value if mixed types are allowed, otherwise None
-			return value if allow_mixed else None
-
 	if not isinstance(list_var, collections.Iterable) or not list_var:
 		return list_var
 
@@ -82,36 +442,48 @@ def convert_list_to_dataset(list_var, titalize_headers=False, column_order=None,
 	if titalize_headers:
 		headers = [name.title() for name in column_names]
 
-	#NOTE: Determine types for each column
-	key_type_map = {}
-	key_mixed_types = {}
-	for key in column_names:
-		types = {type(row.get(key)) for row in list_var if row.get(key) is not None}
-		if float in types:
-			types = {float}
-
-		#NOTE: Check if we have mixed types (excluding None)
-		key_mixed_types[key] = len(types) > 1
-
-		#NOTE: If we have mixed types, default to string
-		if key_mixed_types[key]:
-			key_type_map[key] = str
-		else:
-			key_type_map[key] = list(types)[0] if types else str
+	column_types = column_types or {}
+	inferred_columns = [position for position, column in enumerate(column_names) if column not in column_types]
+	sample_step = max(len(list_var) // sample_size, 1) if sample_size else 1
+	sample_end = sample_step * sample_size if sample_size else len(list_var)
 
-	data = []
-	for row in list_var:
-		row_data = []
-		for column in column_names:
+	#NOTE: Read each value and collect the types of each column in a single pass over the rows
+	columns = [[] for _ in column_names]
+	column_value_types = [set() for _ in column_names]
+	for index, row in enumerate(list_var):
+		for position, column in enumerate(column_names):
 			value = row.get(column)
 			#NOTE: Handle styled values
 			if hasattr(value, "get"):
 				value = value.get("value")
+			columns[position].append(value)
 
-			#NOTE: Use allow_mixed=True for columns with mixed types
-			row_data.append(type_conversion(value, key_type_map[column], allow_mixed=key_mixed_types[column]))
+		if index < sample_end and index % sample_step == 0:
+			for position in inferred_columns:
+				value = columns[position][index]
+				if value is not None:
+					column_value_types[position].add(type(value))
 
-		data.append(row_data)
+	for position, column in enumerate(column_names):
+		if column in column_types:
+			target_type, allow_mixed = column_types[column], False
+		else:
+			target_type, allow_mixed = infer_column_type(column_value_types[position])
+			#NOTE: A column that only holds values of its type does not need converting
+			if sample_size is None and not allow_mixed and column_value_types[position] <= set([target_type]):
+				continue
+			if sample_size is not None:
+				columns[position] = convert_sampled_column(columns[position], column_value_types[position])
+				continue
+
+		#NOTE: Use allow_mixed=True for columns with mixed types
+		columns[position] = [type_conversion(value, target_type, allow_mixed=allow_mixed)
+								for value in columns[position]]
+
+	if columns:
+		data = [list(row) for row in izip(*columns)]
+	else:
+		data = [[] for _ in list_var]
 
 	return system.dataset.toDataSet(headers, data)
 
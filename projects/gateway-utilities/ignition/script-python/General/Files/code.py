@@ -28,14 +28,10 @@ def handleMessage(payload):
 								{'func':'myScript.myFunction', 'kwargs':{'myParam1':123,'myParam2':456}}),
 	'''
 
-	if payload.get('func') is None:
-		raise TypeError('executeInGatewayScope expects a payload object named func')
+	return General.Utilities.receive_execute_on_gateway_message(payload)
 
-	func_reference = eval(payload['func'])
-	args = payload.get('args', [])
-	kwargs = payload.get('kwargs', {})
-
-	return func_reference(*args, **kwargs)
+General.Utilities.receive_execute_on_gateway_message resolves each function path once and caches it,
+and can limit which functions may be called with General.Utilities.set_gateway_function_allowlist.
 
 """
 import csv
@@ -4,21 +4,88 @@ General.Multithreading
 This module contains functions for multithreading in Ignition.
 """
 
+import bisect
+import collections
+import random
+import threading
 import traceback
 from ast import literal_eval
 from java.lang import Thread
 from java.lang import Runnable
+from java.lang import Runtime
+from java.lang import InterruptedException
+from java.lang import Integer
+from java.lang import System
 from java.lang import Exception as JavaException
+from java.lang import Math
 from java.util.concurrent import Executors
 from java.util.concurrent import ThreadFactory
+from java.util.concurrent import ThreadPoolExecutor
+from java.util.concurrent import LinkedBlockingQueue
+from java.util.concurrent import ArrayBlockingQueue
 from java.util.concurrent import TimeUnit
 from java.util.concurrent import ConcurrentHashMap
+from java.util.concurrent.atomic import AtomicInteger
+from java.util.concurrent.atomic import AtomicLong
+from java.util.concurrent.atomic import AtomicLongArray
+from java.util.concurrent import ExecutionException
+from java.util.concurrent import ExecutorCompletionService
+from java.util.concurrent import CancellationException
+from java.util.concurrent import FutureTask
+from java.util.concurrent import ScheduledThreadPoolExecutor
+from java.util.concurrent import Semaphore
+from java.util.concurrent import RejectedExecutionException
+from java.util.concurrent import ForkJoinPool
+from java.util.concurrent import ForkJoinTask
+from java.util.concurrent import RecursiveTask
+from java.util.concurrent import TimeoutException
 
 from com.inductiveautomation.ignition.common.script import ScriptContext
 from com.inductiveautomation.ignition.common.execution import TPC
 
 LOGGER = system.util.getLogger("General.Multithreading")
 MULTITHREADING_SYSTEM_NAME = "Multithreading"
+IGNITION_GLOBALS = system.util.getGlobals()
+# NOTE: Project scripts are initialized again whenever the project is saved, but the globals survive. Each
+# NOTE: initialization gets a higher generation, and the registries in the globals remember the generation that
+# NOTE: created them, so the pools of older code are retired the first time newer code uses them, see _get_registry
+SCRIPT_GENERATION_KEY = "multithreading-generation-%s" % system.util.getProjectName()
+SCRIPT_GENERATION = IGNITION_GLOBALS.setdefault(SCRIPT_GENERATION_KEY, AtomicLong()).incrementAndGet()
+REGISTRY_LOCK = threading.Lock()
+# NOTE: This key is the key inside the globals that the shared executor pools are stored in.
+# NOTE: The globals are shared by every project on the gateway, so the key is scoped to this project
+EXECUTOR_POOLS_KEY = "multithreading-executor-pools-%s" % system.util.getProjectName()
+DEFAULT_POOL_NAME = "default"
+DEFAULT_POOL_THREADS = Runtime.getRuntime().availableProcessors() * 2
+POOL_KEEP_ALIVE_SECONDS = 60
+# NOTE: Auto-tuned chunking aims for this many chunks per thread, so a slow chunk does not leave the others idle
+CHUNKS_PER_THREAD = 4
+# NOTE: The name of the pool that cancels tasks which run past their own deadline
+DEADLINE_POOL_NAME = "task-deadlines"
+# NOTE: The name and size of the pool that runs periodic jobs
+SCHEDULER_POOL_NAME = "scheduled-jobs"
+SCHEDULER_THREADS = 4
+# NOTE: The name of the work-stealing pool for recursive tasks, see run_fork_join
+FORK_JOIN_POOL_NAME = "fork-join"
+FORK_JOIN_THREADS = Runtime.getRuntime().availableProcessors()
+# NOTE: Task metrics are recorded under this pool name for tasks that run on a pool created just for their call
+PER_CALL_POOL_NAME = "per-call"
+TASK_METRICS_KEY = "multithreading-task-metrics-%s" % system.util.getProjectName()
+# NOTE: The most pool and function pairs metrics are kept for, the oldest are dropped past this
+MAX_TASK_METRICS = 500
+METRICS_LOCK = threading.Lock()
+# NOTE: The upper bounds of the task latency histogram buckets, anything slower goes in a final overflow bucket
+LATENCY_BUCKETS_MILLIS = [1, 5, 10, 50, 100, 500, 1000, 5000, 10000, 60000]
+# NOTE: The default number of items each pipeline stage may have waiting before the stage feeding it blocks
+PIPELINE_QUEUE_SIZE = 100
+# NOTE: How often a blocked pipeline producer checks whether the pipeline has failed or timed out
+PIPELINE_POLL_MILLIS = 100
+# NOTE: Passed through the pipeline queues after the last item, to tell each stage the input has ended
+END_OF_STREAM = object()
+# NOTE: This key is the key inside the globals that the concurrency limiters of this project are stored in
+CONCURRENCY_LIMITERS_KEY = "multithreading-concurrency-limiters-%s" % system.util.getProjectName()
+LIMITER_LOCK = threading.Lock()
+POOL_LOCK = threading.Lock()
 
 
 class MultiThreadTimeoutError(Exception):
@@ -84,7 +151,7 @@ class ResultCapturingWrapper(Runnable):
 		"""
 		try:
 			if self.kwargs:
-				result = self.func(**self.kwargs)
+				result = self.func(*self.args, **self.kwargs)
 			elif self.args:
 				result = self.func(*self.args)
 			else:
@@ -98,6 +165,51 @@ class ResultCapturingWrapper(Runnable):
 			# Don't re-raise - we've captured the error for processing in the main thread
 
 
+class ChunkCapturingWrapper(Runnable):
+	"""
+	DESCRIPTION: A java.lang.Runnable that executes a function for a whole chunk of parameters in one task,
+				 capturing each result at its own index in a thread-safe map.
+	"""
+
+	def __init__(self, func, start_index, params_chunk, results_map, use_kwargs=True):
+		"""
+		DESCRIPTION: This function initializes the ChunkCapturingWrapper class
+		"""
+		self.func = func
+		self.start_index = start_index
+		self.params_chunk = params_chunk
+		self.results_map = results_map
+		self.use_kwargs = use_kwargs
+
+		#NOTE: Describing every parameter in the chunk would cost more than the work itself, so only count them
+		function_name = General.Utilities.get_function_qualified_path(func)
+		ScriptContext.setDescription("Asynchronous execution of: %s for %d items starting at %d" % (
+			function_name, len(params_chunk), start_index))
+
+	def run(self):
+		"""
+		DESCRIPTION: This function executes the function for each parameter in the chunk and stores the results
+		"""
+		if not self.params_chunk:
+			return
+		for offset, params in enumerate(self.params_chunk):
+			index = self.start_index + offset
+			try:
+				#NOTE: None is the single call made when no parameter list was given, empty entries are passed on as is
+				if params is None:
+					result = self.func()
+				elif self.use_kwargs:
+					result = self.func(**params)
+				else:
+					result = self.func(*params)
+				self.results_map.put(index, result)
+			#NOTE: Every error is captured for the caller, so one item cannot stop the rest of the chunk
+			except (Exception, JavaException) as e: # pylint: disable=broad-except
+				LOGGER.warn("Exception in chunked item %d: %s" % (index, traceback.format_exc()))
+				error_with_traceback = {'exception': e, 'traceback': traceback.format_exc(), 'thread_index': index}
+				self.results_map.put(index, error_with_traceback)
+
+
 class AsyncThreadFactory(ThreadFactory):
 	"""
 	DESCRIPTION: A java.util.concurrent.ThreadFactory that will create threads with a name.
@@ -167,102 +279,1860 @@ class ThreadExecutionException(Exception):
 		)
 
 
-def wait_for_async_execution(func, kwargs_list=None, args_list=None, max_threads=-1, timeout_seconds=10):
+class TaskTimedOut(object):
 	"""
-	DESCRIPTION: Executes the function func asynchronously with the parameters and returns all results
-	PARAMETERS: func (REQ, function) - The function to be executed
-				kwargs_list (OPT, list) - A list of dictionaries with keyword arguments to be passed to the function
-				args_list (OPT, list) - A list of tuples/lists with positional arguments to be passed to the function
-				max_threads (OPT, int) - The maximum number of threads to be used.
-										 If -1, it will just execute with as many threads as it can
-				timeout_seconds (OPT, int) - The maximum number of seconds to wait for the threads to finish
-	RETURNS: list - Results from all function executions in the same order as input parameters
+	DESCRIPTION: Marks the result of a task that did not complete in time, when partial results are requested
 	"""
 
-	#NOTE: If our function showed up as a name, we would have to use the following line to get the actual function
-	if not callable(func):
-		if General.Utilities.is_valid_variable_name(func):
-			func = literal_eval(func)
+	def __init__(self, index):
+		self.index = index
 
-	# Determine which parameter list to use and validate input
-	if kwargs_list is not None and args_list is not None:
-		raise ValueError("Cannot specify both kwargs_list and args_list. Choose one.")
-	elif kwargs_list is not None:
-		param_list = kwargs_list
-		use_kwargs = True
-	elif args_list is not None:
-		param_list = args_list
-		use_kwargs = False
-	else:
-		# If no parameters provided, execute function once with no arguments
-		param_list = [None]
-		use_kwargs = True
+	def __repr__(self):
+		return "<TaskTimedOut index=%d>" % self.index
 
-	#NOTE: If the number of threads is -1, we will use the number of parameter options provided
-	if max_threads == -1:
-		max_threads = len(param_list)
 
-	#NOTE: Define containers for exceptions and results
-	exceptions = []
-	# Use Java ConcurrentHashMap for thread-safe result storage
-	results_map = ConcurrentHashMap()
+class CompletionSignallingTask(FutureTask):
+	"""
+	DESCRIPTION: A java.util.concurrent.FutureTask that puts its index on a queue once it finishes, fails or is
+				 cancelled, so a caller can react to tasks in the order they complete
+	"""
 
-	class AsyncExceptionHandler(Thread.UncaughtExceptionHandler):
-		""" Handles uncaught exceptions in threads using the native Java UncaughtExceptionHandler interface."""
+	def __init__(self, runnable, index, completion_queue):
+		"""
+		DESCRIPTION: This function initializes the CompletionSignallingTask class
+		"""
+		super(CompletionSignallingTask, self).__init__(runnable, None)
+		self.index = index
+		self.completion_queue = completion_queue
 
-		#NOTE: This is a java function, so we have to ignore the invalid name
-		def uncaughtException(self, thread, exception):  # pylint: disable=invalid-name
-			# Capture more detailed exception information
-			exception_info = {
-				'thread': thread,
-				'exception': exception,
-				'thread_name': thread.getName(),
-				'traceback': traceback.format_exc()
-			}
-			exceptions.append(exception_info)
-			LOGGER.error("Uncaught exception in thread %s: %s" % (thread.getName(), traceback.format_exc()))
+	def done(self):
+		"""
+		DESCRIPTION: This function overrides the FutureTask hook that runs when the task completes
+		"""
+		self.completion_queue.put(self.index)
 
-	function_name = General.Utilities.get_function_qualified_path(func)
-	#NOTE: Execute the function in parallel with at most the number of threads in the pool,
-	#NOTE: and wait for all of them to finish
-	executor = Executors.newFixedThreadPool(max_threads, AsyncThreadFactory(function_name, AsyncExceptionHandler()))
 
-	# Submit all tasks with their respective parameters
-	for i in range(len(param_list)):
-		if use_kwargs:
-			wrapper = ResultCapturingWrapper(func, i, results_map, kwargs=param_list[i])
-		else:
-			wrapper = ResultCapturingWrapper(func, i, results_map, args=param_list[i])
+class TaskDeadlineWrapper(Runnable):
+	"""
+	DESCRIPTION: A java.lang.Runnable that runs a FutureTask, cancelling it if it runs past its deadline.
+				 The deadline starts when the task starts running, so time spent waiting in the queue does not count.
+	"""
 
-		executor.execute(wrapper)
+	def __init__(self, task, timeout_seconds):
+		"""
+		DESCRIPTION: This function initializes the TaskDeadlineWrapper class
+		"""
+		self.task = task
+		self.timeout_seconds = timeout_seconds
+		self.timed_out = False
 
-	executor.shutdown()
-	finished_in_time = executor.awaitTermination(timeout_seconds, TimeUnit.SECONDS)
+	def run(self):
+		"""
+		DESCRIPTION: This function schedules the deadline and then runs the task
+		"""
+		deadline = _get_deadline_scheduler().schedule(TaskDeadlineCanceller(self),
+													int(self.timeout_seconds * 1000), TimeUnit.MILLISECONDS)
+		try:
+			self.task.run()
+		finally:
+			deadline.cancel(False)
 
-	# Check if all tasks completed within timeout
-	if not finished_in_time:
-		executor.shutdownNow()  # Force shutdown remaining tasks
-		raise MultiThreadTimeoutError("Not all tasks completed within " + str(timeout_seconds) + " seconds")
 
-	# If there were exceptions during execution, raise them
-	if exceptions:
-		raise MultiThreadedException(exceptions)
+class TaskDeadlineCanceller(Runnable):
+	"""
+	DESCRIPTION: A java.lang.Runnable that cancels the task of a TaskDeadlineWrapper once its deadline has passed
+	"""
 
-	# Convert results map back to ordered list
-	results = []
-	for i in range(len(param_list)):
-		result = results_map.get(i)
-		if isinstance(result, Exception):
-			raise result
-		elif isinstance(result, dict) and 'exception' in result:
-			# Handle error with traceback information
-			error_info = result
-			original_exception = error_info['exception']
-			thread_traceback = error_info['traceback']
-			thread_index = error_info['thread_index']
-
-			# Raise a new exception that preserves the original traceback
-			raise ThreadExecutionException(original_exception, thread_traceback, thread_index)
-		results.append(result)
-
-	return results
+	def __init__(self, deadline_wrapper):
+		self.deadline_wrapper = deadline_wrapper
+
+	def run(self):
+		if not self.deadline_wrapper.task.isDone():
+			self.deadline_wrapper.timed_out = True
+			self.deadline_wrapper.task.cancel(True)
+
+
+class TaskFuture(object):
+	"""
+	DESCRIPTION: A handle to a task started with submit(), used to wait for its result or to cancel it
+	"""
+
+	def __init__(self, future, results_map, deadline_wrapper=None):
+		"""
+		DESCRIPTION: This function initializes the TaskFuture class
+		"""
+		self.future = future
+		self.results_map = results_map
+		self.deadline_wrapper = deadline_wrapper
+
+	def result(self, timeout_seconds=None):
+		"""
+		DESCRIPTION: Waits for the task to finish and returns its result
+		PARAMETERS: timeout_seconds (OPT, int) - The maximum number of seconds to wait. If omitted, waits until the
+												 task finishes or runs past its own deadline
+		RETURNS: obj - The result of the function execution
+		"""
+		try:
+			if timeout_seconds is None:
+				self.future.get()
+			else:
+				self.future.get(int(timeout_seconds * 1000), TimeUnit.MILLISECONDS)
+		except TimeoutException:
+			raise MultiThreadTimeoutError("Task did not complete within " + str(timeout_seconds) + " seconds")
+		except CancellationException as e:
+			if self.timed_out():
+				raise MultiThreadTimeoutError("Task did not complete within its deadline of %s seconds"
+												% self.deadline_wrapper.timeout_seconds)
+			raise e
+		except ExecutionException as e:
+			raise MultiThreadedException([{'exception': e.getCause(), 'traceback': traceback.format_exc()}])
+		return _unwrap_result(self.results_map.get(0))
+
+	def cancel(self, interrupt=True):
+		"""
+		DESCRIPTION: Cancels the task if it has not finished yet
+		PARAMETERS: interrupt (OPT, bool) - If true, interrupts the thread running the task
+		RETURNS: bool - True if the task was cancelled, False if it had already finished
+		"""
+		return self.future.cancel(interrupt)
+
+	def done(self):
+		"""
+		DESCRIPTION: Checks whether the task has finished, failed or been cancelled
+		RETURNS: bool - True if the task is no longer running
+		"""
+		return self.future.isDone()
+
+	def cancelled(self):
+		"""
+		DESCRIPTION: Checks whether the task was cancelled, either directly or by running past its deadline
+		RETURNS: bool - True if the task was cancelled
+		"""
+		return self.future.isCancelled()
+
+	def timed_out(self):
+		"""
+		DESCRIPTION: Checks whether the task was cancelled because it ran past its deadline
+		RETURNS: bool - True if the task timed out
+		"""
+		return self.deadline_wrapper is not None and self.deadline_wrapper.timed_out
+
+
+class PoolExceptionHandler(Thread.UncaughtExceptionHandler):
+	""" Logs uncaught exceptions raised by the threads of a shared executor pool."""
+
+	#NOTE: This is a java function, so we have to ignore the invalid name
+	def uncaughtException(self, thread, exception):  # pylint: disable=invalid-name
+		LOGGER.error("Uncaught exception in pool thread %s: %s" % (thread.getName(), exception))
+
+
+class ResizableSemaphore(Semaphore):
+	"""
+	DESCRIPTION: A java.util.concurrent.Semaphore that exposes reducePermits, so a limit can be lowered in place
+	"""
+
+	def reduce_permits(self, reduction):
+		"""
+		DESCRIPTION: Lowers the number of permits without waiting for them to be released
+		PARAMETERS: reduction (REQ, int) - The number of permits to remove
+		"""
+		self.reducePermits(reduction)
+
+
+class ConcurrencyLimiter(object):
+	"""
+	DESCRIPTION: Limits how many threads may use a named resource, like a database connection or a remote host,
+				 at the same time, and records how long threads wait for it. A thread that already holds the
+				 limiter does not acquire it again, so nested limited calls cannot deadlock.
+
+	Example:
+		with General.Multithreading.limit_concurrency("db:MSSQL"):
+			system.db.runNamedQuery(path, params)
+	"""
+
+	def __init__(self, resource_name, max_concurrent=None):
+		"""
+		DESCRIPTION: This function initializes the ConcurrencyLimiter class
+		PARAMETERS: resource_name (REQ, str) - The name of the resource being limited
+					max_concurrent (OPT, int) - The maximum number of concurrent users, if omitted the resource is
+												only measured and never limited
+		"""
+		self.resource_name = resource_name
+		self.max_concurrent = max_concurrent
+		self.semaphore = ResizableSemaphore(max_concurrent if max_concurrent is not None else Integer.MAX_VALUE, True)
+		self.holders = threading.local()
+		self.active_count = AtomicInteger()
+		self.acquire_count = AtomicLong()
+		self.timeout_count = AtomicLong()
+		self.total_wait_nanos = AtomicLong()
+		self.max_wait_nanos = AtomicLong()
+
+	def set_limit(self, max_concurrent):
+		"""
+		DESCRIPTION: Changes the limit in place. Lowering it does not interrupt current holders, new callers just
+					 wait until enough of them have released.
+		PARAMETERS: max_concurrent (REQ, int) - The maximum number of concurrent users
+		"""
+		with LIMITER_LOCK:
+			current_limit = self.max_concurrent if self.max_concurrent is not None else Integer.MAX_VALUE
+			if max_concurrent > current_limit:
+				self.semaphore.release(max_concurrent - current_limit)
+			elif max_concurrent < current_limit:
+				self.semaphore.reduce_permits(current_limit - max_concurrent)
+			self.max_concurrent = max_concurrent
+
+	def acquire(self, timeout_seconds=None):
+		"""
+		DESCRIPTION: Waits for a permit to use the resource
+		PARAMETERS: timeout_seconds (OPT, int) - The maximum number of seconds to wait, if omitted waits indefinitely
+		"""
+		depth = getattr(self.holders, 'depth', 0)
+		if depth:
+			self.holders.depth = depth + 1
+			return
+
+		start_nanos = System.nanoTime()
+		if timeout_seconds is None:
+			self.semaphore.acquire()
+		elif not self.semaphore.tryAcquire(int(timeout_seconds * 1000), TimeUnit.MILLISECONDS):
+			self.timeout_count.incrementAndGet()
+			raise MultiThreadTimeoutError("Timed out after %s seconds waiting for resource %s" %
+											(timeout_seconds, self.resource_name))
+		wait_nanos = System.nanoTime() - start_nanos
+
+		self.holders.depth = 1
+		self.active_count.incrementAndGet()
+		self.acquire_count.incrementAndGet()
+		self.total_wait_nanos.addAndGet(wait_nanos)
+		current_max = self.max_wait_nanos.get()
+		while wait_nanos > current_max and not self.max_wait_nanos.compareAndSet(current_max, wait_nanos):
+			current_max = self.max_wait_nanos.get()
+
+	def release(self):
+		"""
+		DESCRIPTION: Releases the permit held by the current thread
+		"""
+		self.holders.depth -= 1
+		if not self.holders.depth:
+			self.active_count.decrementAndGet()
+			self.semaphore.release()
+
+	def __enter__(self):
+		self.acquire()
+		return self
+
+	def __exit__(self, exc_type, exc_value, exc_traceback):
+		self.release()
+
+	def get_status(self):
+		"""
+		DESCRIPTION: Reports the limit and wait times of the resource
+		RETURNS: dict - The resource name, limit, active and waiting threads, acquire and timeout counts,
+						and average and maximum wait in milliseconds
+		"""
+		acquire_count = self.acquire_count.get()
+		return {
+			'resource_name': self.resource_name,
+			'max_concurrent': self.max_concurrent,
+			'active_count': self.active_count.get(),
+			'waiting_count': self.semaphore.getQueueLength(),
+			'acquire_count': acquire_count,
+			'timeout_count': self.timeout_count.get(),
+			'average_wait_millis': self.total_wait_nanos.get() / 1000000.0 / acquire_count if acquire_count else 0.0,
+			'max_wait_millis': self.max_wait_nanos.get() / 1000000.0
+		}
+
+
+class ConcurrencyLimitedWrapper(Runnable):
+	"""
+	DESCRIPTION: A java.lang.Runnable that holds a ConcurrencyLimiter permit while running another runnable
+	"""
+
+	def __init__(self, runnable, limiter):
+		"""
+		DESCRIPTION: This function initializes the ConcurrencyLimitedWrapper class
+		"""
+		self.runnable = runnable
+		self.limiter = limiter
+
+	def run(self):
+		"""
+		DESCRIPTION: This function runs the wrapped runnable while holding a permit
+		"""
+		with self.limiter:
+			self.runnable.run()
+
+
+class PeriodicJob(Runnable):
+	"""
+	DESCRIPTION: A java.lang.Runnable that runs a function periodically, scheduling its own next run each time so
+				 every run can have random jitter added. Use schedule_periodic_job to create one.
+	"""
+
+	def __init__(self, job_name, func, interval_seconds, fixed_rate=False, jitter_seconds=0, skip_if_running=True,
+					args=None, kwargs=None):
+		"""
+		DESCRIPTION: This function initializes the PeriodicJob class
+		"""
+		self.job_name = job_name
+		self.func = func
+		self.interval_millis = int(interval_seconds * 1000)
+		self.fixed_rate = fixed_rate
+		self.jitter_millis = int(jitter_seconds * 1000)
+		self.skip_if_running = skip_if_running
+		self.args = args if args is not None else ()
+		self.kwargs = kwargs if kwargs is not None else {}
+		self.cancelled = False
+		self.future = None
+		self.planned_millis = None
+		self.next_run_millis = None
+		self.running_count = AtomicInteger()
+		self.run_count = AtomicLong()
+		self.error_count = AtomicLong()
+		self.overrun_count = AtomicLong()
+		self.missed_count = AtomicLong()
+		self.last_start_millis = None
+		self.last_duration_millis = None
+		self.last_error = None
+
+	def schedule(self, planned_millis):
+		"""
+		DESCRIPTION: Schedules the next run for the planned time, plus a random amount of jitter
+		PARAMETERS: planned_millis (REQ, int) - The planned time of the next run, in epoch milliseconds
+		"""
+		if self.cancelled:
+			return
+		self.planned_millis = planned_millis
+		jitter_millis = int(random.uniform(0, self.jitter_millis)) if self.jitter_millis else 0
+		delay_millis = max(planned_millis - System.currentTimeMillis(), 0) + jitter_millis
+		self.next_run_millis = System.currentTimeMillis() + delay_millis
+		try:
+			self.future = _get_scheduler(SCHEDULER_POOL_NAME, SCHEDULER_THREADS).schedule(
+				self, delay_millis, TimeUnit.MILLISECONDS)
+		except RejectedExecutionException:
+			#NOTE: The scheduler is shutting down with the project, so there is no next run
+			self.next_run_millis = None
+
+	def cancel(self):
+		"""
+		DESCRIPTION: Stops the job from running again, without interrupting a run in progress
+		"""
+		self.cancelled = True
+		self.next_run_millis = None
+		if self.future is not None:
+			self.future.cancel(False)
+
+	def run(self):
+		"""
+		DESCRIPTION: This function runs the job once and schedules the next run
+		"""
+		if self.cancelled:
+			return
+
+		#NOTE: At a fixed rate the next run is planned from this run's plan, so slow runs do not cause drift
+		if self.fixed_rate:
+			self.schedule(self.get_next_planned_millis())
+
+		#NOTE: A run that starts while the last one is still going is an overrun. Claiming the run with
+		#NOTE: compareAndSet means two scheduler threads can never both see the job as idle.
+		if not self.running_count.compareAndSet(0, 1):
+			self.overrun_count.incrementAndGet()
+			if self.skip_if_running:
+				LOGGER.debug("Skipping periodic job %s, the last run is still going" % self.job_name)
+				return
+			self.running_count.incrementAndGet()
+
+		start_millis = System.currentTimeMillis()
+		self.last_start_millis = start_millis
+		try:
+			self.func(*self.args, **self.kwargs)
+		#NOTE: Any error is logged and recorded in the job status, so one failed run never stops the job
+		except (Exception, JavaException): # pylint: disable=broad-except
+			self.error_count.incrementAndGet()
+			self.last_error = traceback.format_exc()
+			LOGGER.error("Exception in periodic job %s: %s" % (self.job_name, self.last_error))
+		finally:
+			self.last_duration_millis = System.currentTimeMillis() - start_millis
+			self.run_count.incrementAndGet()
+			self.running_count.decrementAndGet()
+
+		#NOTE: With a fixed delay the next run is planned from when this run finished
+		if not self.fixed_rate:
+			self.schedule(System.currentTimeMillis() + self.interval_millis)
+
+	def get_next_planned_millis(self):
+		"""
+		DESCRIPTION: Plans the next fixed rate run on this job's schedule. If the scheduler fell behind, like after a
+					 long pause or the clock moving forward, only the latest tick that is already due is run, and the
+					 ones before it are counted as missed instead of being run back to back to catch up.
+		RETURNS: int - The planned time of the next run, in epoch milliseconds
+		"""
+		planned_millis = self.planned_millis + self.interval_millis
+		missed_ticks = (System.currentTimeMillis() - planned_millis) // self.interval_millis
+		if missed_ticks > 0:
+			self.missed_count.addAndGet(missed_ticks)
+			planned_millis += missed_ticks * self.interval_millis
+		return planned_millis
+
+	def get_status(self):
+		"""
+		DESCRIPTION: Reports on the job
+		RETURNS: dict - The job name, function, mode, interval, run, error, overrun and missed run counts,
+						last start and duration, next run, and the last error
+		"""
+		return {
+			'job_name': self.job_name,
+			'function': General.Utilities.get_function_qualified_path(self.func),
+			'mode': 'fixed-rate' if self.fixed_rate else 'fixed-delay',
+			'interval_seconds': self.interval_millis / 1000.0,
+			'jitter_seconds': self.jitter_millis / 1000.0,
+			'running': self.running_count.get() > 0,
+			'run_count': self.run_count.get(),
+			'error_count': self.error_count.get(),
+			'overrun_count': self.overrun_count.get(),
+			'missed_count': self.missed_count.get(),
+			'last_start': system.date.fromMillis(self.last_start_millis) if self.last_start_millis else None,
+			'last_duration_millis': self.last_duration_millis,
+			'next_run': system.date.fromMillis(self.next_run_millis) if self.next_run_millis else None,
+			'last_error': self.last_error
+		}
+
+
+class ForkJoinThreadFactory(ForkJoinPool.ForkJoinWorkerThreadFactory):
+	"""
+	DESCRIPTION: A java.util.concurrent.ForkJoinPool.ForkJoinWorkerThreadFactory that names the pool's worker threads
+	"""
+
+	def __init__(self, name, exception_handler):
+		self.name = name
+		self.exception_handler = exception_handler
+
+	#NOTE: This is a java function, so we have to ignore the invalid name
+	def newThread(self, pool):  # pylint: disable=invalid-name
+		"""
+		DESCRIPTION: Creates the new worker thread, and customizes it to properly bubble back up to Ignition.
+		"""
+		thread = ForkJoinPool.defaultForkJoinWorkerThreadFactory.newThread(pool)
+		thread.setName("%s-%d" % (self.name, thread.getPoolIndex()))
+		thread.setUncaughtExceptionHandler(self.exception_handler)
+		return thread
+
+
+class RecursiveFunctionTask(RecursiveTask):
+	"""
+	DESCRIPTION: A java.util.concurrent.RecursiveTask that executes a function, which may fork and join more tasks.
+				 Use fork, join and fork_join_all from inside the function instead of creating these directly.
+	"""
+
+	def __init__(self, func, args=None, kwargs=None):
+		"""
+		DESCRIPTION: This function initializes the RecursiveFunctionTask class
+		"""
+		super(RecursiveFunctionTask, self).__init__()
+		self.func = func
+		self.args = args if args is not None else ()
+		self.kwargs = kwargs if kwargs is not None else {}
+
+	def compute(self):
+		"""
+		DESCRIPTION: This function overrides the RecursiveTask hook, to execute the function with its arguments
+		"""
+		return self.func(*self.args, **self.kwargs)
+
+
+class TaskMetrics(object):
+	"""
+	DESCRIPTION: Counters and latency histograms for the tasks of one function on one pool
+	"""
+
+	def __init__(self, pool_name, function_path):
+		"""
+		DESCRIPTION: This function initializes the TaskMetrics class
+		"""
+		self.pool_name = pool_name
+		self.function_path = function_path
+		self.submitted_count = AtomicLong()
+		self.rejected_count = AtomicLong()
+		self.started_count = AtomicLong()
+		self.completed_count = AtomicLong()
+		self.total_wait_nanos = AtomicLong()
+		self.max_wait_nanos = AtomicLong()
+		self.total_run_nanos = AtomicLong()
+		self.max_run_nanos = AtomicLong()
+		self.wait_histogram = AtomicLongArray(len(LATENCY_BUCKETS_MILLIS) + 1)
+		self.run_histogram = AtomicLongArray(len(LATENCY_BUCKETS_MILLIS) + 1)
+
+	def record_wait(self, wait_nanos):
+		"""
+		DESCRIPTION: Records the time a task spent between being submitted and starting to run
+		PARAMETERS: wait_nanos (REQ, int) - The wait, in nanoseconds
+		"""
+		self.started_count.incrementAndGet()
+		self.total_wait_nanos.addAndGet(wait_nanos)
+		_record_max(self.max_wait_nanos, wait_nanos)
+		self.wait_histogram.incrementAndGet(_get_latency_bucket(wait_nanos))
+
+	def record_run(self, run_nanos):
+		"""
+		DESCRIPTION: Records the time a task spent running
+		PARAMETERS: run_nanos (REQ, int) - The run time, in nanoseconds
+		"""
+		self.completed_count.incrementAndGet()
+		self.total_run_nanos.addAndGet(run_nanos)
+		_record_max(self.max_run_nanos, run_nanos)
+		self.run_histogram.incrementAndGet(_get_latency_bucket(run_nanos))
+
+	def get_status(self):
+		"""
+		DESCRIPTION: Reports the counters and latencies of the tasks
+		RETURNS: dict - The pool name, function path, task counts, and average, maximum and estimated 95th
+						percentile wait and run times in milliseconds
+		"""
+		started_count = self.started_count.get()
+		completed_count = self.completed_count.get()
+		return {
+			'pool_name': self.pool_name,
+			'function_path': self.function_path,
+			'submitted_count': self.submitted_count.get(),
+			'rejected_count': self.rejected_count.get(),
+			'started_count': started_count,
+			'completed_count': completed_count,
+			'active_count': started_count - completed_count,
+			'average_wait_millis': self.total_wait_nanos.get() / 1000000.0 / started_count if started_count else 0.0,
+			'max_wait_millis': self.max_wait_nanos.get() / 1000000.0,
+			'p95_wait_millis': _estimate_percentile(self.wait_histogram, started_count, 0.95),
+			'average_run_millis': self.total_run_nanos.get() / 1000000.0 / completed_count if completed_count else 0.0,
+			'max_run_millis': self.max_run_nanos.get() / 1000000.0,
+			'p95_run_millis': _estimate_percentile(self.run_histogram, completed_count, 0.95)
+		}
+
+
+class InstrumentedWrapper(Runnable):
+	"""
+	DESCRIPTION: A java.lang.Runnable that records how long another runnable waited to start, and how long it ran
+	"""
+
+	def __init__(self, runnable, metrics):
+		"""
+		DESCRIPTION: This function initializes the InstrumentedWrapper class, which marks the task as submitted
+		"""
+		self.runnable = runnable
+		self.metrics = metrics
+		self.submitted_nanos = System.nanoTime()
+		metrics.submitted_count.incrementAndGet()
+
+	def run(self):
+		"""
+		DESCRIPTION: This function runs the wrapped runnable and records its timings
+		"""
+		start_nanos = System.nanoTime()
+		self.metrics.record_wait(start_nanos - self.submitted_nanos)
+		try:
+			self.runnable.run()
+		finally:
+			self.metrics.record_run(System.nanoTime() - start_nanos)
+
+
+def _record_max(atomic_max, value):
+	"""
+	DESCRIPTION: Raises an AtomicLong to the value, if the value is larger
+	"""
+	current_max = atomic_max.get()
+	while value > current_max and not atomic_max.compareAndSet(current_max, value):
+		current_max = atomic_max.get()
+
+
+def _get_latency_bucket(nanos):
+	"""
+	DESCRIPTION: Returns the index of the latency histogram bucket for a duration
+	PARAMETERS: nanos (REQ, int) - The duration, in nanoseconds
+	RETURNS: int - The bucket index
+	"""
+	return bisect.bisect_left(LATENCY_BUCKETS_MILLIS, nanos / 1000000.0)
+
+
+def _estimate_percentile(histogram, total_count, percentile):
+	"""
+	DESCRIPTION: Estimates a percentile from a latency histogram, as the upper bound of the bucket it falls in
+	PARAMETERS: histogram (REQ, AtomicLongArray) - The bucket counts
+				total_count (REQ, int) - The number of recorded durations
+				percentile (REQ, float) - The percentile, between 0 and 1
+	RETURNS: float - The estimated latency in milliseconds, or None if nothing was recorded
+					 or it falls in the overflow bucket
+	"""
+	if not total_count:
+		return None
+	target_count = total_count * percentile
+	running_count = 0
+	for bucket_index, upper_bound in enumerate(LATENCY_BUCKETS_MILLIS):
+		running_count += histogram.get(bucket_index)
+		if running_count >= target_count:
+			return float(upper_bound)
+	return None
+
+
+def _get_registry(registry_key, create_registry, retire_registry=None):
+	"""
+	DESCRIPTION: Returns a registry stored in the ignition globals. A registry created by an earlier initialization of
+				 this script is replaced the first time this one uses it, and code from an earlier initialization uses
+				 the newer registry, so the two never replace each other back and forth.
+	PARAMETERS: registry_key (REQ, str) - The key of the registry in the globals
+				create_registry (REQ, function) - Called with the registry being replaced, or None, to create the new one
+				retire_registry (OPT, function) - Called with the registry being replaced, once it has been replaced
+	RETURNS: dict - The registry
+	"""
+	registry = IGNITION_GLOBALS.get(registry_key)
+	if registry is not None and registry.get('generation', 0) >= SCRIPT_GENERATION:
+		return registry
+
+	with REGISTRY_LOCK:
+		stale_registry = IGNITION_GLOBALS.get(registry_key)
+		if stale_registry is not None and stale_registry.get('generation', 0) >= SCRIPT_GENERATION:
+			return stale_registry
+		registry = create_registry(stale_registry)
+		registry['generation'] = SCRIPT_GENERATION
+		IGNITION_GLOBALS[registry_key] = registry
+
+	if stale_registry is not None and retire_registry is not None:
+		retire_registry(stale_registry)
+	return registry
+
+
+def _get_pool_registry():
+	"""
+	DESCRIPTION: Returns the registry of shared executor pools stored in the ignition globals
+	RETURNS: dict - The registry, with the keys 'executors' (name to ThreadPoolExecutor), 'sizes' (name to int)
+					and 'jobs' (name to PeriodicJob)
+	"""
+	return _get_registry(EXECUTOR_POOLS_KEY, _create_pool_registry, _retire_pool_registry)
+
+
+def _create_pool_registry(stale_registry):
+	"""
+	DESCRIPTION: Creates an empty pool registry, keeping the pool sizes of the registry it replaces
+	PARAMETERS: stale_registry (REQ, dict) - The registry from an earlier initialization of this script, or None
+	RETURNS: dict - The registry
+	"""
+	sizes = dict(stale_registry.get('sizes', {})) if stale_registry is not None else {}
+	return {'executors': {}, 'sizes': sizes, 'jobs': {}}
+
+
+def _retire_pool_registry(registry):
+	"""
+	DESCRIPTION: Cancels the periodic jobs and shuts down the pools left from an earlier initialization of this
+				 script, letting tasks that are already running finish
+	PARAMETERS: registry (REQ, dict) - The replaced pool registry
+	"""
+	for job in registry.get('jobs', {}).values():
+		job.cancel()
+	for pool_name, executor in registry.get('executors', {}).items():
+		LOGGER.debug("Shutting down executor pool %s left from an earlier version of this script" % pool_name)
+		executor.shutdown()
+
+
+def _resize_executor(executor, max_threads):
+	"""
+	DESCRIPTION: Resizes a ThreadPoolExecutor, ordering the core and maximum sizes so neither is ever invalid
+	PARAMETERS: executor (REQ, ThreadPoolExecutor) - The executor to resize
+				max_threads (REQ, int) - The new number of threads
+	"""
+	if max_threads > executor.getMaximumPoolSize():
+		executor.setMaximumPoolSize(max_threads)
+		executor.setCorePoolSize(max_threads)
+	else:
+		executor.setCorePoolSize(max_threads)
+		executor.setMaximumPoolSize(max_threads)
+
+
+def register_executor_pool(pool_name, max_threads):
+	"""
+	DESCRIPTION: Sets the size of a named shared executor pool. The pool itself is created the first time it is used,
+				 and if it is already running it will be resized in place.
+	PARAMETERS: pool_name (REQ, str) - The name of the pool
+				max_threads (REQ, int) - The maximum number of threads the pool will hold
+	"""
+	if max_threads < 1:
+		raise ValueError("max_threads must be at least 1 for pool %s" % pool_name)
+
+	with POOL_LOCK:
+		registry = _get_pool_registry()
+		registry['sizes'][pool_name] = max_threads
+		executor = registry['executors'].get(pool_name)
+		if isinstance(executor, ForkJoinPool):
+			LOGGER.warn("Pool %s is a fork join pool, its size will change the next time it is created" % pool_name)
+		elif executor is not None:
+			_resize_executor(executor, max_threads)
+
+
+def get_executor_pool(pool_name=DEFAULT_POOL_NAME):
+	"""
+	DESCRIPTION: Returns a long-lived shared executor pool, creating it if it does not exist yet.
+				 Idle threads time out, so an unused pool does not keep holding threads.
+	PARAMETERS: pool_name (OPT, str) - The name of the pool
+	RETURNS: ThreadPoolExecutor - The executor for the pool, or the ForkJoinPool if FORK_JOIN_POOL_NAME is requested
+	"""
+	if pool_name == FORK_JOIN_POOL_NAME:
+		return get_fork_join_pool()
+
+	registry = _get_pool_registry()
+	executor = registry['executors'].get(pool_name)
+	if executor is not None and not executor.isShutdown():
+		return executor
+
+	with POOL_LOCK:
+		#NOTE: Another thread may have created the pool while we were waiting on the lock
+		executor = registry['executors'].get(pool_name)
+		if executor is not None and not executor.isShutdown():
+			return executor
+
+		max_threads = registry['sizes'].get(pool_name, DEFAULT_POOL_THREADS)
+		thread_factory = AsyncThreadFactory("%s-%s" % (MULTITHREADING_SYSTEM_NAME, pool_name), PoolExceptionHandler())
+		executor = ThreadPoolExecutor(max_threads, max_threads, POOL_KEEP_ALIVE_SECONDS, TimeUnit.SECONDS,
+										LinkedBlockingQueue(), thread_factory)
+		executor.allowCoreThreadTimeOut(True)
+		registry['executors'][pool_name] = executor
+		LOGGER.debug("Created executor pool %s with %d threads" % (pool_name, max_threads))
+		return executor
+
+
+def get_fork_join_pool():
+	"""
+	DESCRIPTION: Returns the shared work-stealing pool for recursive tasks, creating it if it does not exist yet.
+				 A worker that joins a forked task runs other queued tasks while it waits, instead of blocking,
+				 so deeply nested tasks cannot deadlock the pool.
+	RETURNS: ForkJoinPool - The pool
+	"""
+	registry = _get_pool_registry()
+	pool = registry['executors'].get(FORK_JOIN_POOL_NAME)
+	if pool is not None and not pool.isShutdown():
+		return pool
+
+	with POOL_LOCK:
+		pool = registry['executors'].get(FORK_JOIN_POOL_NAME)
+		if pool is not None and not pool.isShutdown():
+			return pool
+
+		parallelism = registry['sizes'].get(FORK_JOIN_POOL_NAME, FORK_JOIN_THREADS)
+		thread_factory = ForkJoinThreadFactory("%s-%s" % (MULTITHREADING_SYSTEM_NAME, FORK_JOIN_POOL_NAME),
+												PoolExceptionHandler())
+		pool = ForkJoinPool(parallelism, thread_factory, None, False)
+		registry['executors'][FORK_JOIN_POOL_NAME] = pool
+		LOGGER.debug("Created fork join pool with a parallelism of %d" % parallelism)
+		return pool
+
+
+def get_pool_thread_count(executor):
+	"""
+	DESCRIPTION: Returns the number of threads an executor can run tasks on at once
+	PARAMETERS: executor (REQ, ExecutorService) - A ThreadPoolExecutor or ForkJoinPool
+	RETURNS: int - The maximum number of threads
+	"""
+	if isinstance(executor, ForkJoinPool):
+		return executor.getParallelism()
+	return executor.getMaximumPoolSize()
+
+
+def _get_scheduler(pool_name, thread_count=1):
+	"""
+	DESCRIPTION: Returns a named scheduler, creating it if it does not exist yet.
+				 It is kept in the pool registry, so it is shut down along with the other pools.
+	PARAMETERS: pool_name (REQ, str) - The name of the scheduler
+				thread_count (OPT, int) - The number of threads for the scheduler
+	RETURNS: ScheduledThreadPoolExecutor - The scheduler
+	"""
+	registry = _get_pool_registry()
+	scheduler = registry['executors'].get(pool_name)
+	if scheduler is not None and not scheduler.isShutdown():
+		return scheduler
+
+	with POOL_LOCK:
+		scheduler = registry['executors'].get(pool_name)
+		if scheduler is not None and not scheduler.isShutdown():
+			return scheduler
+
+		thread_factory = AsyncThreadFactory("%s-%s" % (MULTITHREADING_SYSTEM_NAME, pool_name), PoolExceptionHandler())
+		scheduler = ScheduledThreadPoolExecutor(thread_count, thread_factory)
+		#NOTE: Drop cancelled and pending tasks instead of keeping them queued, or running them after a shutdown
+		scheduler.setRemoveOnCancelPolicy(True)
+		scheduler.setExecuteExistingDelayedTasksAfterShutdownPolicy(False)
+		scheduler.setKeepAliveTime(POOL_KEEP_ALIVE_SECONDS, TimeUnit.SECONDS)
+		scheduler.allowCoreThreadTimeOut(True)
+		registry['executors'][pool_name] = scheduler
+		return scheduler
+
+
+def _get_deadline_scheduler():
+	"""
+	DESCRIPTION: Returns the scheduler that enforces task deadlines
+	RETURNS: ScheduledThreadPoolExecutor - The scheduler
+	"""
+	return _get_scheduler(DEADLINE_POOL_NAME)
+
+
+def _submit_task(executor, runnable, task_timeout_seconds=None, index=None, completion_queue=None):
+	"""
+	DESCRIPTION: Submits a runnable to an executor, with an optional deadline for the task itself
+	PARAMETERS: executor (REQ, ExecutorService) - The executor to run the task on
+				runnable (REQ, Runnable) - The task to run
+				task_timeout_seconds (OPT, int) - The number of seconds the task may run before it is cancelled
+				index (OPT, int) - The index to put on the completion queue when the task completes
+				completion_queue (OPT, BlockingQueue) - A queue that receives the index once the task completes
+	RETURNS: tuple - The future for the task, and its TaskDeadlineWrapper (None if there is no deadline)
+	"""
+	if completion_queue is not None:
+		task = CompletionSignallingTask(runnable, index, completion_queue)
+	else:
+		task = FutureTask(runnable, None)
+
+	deadline_wrapper = None
+	try:
+		if task_timeout_seconds is None:
+			executor.execute(task)
+		else:
+			deadline_wrapper = TaskDeadlineWrapper(task, task_timeout_seconds)
+			executor.execute(deadline_wrapper)
+	except RejectedExecutionException:
+		_record_rejection(runnable)
+		raise
+	return task, deadline_wrapper
+
+
+def _record_rejection(runnable):
+	"""
+	DESCRIPTION: Counts a task the executor refused to run, if the task is instrumented
+	PARAMETERS: runnable (REQ, Runnable) - The task that was rejected
+	"""
+	if isinstance(runnable, InstrumentedWrapper):
+		runnable.metrics.rejected_count.incrementAndGet()
+
+
+def shutdown_executor_pool(pool_name, wait_seconds=0):
+	"""
+	DESCRIPTION: Shuts down a named shared executor pool, letting already submitted tasks finish
+	PARAMETERS: pool_name (REQ, str) - The name of the pool
+				wait_seconds (OPT, int) - The number of seconds to wait for running tasks to finish
+	RETURNS: bool - True if the pool has no running tasks left, False if it is still finishing
+	"""
+	with POOL_LOCK:
+		registry = _get_pool_registry()
+		executor = registry['executors'].pop(pool_name, None)
+		#NOTE: Periodic jobs cannot run without their scheduler
+		if pool_name == SCHEDULER_POOL_NAME:
+			for job in registry['jobs'].values():
+				job.cancel()
+			registry['jobs'].clear()
+	if executor is None:
+		return True
+
+	executor.shutdown()
+	if wait_seconds:
+		return executor.awaitTermination(wait_seconds, TimeUnit.SECONDS)
+	return executor.isTerminated()
+
+
+def shutdown_executor_pools(wait_seconds=0):
+	"""
+	DESCRIPTION: Shuts down every shared executor pool for this project, for use in a gateway shutdown script
+	PARAMETERS: wait_seconds (OPT, int) - The number of seconds to wait for each pool's running tasks to finish
+	"""
+	for pool_name in list(_get_pool_registry()['executors'].keys()):
+		shutdown_executor_pool(pool_name, wait_seconds)
+
+
+def get_executor_pool_status():
+	"""
+	DESCRIPTION: Reports on every shared executor pool for this project
+	RETURNS: list - A dictionary per pool, with its name, maximum thread count, live thread count,
+					active thread count, queued task count and completed task count (steal count for fork join)
+	"""
+	pool_status = []
+	for pool_name, executor in sorted(_get_pool_registry()['executors'].items()):
+		if isinstance(executor, ForkJoinPool):
+			#NOTE: A fork join pool does not count completed tasks, so report how many were stolen instead
+			pool_status.append({
+				'pool_name': pool_name,
+				'max_threads': executor.getParallelism(),
+				'thread_count': executor.getPoolSize(),
+				'active_count': executor.getActiveThreadCount(),
+				'queue_size': executor.getQueuedTaskCount() + executor.getQueuedSubmissionCount(),
+				'steal_count': executor.getStealCount()
+			})
+			continue
+
+		pool_status.append({
+			'pool_name': pool_name,
+			'max_threads': executor.getMaximumPoolSize(),
+			'thread_count': executor.getPoolSize(),
+			'active_count': executor.getActiveCount(),
+			'queue_size': executor.getQueue().size(),
+			'completed_task_count': executor.getCompletedTaskCount()
+		})
+	return pool_status
+
+
+def set_concurrency_limit(resource_name, max_concurrent):
+	"""
+	DESCRIPTION: Sets the maximum number of threads that may use a resource at the same time
+	PARAMETERS: resource_name (REQ, str) - The name of the resource, like a database connection or a remote host
+				max_concurrent (REQ, int) - The maximum number of concurrent users
+	RETURNS: ConcurrencyLimiter - The limiter for the resource
+	"""
+	if max_concurrent < 1:
+		raise ValueError("max_concurrent must be at least 1 for resource %s" % resource_name)
+
+	limiter = limit_concurrency(resource_name)
+	limiter.set_limit(max_concurrent)
+	return limiter
+
+
+def limit_concurrency(resource_name):
+	"""
+	DESCRIPTION: Returns the limiter for a resource, to be used as a context manager around each use of it.
+				 A resource without a limit set is only measured, until set_concurrency_limit is called for it.
+	PARAMETERS: resource_name (REQ, str) - The name of the resource, like a database connection or a remote host
+	RETURNS: ConcurrencyLimiter - The limiter for the resource
+	"""
+	limiters = _get_limiter_registry()['limiters']
+	limiter = limiters.get(resource_name)
+	if limiter is not None:
+		return limiter
+
+	with LIMITER_LOCK:
+		limiter = limiters.get(resource_name)
+		if limiter is None:
+			limiter = limiters[resource_name] = ConcurrencyLimiter(resource_name)
+		return limiter
+
+
+def _get_limiter_registry():
+	"""
+	DESCRIPTION: Returns the registry of concurrency limiters stored in the ignition globals
+	RETURNS: dict - The registry, with the key 'limiters' (resource name to ConcurrencyLimiter)
+	"""
+	return _get_registry(CONCURRENCY_LIMITERS_KEY, _create_limiter_registry)
+
+
+def _create_limiter_registry(stale_registry):
+	"""
+	DESCRIPTION: Creates the limiters for this initialization of the script, with the limits of the registry it replaces
+	PARAMETERS: stale_registry (REQ, dict) - The registry from an earlier initialization of this script, or None
+	RETURNS: dict - The registry
+	"""
+	limiters = stale_registry.get('limiters', {}) if stale_registry is not None else {}
+	return {'limiters': dict((resource_name, ConcurrencyLimiter(resource_name, limiter.max_concurrent))
+								for resource_name, limiter in limiters.items())}
+
+
+def get_concurrency_limit_status():
+	"""
+	DESCRIPTION: Reports the limit and wait times of every resource that has been used or limited, to help size the limits
+	RETURNS: list - A dictionary per resource, see ConcurrencyLimiter.get_status
+	"""
+	limiters = _get_limiter_registry()['limiters']
+	return [limiters[resource_name].get_status() for resource_name in sorted(limiters.keys())]
+
+
+def get_task_metrics(pool_name, func):
+	"""
+	DESCRIPTION: Returns the metrics recorder for a function's tasks on a pool, creating it if it does not exist yet
+	PARAMETERS: pool_name (REQ, str) - The name of the shared pool, or None for a pool created for a single call
+				func (REQ, function) - The function being executed
+	RETURNS: TaskMetrics - The metrics recorder
+	"""
+	pool_name = pool_name if pool_name is not None else PER_CALL_POOL_NAME
+	function_path = General.Utilities.get_function_qualified_path(func)
+	metrics_key = (pool_name, function_path)
+	all_metrics = _get_metrics_registry()['metrics']
+	metrics = all_metrics.get(metrics_key)
+	if metrics is not None:
+		return metrics
+
+	with METRICS_LOCK:
+		metrics = all_metrics.get(metrics_key)
+		if metrics is None:
+			metrics = all_metrics[metrics_key] = TaskMetrics(pool_name, function_path)
+			while len(all_metrics) > MAX_TASK_METRICS:
+				all_metrics.popitem(last=False)
+		return metrics
+
+
+def reset_task_metrics():
+	"""
+	DESCRIPTION: Clears the task metrics for this project. They are also cleared whenever the project is saved.
+	"""
+	with METRICS_LOCK:
+		_get_metrics_registry()['metrics'].clear()
+
+
+def _get_metrics_registry():
+	"""
+	DESCRIPTION: Returns the registry of task metrics stored in the ignition globals. A new, empty registry is created
+				 for each initialization of this script, so metrics are not kept for functions that no longer exist.
+	RETURNS: dict - The registry, with the key 'metrics' (pool name and function path to TaskMetrics, oldest first)
+	"""
+	return _get_registry(TASK_METRICS_KEY, _create_metrics_registry)
+
+
+def _create_metrics_registry(stale_registry): # pylint: disable=unused-argument
+	"""
+	DESCRIPTION: Creates an empty registry of task metrics
+	PARAMETERS: stale_registry (REQ, dict) - The registry from an earlier initialization of this script, or None
+	RETURNS: dict - The registry
+	"""
+	return {'metrics': collections.OrderedDict()}
+
+
+def _get_task_metrics_snapshot():
+	"""
+	DESCRIPTION: Copies the task metrics, so they can be reported while new tasks are adding to them
+	RETURNS: list - The pool name and function path, and TaskMetrics, of each function, sorted
+	"""
+	with METRICS_LOCK:
+		return sorted(_get_metrics_registry()['metrics'].items())
+
+
+def _prepare_task(runnable, resource_name, metrics):
+	"""
+	DESCRIPTION: Wraps a runnable so it is measured, and holds a permit for the resource while it runs
+	PARAMETERS: runnable (REQ, Runnable) - The task to run
+				resource_name (REQ, str) - The name of the resource, or None to leave the task unlimited
+				metrics (REQ, TaskMetrics) - The recorder for the task's timings
+	RETURNS: Runnable - The task to submit
+	"""
+	if resource_name is not None:
+		runnable = ConcurrencyLimitedWrapper(runnable, limit_concurrency(resource_name))
+	return InstrumentedWrapper(runnable, metrics)
+
+
+def schedule_periodic_job(job_name, func, interval_seconds, initial_delay_seconds=0, fixed_rate=False, jitter_seconds=0,
+							skip_if_running=True, args=None, kwargs=None):
+	"""
+	DESCRIPTION: Runs a function periodically until it is cancelled or the project restarts.
+				 A job with the same name is replaced.
+	PARAMETERS: job_name (REQ, str) - The name of the job
+				func (REQ, function) - The function to run
+				interval_seconds (REQ, float) - The number of seconds between runs
+				initial_delay_seconds (OPT, float) - The number of seconds before the first run
+				fixed_rate (OPT, bool) - If true, runs start every interval_seconds regardless of how long they take,
+										 and runs the scheduler fell too far behind on are skipped, not caught up.
+										 If false, each run starts interval_seconds after the last one finished
+				jitter_seconds (OPT, float) - Up to this many seconds are randomly added to each run's start time,
+											  so jobs on many gateways do not all run at the same moment
+				skip_if_running (OPT, bool) - If true, a fixed rate run is skipped while the last run is still going
+				args (OPT, list) - The positional arguments to be passed to the function
+				kwargs (OPT, dict) - The keyword arguments to be passed to the function
+	RETURNS: PeriodicJob - The job
+
+	Example:
+		General.Multithreading.schedule_periodic_job("poll-devices", poll_devices, 30, jitter_seconds=5)
+	"""
+	if int(interval_seconds * 1000) < 1:
+		raise ValueError("interval_seconds must be at least 0.001 for periodic job %s" % job_name)
+
+	func = _resolve_function(func)
+	job = PeriodicJob(job_name, func, interval_seconds, fixed_rate, jitter_seconds, skip_if_running, args, kwargs)
+	with POOL_LOCK:
+		jobs = _get_pool_registry()['jobs']
+		previous_job = jobs.get(job_name)
+		if previous_job is not None:
+			previous_job.cancel()
+		jobs[job_name] = job
+
+	job.schedule(System.currentTimeMillis() + int(initial_delay_seconds * 1000))
+	return job
+
+
+def cancel_periodic_job(job_name):
+	"""
+	DESCRIPTION: Stops a periodic job from running again, without interrupting a run in progress
+	PARAMETERS: job_name (REQ, str) - The name of the job
+	RETURNS: bool - True if the job was found and cancelled
+	"""
+	with POOL_LOCK:
+		job = _get_pool_registry()['jobs'].pop(job_name, None)
+	if job is None:
+		return False
+	job.cancel()
+	return True
+
+
+def get_periodic_job_status():
+	"""
+	DESCRIPTION: Reports on every periodic job for this project
+	RETURNS: list - A dictionary per job, see PeriodicJob.get_status
+	"""
+	jobs = _get_pool_registry()['jobs']
+	return [jobs[job_name].get_status() for job_name in sorted(jobs.keys())]
+
+
+
+def _await_futures(futures, timeout_seconds, partial_results=False):
+	"""
+	DESCRIPTION: Waits for every future to finish, sharing a single deadline between all of them
+	PARAMETERS: futures (REQ, list[Future]) - The futures to wait on
+				timeout_seconds (REQ, int) - The maximum number of seconds to wait for all of the futures
+				partial_results (OPT, bool) - If true, futures that do not finish in time are cancelled and reported
+											  instead of raising a MultiThreadTimeoutError
+	RETURNS: tuple - Information on any exception that escaped a task, and the indexes of the futures that timed out
+	"""
+	exceptions = []
+	timed_out_indexes = []
+	deadline = System.currentTimeMillis() + int(timeout_seconds * 1000)
+	for index, future in enumerate(futures):
+		remaining_millis = max(deadline - System.currentTimeMillis(), 0)
+		try:
+			future.get(remaining_millis, TimeUnit.MILLISECONDS)
+		except (TimeoutException, CancellationException):
+			#NOTE: A cancelled future here was cancelled by its own task deadline
+			if not partial_results:
+				for pending_future in futures:
+					pending_future.cancel(True)
+				raise MultiThreadTimeoutError("Not all tasks completed within " + str(timeout_seconds) + " seconds")
+			future.cancel(True)
+			timed_out_indexes.append(index)
+		except ExecutionException as e:
+			exceptions.append({'exception': e.getCause(), 'traceback': traceback.format_exc()})
+	return exceptions, timed_out_indexes
+
+
+def _await_futures_fail_fast(futures, completion_queue, results_map, timeout_seconds, partial_results=False):
+	"""
+	DESCRIPTION: Waits for the futures in the order they complete, cancelling every outstanding task and raising
+				 as soon as one of them fails
+	PARAMETERS: futures (REQ, list[Future]) - The futures to wait on
+				completion_queue (REQ, BlockingQueue) - The queue the tasks put their index on once they complete
+				results_map (REQ, ConcurrentHashMap) - The map the tasks capture their results in
+				timeout_seconds (REQ, int) - The maximum number of seconds to wait for all of the futures
+				partial_results (OPT, bool) - If true, futures that do not finish in time are cancelled and reported
+											  instead of raising a MultiThreadTimeoutError
+	RETURNS: tuple - An empty list of exceptions, and the indexes of the futures that timed out
+	"""
+	timed_out_indexes = []
+	deadline = System.currentTimeMillis() + int(timeout_seconds * 1000)
+	try:
+		for _ in range(len(futures)):
+			remaining_millis = max(deadline - System.currentTimeMillis(), 0)
+			index = completion_queue.poll(remaining_millis, TimeUnit.MILLISECONDS)
+			if index is None:
+				if not partial_results:
+					raise MultiThreadTimeoutError("Not all tasks completed within " + str(timeout_seconds) + " seconds")
+				#NOTE: Everything that has not completed by now has timed out
+				timed_out_indexes.extend(i for i, future in enumerate(futures) if not future.isDone())
+				break
+
+			future = futures[index]
+			if future.isCancelled():
+				#NOTE: The only thing that cancels a task while we are waiting is its own task deadline
+				if not partial_results:
+					raise MultiThreadTimeoutError("Task %d did not complete within its deadline" % index)
+				timed_out_indexes.append(index)
+				continue
+
+			try:
+				future.get()
+			except ExecutionException as e:
+				raise MultiThreadedException([{'exception': e.getCause(), 'traceback': traceback.format_exc()}])
+			_unwrap_result(results_map.get(index))
+	except (Exception, JavaException):
+		#NOTE: Stop the rest of the batch, there is no use in finishing it once any task has failed
+		for future in futures:
+			future.cancel(True)
+		raise
+
+	for index in timed_out_indexes:
+		futures[index].cancel(True)
+	return [], timed_out_indexes
+
+
+def _resolve_function(func):
+	"""
+	DESCRIPTION: Returns the function to execute, resolving it first if it was passed by name
+	PARAMETERS: func (REQ, function|str) - The function, or the name of the function
+	RETURNS: function - The function to execute
+	"""
+	#NOTE: If our function showed up as a name, we would have to use the following line to get the actual function
+	if not callable(func):
+		if General.Utilities.is_valid_variable_name(func):
+			func = literal_eval(func)
+	return func
+
+
+def _get_param_list(kwargs_list, args_list):
+	"""
+	DESCRIPTION: Determines which parameter list to use and validates the input
+	PARAMETERS: kwargs_list (REQ, list) - A list of dictionaries with keyword arguments, or None
+				args_list (REQ, list) - A list of tuples/lists with positional arguments, or None
+	RETURNS: tuple - The parameter list, and whether its entries are keyword arguments
+	"""
+	if kwargs_list is not None and args_list is not None:
+		raise ValueError("Cannot specify both kwargs_list and args_list. Choose one.")
+	elif kwargs_list is not None:
+		return kwargs_list, True
+	elif args_list is not None:
+		return args_list, False
+	# If no parameters provided, execute function once with no arguments
+	return [None], True
+
+
+def _create_wrapper(func, index, results_map, params, use_kwargs):
+	"""
+	DESCRIPTION: Creates the ResultCapturingWrapper for a single entry of the parameter list
+	RETURNS: ResultCapturingWrapper - The runnable to submit to an executor
+	"""
+	if use_kwargs:
+		return ResultCapturingWrapper(func, index, results_map, kwargs=params)
+	return ResultCapturingWrapper(func, index, results_map, args=params)
+
+
+def _get_executor(func, max_threads, pool_name, exception_handler=None):
+	"""
+	DESCRIPTION: Returns the executor to run tasks on, either a shared pool or a new pool owned by the caller
+	PARAMETERS: func (REQ, function) - The function being executed, used to name the threads of a new pool
+				max_threads (REQ, int) - The number of threads for a new pool
+				pool_name (REQ, str) - The name of a shared pool, or None to create a new pool
+				exception_handler (OPT, Thread.UncaughtExceptionHandler) - The handler for a new pool's threads
+	RETURNS: ExecutorService - The executor. The caller must shut it down if pool_name is None.
+	"""
+	if pool_name is not None:
+		#NOTE: A shared pool outlives the call, so it is never shut down by it
+		return get_executor_pool(pool_name)
+
+	exception_handler = exception_handler if exception_handler is not None else PoolExceptionHandler()
+	function_name = General.Utilities.get_function_qualified_path(func)
+	return Executors.newFixedThreadPool(max_threads, AsyncThreadFactory(function_name, exception_handler))
+
+
+def _unwrap_result(result):
+	"""
+	DESCRIPTION: Returns a result captured by a ResultCapturingWrapper, raising the exception if the task failed
+	PARAMETERS: result (REQ, obj) - The captured result
+	RETURNS: obj - The result of the function execution
+	"""
+	if isinstance(result, Exception):
+		raise result
+	elif isinstance(result, dict) and 'exception' in result:
+		# Raise a new exception that preserves the original traceback
+		raise ThreadExecutionException(result['exception'], result['traceback'], result['thread_index'])
+	return result
+
+
+def wait_for_async_execution(func, kwargs_list=None, args_list=None, max_threads=-1, timeout_seconds=10,
+								pool_name=None, task_timeout_seconds=None, partial_results=False, fail_fast=False,
+								resource_name=None):
+	"""
+	DESCRIPTION: Executes the function func asynchronously with the parameters and returns all results
+	PARAMETERS: func (REQ, function) - The function to be executed
+				kwargs_list (OPT, list) - A list of dictionaries with keyword arguments to be passed to the function
+				args_list (OPT, list) - A list of tuples/lists with positional arguments to be passed to the function
+				max_threads (OPT, int) - The maximum number of threads to be used.
+										 If -1, it will just execute with as many threads as it can
+				timeout_seconds (OPT, int) - The maximum number of seconds to wait for the threads to finish
+				pool_name (OPT, str) - The name of a shared executor pool to run on instead of creating a new pool.
+									   When set, max_threads is ignored in favor of the pool's own size
+				task_timeout_seconds (OPT, int) - The maximum number of seconds each task may run once it has started
+				partial_results (OPT, bool) - If true, tasks that do not complete in time are cancelled and returned
+											  as TaskTimedOut markers, instead of raising a MultiThreadTimeoutError
+				fail_fast (OPT, bool) - If true, the first exception raised by any task cancels the remaining tasks
+										and is raised right away, instead of waiting for the whole batch
+				resource_name (OPT, str) - The name of a resource each task must hold a permit for while it runs,
+										   see set_concurrency_limit
+	RETURNS: list - Results from all function executions in the same order as input parameters
+	"""
+	func = _resolve_function(func)
+	param_list, use_kwargs = _get_param_list(kwargs_list, args_list)
+
+	#NOTE: If the number of threads is -1, we will use the number of parameter options provided
+	if max_threads == -1:
+		max_threads = len(param_list)
+
+	#NOTE: Define containers for exceptions and results
+	exceptions = []
+	# Use Java ConcurrentHashMap for thread-safe result storage
+	results_map = ConcurrentHashMap()
+
+	class AsyncExceptionHandler(Thread.UncaughtExceptionHandler):
+		""" Handles uncaught exceptions in threads using the native Java UncaughtExceptionHandler interface."""
+
+		#NOTE: This is a java function, so we have to ignore the invalid name
+		def uncaughtException(self, thread, exception):  # pylint: disable=invalid-name
+			# Capture more detailed exception information
+			exception_info = {
+				'thread': thread,
+				'exception': exception,
+				'thread_name': thread.getName(),
+				'traceback': traceback.format_exc()
+			}
+			exceptions.append(exception_info)
+			LOGGER.error("Uncaught exception in thread %s: %s" % (thread.getName(), traceback.format_exc()))
+
+	#NOTE: Execute the function in parallel with at most the number of threads in the pool,
+	#NOTE: and wait for all of them to finish
+	executor = _get_executor(func, max_threads, pool_name, AsyncExceptionHandler())
+
+	# Submit all tasks with their respective parameters
+	completion_queue = LinkedBlockingQueue() if fail_fast else None
+	metrics = get_task_metrics(pool_name, func)
+	futures = []
+	for i in range(len(param_list)):
+		wrapper = _prepare_task(_create_wrapper(func, i, results_map, param_list[i], use_kwargs), resource_name, metrics)
+		futures.append(_submit_task(executor, wrapper, task_timeout_seconds, i, completion_queue)[0])
+
+	if pool_name is None:
+		executor.shutdown()
+
+	try:
+		if fail_fast:
+			task_exceptions, timed_out_indexes = _await_futures_fail_fast(futures, completion_queue, results_map,
+																			timeout_seconds, partial_results)
+		else:
+			task_exceptions, timed_out_indexes = _await_futures(futures, timeout_seconds, partial_results)
+		exceptions.extend(task_exceptions)
+	finally:
+		if pool_name is None:
+			executor.shutdownNow()  # Force shutdown any remaining tasks
+
+	# If there were exceptions during execution, raise them
+	if exceptions:
+		raise MultiThreadedException(exceptions)
+
+	#NOTE: Timed out tasks are marked without touching the results map, since a cancelled task that ignores the
+	#NOTE: interrupt can still write its own result there after it was reported as timed out
+	timed_out = set(timed_out_indexes)
+
+	# Convert results map back to ordered list
+	return [TaskTimedOut(i) if i in timed_out else _unwrap_result(results_map.get(i)) for i in range(len(param_list))]
+
+
+def iter_async_execution(func, kwargs_list=None, args_list=None, max_threads=-1, timeout_seconds=10, pool_name=None,
+							resource_name=None):
+	"""
+	DESCRIPTION: Executes the function func asynchronously with the parameters, yielding each result as soon as its
+				 task completes instead of waiting for all of them. If the caller stops iterating early, the remaining
+				 tasks are cancelled.
+	PARAMETERS: func (REQ, function) - The function to be executed
+				kwargs_list (OPT, list) - A list of dictionaries with keyword arguments to be passed to the function
+				args_list (OPT, list) - A list of tuples/lists with positional arguments to be passed to the function
+				max_threads (OPT, int) - The maximum number of threads to be used.
+										 If -1, it will just execute with as many threads as it can
+				timeout_seconds (OPT, int) - The maximum number of seconds to wait for all of the threads to finish
+				pool_name (OPT, str) - The name of a shared executor pool to run on instead of creating a new pool.
+									   When set, max_threads is ignored in favor of the pool's own size
+				resource_name (OPT, str) - The name of a resource each task must hold a permit for while it runs,
+										   see set_concurrency_limit
+	RETURNS: generator - Yields (index, result) tuples in completion order, where index is the position in the
+						 parameter list. A failed task raises a ThreadExecutionException when it is reached.
+
+	Example:
+		for index, result in General.Multithreading.iter_async_execution(read_device, args_list=devices):
+			process(devices[index], result)
+	"""
+	func = _resolve_function(func)
+	param_list, use_kwargs = _get_param_list(kwargs_list, args_list)
+
+	#NOTE: If the number of threads is -1, we will use the number of parameter options provided
+	if max_threads == -1:
+		max_threads = len(param_list)
+
+	results_map = ConcurrentHashMap()
+	executor = _get_executor(func, max_threads, pool_name)
+
+	#NOTE: The completion service queues each future as its task finishes, carrying the task index as its value
+	completion_service = ExecutorCompletionService(executor)
+	metrics = get_task_metrics(pool_name, func)
+	futures = []
+	try:
+		for i in range(len(param_list)):
+			wrapper = _prepare_task(_create_wrapper(func, i, results_map, param_list[i], use_kwargs), resource_name,
+									metrics)
+			try:
+				futures.append(completion_service.submit(wrapper, i))
+			except RejectedExecutionException:
+				_record_rejection(wrapper)
+				raise
+
+		deadline = System.currentTimeMillis() + int(timeout_seconds * 1000)
+		for _ in range(len(futures)):
+			remaining_millis = max(deadline - System.currentTimeMillis(), 0)
+			future = completion_service.poll(remaining_millis, TimeUnit.MILLISECONDS)
+			if future is None:
+				raise MultiThreadTimeoutError("Not all tasks completed within " + str(timeout_seconds) + " seconds")
+
+			try:
+				index = future.get()
+			except ExecutionException as e:
+				raise MultiThreadedException([{'exception': e.getCause(), 'traceback': traceback.format_exc()}])
+
+			#NOTE: Drop the result from the map once it is handed off, so memory does not grow with the batch
+			yield index, _unwrap_result(results_map.remove(index))
+	finally:
+		#NOTE: Runs on completion, on an exception, and when the caller closes the generator early
+		for future in futures:
+			future.cancel(True)
+		if pool_name is None:
+			executor.shutdownNow()
+
+
+def get_chunk_size(item_count, thread_count):
+	"""
+	DESCRIPTION: Picks a chunk size that gives each thread a few chunks, so per-task overhead stays small
+				 while a slow chunk still does not leave the other threads idle
+	PARAMETERS: item_count (REQ, int) - The number of items to be processed
+				thread_count (REQ, int) - The number of threads that will process them
+	RETURNS: int - The number of items per chunk
+	"""
+	chunk_count = max(thread_count, 1) * CHUNKS_PER_THREAD
+	return max(int(Math.ceil(float(item_count) / chunk_count)), 1)
+
+
+def map_chunked(func, kwargs_list=None, args_list=None, chunk_size=None, max_threads=-1, timeout_seconds=10,
+				pool_name=None, resource_name=None):
+	"""
+	DESCRIPTION: Executes the function func asynchronously for many small inputs, running a chunk of the parameter
+				 list in each task instead of one task per entry, and returns all results
+	PARAMETERS: func (REQ, function) - The function to be executed
+				kwargs_list (OPT, list) - A list of dictionaries with keyword arguments to be passed to the function
+				args_list (OPT, list) - A list of tuples/lists with positional arguments to be passed to the function
+				chunk_size (OPT, int) - The number of entries to run in each task.
+										If omitted, it is picked from the number of entries and threads
+				max_threads (OPT, int) - The maximum number of threads to be used.
+										 If -1, it will use the default pool size
+				timeout_seconds (OPT, int) - The maximum number of seconds to wait for the threads to finish
+				pool_name (OPT, str) - The name of a shared executor pool to run on instead of creating a new pool.
+									   When set, max_threads is ignored in favor of the pool's own size
+				resource_name (OPT, str) - The name of a resource each chunk must hold a permit for while it runs,
+										   see set_concurrency_limit
+	RETURNS: list - Results from all function executions in the same order as input parameters
+	"""
+	func = _resolve_function(func)
+	param_list, use_kwargs = _get_param_list(kwargs_list, args_list)
+	if not param_list:
+		return []
+
+	if pool_name is not None:
+		thread_count = get_pool_thread_count(get_executor_pool(pool_name))
+	elif max_threads == -1:
+		thread_count = DEFAULT_POOL_THREADS
+	else:
+		thread_count = max_threads
+
+	if chunk_size is None:
+		chunk_size = get_chunk_size(len(param_list), thread_count)
+	chunk_starts = range(0, len(param_list), chunk_size)
+
+	#NOTE: There is no need for more threads than there are chunks
+	results_map = ConcurrentHashMap()
+	executor = _get_executor(func, min(thread_count, len(chunk_starts)), pool_name)
+
+	metrics = get_task_metrics(pool_name, func)
+	futures = []
+	for start_index in chunk_starts:
+		params_chunk = param_list[start_index:start_index + chunk_size]
+		wrapper = ChunkCapturingWrapper(func, start_index, params_chunk, results_map, use_kwargs)
+		futures.append(_submit_task(executor, _prepare_task(wrapper, resource_name, metrics))[0])
+
+	if pool_name is None:
+		executor.shutdown()
+
+	try:
+		exceptions = _await_futures(futures, timeout_seconds)[0]
+	finally:
+		if pool_name is None:
+			executor.shutdownNow()  # Force shutdown any remaining tasks
+
+	if exceptions:
+		raise MultiThreadedException(exceptions)
+
+	# Flatten the results of every chunk back into input order
+	return [_unwrap_result(results_map.get(i)) for i in range(len(param_list))]
+
+
+def submit(func, args=None, kwargs=None, timeout_seconds=None, pool_name=DEFAULT_POOL_NAME, resource_name=None):
+	"""
+	DESCRIPTION: Starts the function func on a shared executor pool and returns immediately
+	PARAMETERS: func (REQ, function) - The function to be executed
+				args (OPT, list) - The positional arguments to be passed to the function
+				kwargs (OPT, dict) - The keyword arguments to be passed to the function
+				timeout_seconds (OPT, int) - The maximum number of seconds the task may run once it has started,
+											 after which it is cancelled
+				pool_name (OPT, str) - The name of the shared executor pool to run on
+				resource_name (OPT, str) - The name of a resource the task must hold a permit for while it runs,
+										   see set_concurrency_limit
+	RETURNS: TaskFuture - A handle used to wait for the result of the task, or to cancel it
+
+	Example:
+		future = General.Multithreading.submit(read_device, args=[device], timeout_seconds=5)
+		value = future.result()
+	"""
+	func = _resolve_function(func)
+	results_map = ConcurrentHashMap()
+	wrapper = _prepare_task(ResultCapturingWrapper(func, 0, results_map, args=args, kwargs=kwargs), resource_name,
+							get_task_metrics(pool_name, func))
+	future, deadline_wrapper = _submit_task(get_executor_pool(pool_name), wrapper, timeout_seconds)
+	return TaskFuture(future, results_map, deadline_wrapper)
+
+
+class PipelineStage(object):
+	"""
+	DESCRIPTION: A single stage of a Pipeline, with its own workers, a bounded input queue and throughput counters
+	"""
+
+	def __init__(self, func, workers, name, queue_size):
+		"""
+		DESCRIPTION: This function initializes the PipelineStage class
+		"""
+		self.func = func
+		self.workers = workers
+		self.name = name
+		self.input_queue = ArrayBlockingQueue(queue_size)
+		self.output_queue = None
+		self.reset()
+
+	def reset(self):
+		"""
+		DESCRIPTION: Resets the counters of the stage before a run
+		"""
+		self.input_queue.clear()
+		self.remaining_workers = AtomicInteger(self.workers)
+		self.items_in = AtomicLong()
+		self.items_out = AtomicLong()
+		self.busy_nanos = AtomicLong()
+		self.finished_millis = None
+
+	def get_status(self, started_millis):
+		"""
+		DESCRIPTION: Reports the throughput of the stage
+		PARAMETERS: started_millis (REQ, int) - The time the pipeline run started, in epoch milliseconds
+		RETURNS: dict - The stage name, worker count, item counts, queue size, busy and elapsed time and throughput
+		"""
+		finished_millis = self.finished_millis if self.finished_millis is not None else System.currentTimeMillis()
+		elapsed_millis = max(finished_millis - started_millis, 1)
+		return {
+			'stage_name': self.name,
+			'workers': self.workers,
+			'items_in': self.items_in.get(),
+			'items_out': self.items_out.get(),
+			'queue_size': self.input_queue.size(),
+			'busy_millis': self.busy_nanos.get() / 1000000,
+			'elapsed_millis': elapsed_millis,
+			'items_per_second': self.items_in.get() * 1000.0 / elapsed_millis
+		}
+
+
+class PipelineStageWorker(Runnable):
+	"""
+	DESCRIPTION: A java.lang.Runnable that takes items off a stage's input queue, runs the stage function on them,
+				 and passes the results on to the next stage until the end of the stream is reached
+	"""
+
+	def __init__(self, pipeline, stage):
+		"""
+		DESCRIPTION: This function initializes the PipelineStageWorker class
+		"""
+		self.pipeline = pipeline
+		self.stage = stage
+
+	def run(self):
+		"""
+		DESCRIPTION: This function processes items until the end of the stream, or until the pipeline fails
+		"""
+		stage = self.stage
+		try:
+			while not self.pipeline.failed:
+				item = stage.input_queue.take()
+				if item is END_OF_STREAM:
+					#NOTE: Put the marker back so the other workers of this stage see it too
+					stage.input_queue.put(END_OF_STREAM)
+					break
+
+				stage.items_in.incrementAndGet()
+				start_nanos = System.nanoTime()
+				result = stage.func(item)
+				stage.busy_nanos.addAndGet(System.nanoTime() - start_nanos)
+
+				#NOTE: A stage returns None to drop an item
+				if result is not None:
+					stage.items_out.incrementAndGet()
+					if stage.output_queue is not None and not self.pipeline.offer(stage.output_queue, result):
+						break
+		except InterruptedException:
+			#NOTE: The pipeline was stopped, either by a failure in another stage or by a timeout
+			return
+		#NOTE: Every error is handed to the pipeline, which stops the other stages and raises it from run
+		except (Exception, JavaException) as e: # pylint: disable=broad-except
+			if not self.pipeline.failed:
+				LOGGER.warn("Exception in pipeline stage %s: %s" % (stage.name, traceback.format_exc()))
+				self.pipeline.fail({'exception': e, 'traceback': traceback.format_exc(), 'stage_name': stage.name})
+		finally:
+			#NOTE: The last worker of a stage to finish passes the end of the stream on to the next stage, even after
+			#NOTE: a failure, so a worker that was not interrupted is never left waiting for more items
+			if stage.remaining_workers.decrementAndGet() == 0:
+				stage.finished_millis = System.currentTimeMillis()
+				if stage.output_queue is not None:
+					self.pipeline.end_stream(stage.output_queue)
+
+
+class Pipeline(object):
+	"""
+	DESCRIPTION: A chain of stages that stream items through bounded queues, each stage with its own worker threads.
+				 When a stage falls behind, the stages feeding it block, so memory use stays flat however large the
+				 input is.
+
+	Example:
+		pipeline = General.Multithreading.Pipeline("historian-export")
+		pipeline.add_stage(transform_row, workers=4).add_stage(write_row, workers=2)
+		stage_status = pipeline.run(read_rows())
+	"""
+
+	def __init__(self, name, queue_size=PIPELINE_QUEUE_SIZE):
+		"""
+		DESCRIPTION: This function initializes the Pipeline class
+		PARAMETERS: name (REQ, str) - The name of the pipeline, used to name its threads
+					queue_size (OPT, int) - The default number of items each stage may have waiting
+		"""
+		self.name = name
+		self.queue_size = queue_size
+		self.stages = []
+		self.errors = []
+		self.failed = False
+		self.executor = None
+		self.deadline = None
+		self.started_millis = None
+
+	def add_stage(self, func, workers=1, name=None, queue_size=None):
+		"""
+		DESCRIPTION: Adds a stage to the end of the pipeline
+		PARAMETERS: func (REQ, function) - Called with each item, and returns the item for the next stage,
+										   or None to drop it
+					workers (OPT, int) - The number of threads for the stage
+					name (OPT, str) - The name of the stage, defaults to the function path
+					queue_size (OPT, int) - The number of items the stage may have waiting
+		RETURNS: Pipeline - The pipeline, so stages can be chained
+		"""
+		func = _resolve_function(func)
+		if name is None:
+			name = General.Utilities.get_function_qualified_path(func)
+		queue_size = queue_size if queue_size is not None else self.queue_size
+		stage = PipelineStage(func, workers, name, queue_size)
+		if self.stages:
+			self.stages[-1].output_queue = stage.input_queue
+		self.stages.append(stage)
+		return self
+
+	def fail(self, error_info):
+		"""
+		DESCRIPTION: Records a failure, and stops every stage of the pipeline
+		PARAMETERS: error_info (REQ, dict) - The exception, traceback and stage name of the failure
+		"""
+		self.errors.append(error_info)
+		self.failed = True
+		if self.executor is not None:
+			self.executor.shutdownNow()
+
+	def offer(self, queue, item):
+		"""
+		DESCRIPTION: Puts an item on a queue, waiting for room while the pipeline is still running
+		PARAMETERS: queue (REQ, BlockingQueue) - The queue to put the item on
+					item (REQ, obj) - The item
+		RETURNS: bool - True if the item was queued, False if the pipeline failed or timed out first
+		"""
+		while not self.failed:
+			if queue.offer(item, PIPELINE_POLL_MILLIS, TimeUnit.MILLISECONDS):
+				return True
+			if self.deadline is not None and System.currentTimeMillis() > self.deadline:
+				return False
+		return False
+
+	def end_stream(self, queue):
+		"""
+		DESCRIPTION: Puts the end of the stream marker on a queue. Once the pipeline has failed or timed out, the
+					 items still waiting are dropped to make room for it, since nothing is left to process them.
+		PARAMETERS: queue (REQ, BlockingQueue) - The queue to put the marker on
+		"""
+		if not self.offer(queue, END_OF_STREAM):
+			queue.clear()
+			queue.offer(END_OF_STREAM)
+
+	def run(self, source, timeout_seconds=None):
+		"""
+		DESCRIPTION: Streams every item of the source through the pipeline, and waits for the last stage to finish
+		PARAMETERS: source (REQ, iterable) - The items to process, any None items are skipped.
+											 A generator keeps the input from ever being held in memory.
+					timeout_seconds (OPT, int) - The maximum number of seconds for the whole run
+		RETURNS: list - The status of each stage, see get_stage_status
+		"""
+		if not self.stages:
+			raise ValueError("Pipeline %s has no stages" % self.name)
+
+		for stage in self.stages:
+			stage.reset()
+		self.errors = []
+		self.failed = False
+		self.started_millis = System.currentTimeMillis()
+		self.deadline = None if timeout_seconds is None else self.started_millis + int(timeout_seconds * 1000)
+
+		worker_count = sum(stage.workers for stage in self.stages)
+		self.executor = Executors.newFixedThreadPool(worker_count, AsyncThreadFactory(
+			"%s-%s" % (MULTITHREADING_SYSTEM_NAME, self.name), PoolExceptionHandler()))
+		for stage in self.stages:
+			for _ in range(stage.workers):
+				self.executor.execute(PipelineStageWorker(self, stage))
+		self.executor.shutdown()
+
+		try:
+			first_queue = self.stages[0].input_queue
+			for item in source:
+				if item is not None and not self.offer(first_queue, item):
+					break
+			self.end_stream(first_queue)
+
+			remaining_millis = None if self.deadline is None else max(self.deadline - System.currentTimeMillis(), 0)
+			if remaining_millis is None:
+				while not self.executor.awaitTermination(PIPELINE_POLL_MILLIS, TimeUnit.MILLISECONDS):
+					pass
+			elif not self.executor.awaitTermination(remaining_millis, TimeUnit.MILLISECONDS):
+				raise MultiThreadTimeoutError("Pipeline %s did not complete within %s seconds" % (self.name, timeout_seconds))
+		finally:
+			self.executor.shutdownNow()
+
+		if self.errors:
+			raise MultiThreadedException(self.errors)
+		return self.get_stage_status()
+
+	def get_stage_status(self):
+		"""
+		DESCRIPTION: Reports the throughput of every stage, during or after a run
+		RETURNS: list - A dictionary per stage, with its name, worker count, items in and out, waiting items,
+						busy and elapsed milliseconds, and items processed per second
+		"""
+		started_millis = self.started_millis if self.started_millis is not None else System.currentTimeMillis()
+		return [stage.get_status(started_millis) for stage in self.stages]
+
+
+def run_fork_join(func, args=None, kwargs=None, timeout_seconds=None):
+	"""
+	DESCRIPTION: Executes a recursive, divide-and-conquer function on the shared work-stealing pool, and returns its
+				 result. The function can split its work with fork and join, or fork_join_all, without blocking the
+				 worker it runs on.
+	PARAMETERS: func (REQ, function) - The function to be executed
+				args (OPT, list) - The positional arguments to be passed to the function
+				kwargs (OPT, dict) - The keyword arguments to be passed to the function
+				timeout_seconds (OPT, int) - The maximum number of seconds to wait for the whole job
+	RETURNS: obj - The result of the function
+
+	Example:
+		def count_tags(path):
+			results = system.tag.browse(path).getResults()
+			folders = [str(result['fullPath']) for result in results if result['hasChildren']]
+			return len(results) + sum(General.Multithreading.fork_join_all(count_tags, [(folder,) for folder in folders]))
+
+		General.Multithreading.run_fork_join(count_tags, args=["[default]"])
+	"""
+	func = _resolve_function(func)
+	future = get_fork_join_pool().submit(RecursiveFunctionTask(func, args, kwargs))
+	try:
+		if timeout_seconds is None:
+			return future.get()
+		return future.get(int(timeout_seconds * 1000), TimeUnit.MILLISECONDS)
+	except TimeoutException:
+		future.cancel(True)
+		raise MultiThreadTimeoutError("Fork join job did not complete within " + str(timeout_seconds) + " seconds")
+	except ExecutionException as e:
+		raise MultiThreadedException([{'exception': e.getCause(), 'traceback': traceback.format_exc()}])
+
+
+def fork(func, *args, **kwargs):
+	"""
+	DESCRIPTION: Starts a subtask from inside a task running on the fork join pool
+	PARAMETERS: func (REQ, function) - The function to be executed, followed by its arguments
+	RETURNS: RecursiveFunctionTask - The forked task, pass it to join to get its result
+	"""
+	if not ForkJoinTask.inForkJoinPool():
+		raise ValueError("fork can only be called from a task started with run_fork_join")
+	return RecursiveFunctionTask(func, args, kwargs).fork()
+
+
+def join(task):
+	"""
+	DESCRIPTION: Waits for a forked subtask and returns its result. While it waits, the worker runs other tasks.
+	PARAMETERS: task (REQ, RecursiveFunctionTask) - A task returned by fork
+	RETURNS: obj - The result of the subtask
+	"""
+	return task.join()
+
+
+def fork_join_all(func, args_list):
+	"""
+	DESCRIPTION: Runs a subtask for each entry of the parameter list from inside a task running on the fork join
+				 pool, and returns their results
+	PARAMETERS: func (REQ, function) - The function to be executed
+				args_list (REQ, list) - A list of tuples/lists with positional arguments to be passed to the function
+	RETURNS: list - The results of the subtasks, in the same order as the parameter list
+	"""
+	if not ForkJoinTask.inForkJoinPool():
+		raise ValueError("fork_join_all can only be called from a task started with run_fork_join")
+	tasks = [RecursiveFunctionTask(func, args) for args in args_list]
+	ForkJoinTask.invokeAll(tasks)
+	return [task.join() for task in tasks]
+
+
+def get_task_metrics_dataset():
+	"""
+	DESCRIPTION: Reports the task metrics of every function on every pool, along with the current queue depth and
+				 active thread count of the pool itself
+	RETURNS: dataset - A row per pool and function, see TaskMetrics.get_status for the columns. The pool_queue_size
+					   and pool_active_count columns are empty for pools created for a single call.
+	"""
+	pool_status = dict((status['pool_name'], status) for status in get_executor_pool_status())
+	rows = []
+	for _, metrics in _get_task_metrics_snapshot():
+		row = metrics.get_status()
+		row['pool_queue_size'] = pool_status.get(row['pool_name'], {}).get('queue_size')
+		row['pool_active_count'] = pool_status.get(row['pool_name'], {}).get('active_count')
+		rows.append(row)
+
+	headers = ['pool_name', 'function_path', 'submitted_count', 'rejected_count', 'started_count', 'completed_count',
+				'active_count', 'average_wait_millis', 'max_wait_millis', 'p95_wait_millis', 'average_run_millis',
+				'max_run_millis', 'p95_run_millis', 'pool_queue_size', 'pool_active_count']
+	return system.dataset.toDataSet(headers, [[row[header] for header in headers] for row in rows])
+
+
+def get_task_latency_histogram_dataset():
+	"""
+	DESCRIPTION: Reports the wait and run time histograms of every function on every pool
+	RETURNS: dataset - A row per pool, function and bucket, with the bucket's upper bound in milliseconds
+					   (empty for the overflow bucket) and the number of waits and runs that fell in it
+	"""
+	upper_bounds = LATENCY_BUCKETS_MILLIS + [None]
+
+	rows = []
+	for _, metrics in _get_task_metrics_snapshot():
+		for bucket_index, upper_bound in enumerate(upper_bounds):
+			rows.append([metrics.pool_name, metrics.function_path, upper_bound,
+						metrics.wait_histogram.get(bucket_index), metrics.run_histogram.get(bucket_index)])
+
+	headers = ['pool_name', 'function_path', 'upper_bound_millis', 'wait_count', 'run_count']
+	return system.dataset.toDataSet(headers, rows)
+
+
+def publish_task_metrics(tag_folder="[default]Multithreading/Metrics"):
+	"""
+	DESCRIPTION: Writes the task metrics, latency histograms and pool status to dataset memory tags for dashboards,
+				 creating the tags if they do not exist. Schedule it with schedule_periodic_job to keep them current.
+	PARAMETERS: tag_folder (OPT, str) - The tag folder to write the tags to
+	"""
+	pool_status = get_executor_pool_status()
+	pool_headers = ['pool_name', 'max_threads', 'thread_count', 'active_count', 'queue_size']
+	tag_values = {
+		'TaskMetrics': get_task_metrics_dataset(),
+		'TaskLatencyHistogram': get_task_latency_histogram_dataset(),
+		'PoolStatus': system.dataset.toDataSet(pool_headers, [[status[header] for header in pool_headers]
+																for status in pool_status])
+	}
+
+	tag_names = sorted(tag_values.keys())
+	tag_paths = ['%s/%s' % (tag_folder, tag_name) for tag_name in tag_names]
+	missing_tags = [{'name': tag_name, 'tagType': 'AtomicTag', 'valueSource': 'memory', 'dataType': 'DataSet'}
+					for tag_name, tag_path in zip(tag_names, tag_paths) if not system.tag.exists(tag_path)]
+	if missing_tags:
+		system.tag.configure(tag_folder, missing_tags, 'm')
+	system.tag.writeBlocking(tag_paths, [tag_values[tag_name] for tag_name in tag_names])
@@ -9,24 +9,28 @@ import json
 
 LOGGER = system.util.getLogger("General.Queries")
 
-def run_named_query(path, params=None, as_json=True):
+def run_named_query(path, params=None, as_json=True, resource_name=None, columnar=False, lazy=False):
 	"""
 	DESCRIPTION: runs a named query provided parameters and a path, returns response in JSON
 	PARAMETERS: path (REQ, string): path to the named query to be run
 				params (OPT, dict): parameters for the query to use
 				as_json (OPT, bool): flag for return obj type (True=JSON, False=Dataset)
+				resource_name (OPT, string): the concurrency limit to run the query under, like a database name.
+											 If omitted the query is not limited
+				columnar (OPT, bool): with as_json, return a dict of column lists instead of a list of rows
+				lazy (OPT, bool): with as_json, return a read-only General.Conversion.DatasetView that reads rows
+								  from the dataset on demand, instead of building the list of rows
 	RETURNS: dict: response from the named query or dataset if as_json is False
 	"""
 	project = system.project.getProjectName()
 	params = {} if not params else params
 	try:
-		try: 
-			dataset = system.db.runNamedQuery(path, params)
-		except java.lang.ClassCastException: 
-			dataset = system.db.runNamedQuery(project, path, params)
+		dataset = execute_named_query(project, path, params, resource_name)
 		
+		if as_json and lazy:
+			return General.Conversion.convert_dataset_to_view(dataset)
 		if as_json:
-			return General.Conversion.convert_dataset_to_list(dataset)
+			return General.Conversion.convert_dataset_to_list(dataset, columnar=columnar)
 		else:
 			return dataset
 
@@ -36,21 +40,20 @@ def run_named_query(path, params=None, as_json=True):
 		raise General.Errors.ExceptionWithDetails("Error getting named query at path: %s, with params: %s" 
 											% (path, params), LOGGER, e)
 
-def run_scalar_named_query_json(path, params=None):
+def run_scalar_named_query_json(path, params=None, resource_name=None):
 	"""
 	DESCRIPTION: runs a scalar named query provided parameters and a path, returns response in JSON
 	PARAMETERS: path (REQ, string): path to the named query to be run
 				as_json (OPT, bool): flag for return obj type (True=JSON, False=Dataset)
 				params (OPT, dict): parameters for the query to use
+				resource_name (OPT, string): the concurrency limit to run the query under, like a database name.
+											 If omitted the query is not limited
 	RETURNS: dict: response in JSON
 	"""
 	project = system.project.getProjectName()
 	params = {} if not params else params
 	try:
-		try: 
-			value = system.db.runNamedQuery(path, params)
-		except java.lang.ClassCastException: 
-			value = system.db.runNamedQuery(project, path, params)
+		value = execute_named_query(project, path, params, resource_name)
 		if not value:
 			return {}
 		return convert_unicode_to_str(json.loads(value))
@@ -60,6 +63,23 @@ def run_scalar_named_query_json(path, params=None):
 	except (Exception, java.lang.Exception) as e:
 		raise General.Errors.ExceptionWithDetails("Error getting named query at path: %s, with params: %s"
 											% (path, params), LOGGER, e)
+
+def execute_named_query(project, path, params, resource_name=None):
+	"""
+	DESCRIPTION: runs a named query, holding the concurrency limit of a resource while it runs if one is given
+	PARAMETERS: project (REQ, string): the project the named query belongs to, for scopes that require it
+				path (REQ, string): path to the named query to be run
+				params (REQ, dict): parameters for the query to use
+				resource_name (OPT, string): the concurrency limit to run the query under, like a database name
+	RETURNS: obj: the result of the named query
+	"""
+	if resource_name is not None:
+		with General.Multithreading.limit_concurrency(resource_name):
+			return execute_named_query(project, path, params)
+	try: 
+		return system.db.runNamedQuery(path, params)
+	except java.lang.ClassCastException: 
+		return system.db.runNamedQuery(project, path, params)
 	
 def convert_unicode_to_str(data):
 	"""
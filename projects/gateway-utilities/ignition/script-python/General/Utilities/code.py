@@ -6,20 +6,625 @@ This module provides functions for general utilities.
 This module should not have any dependencies on any other Ignition modules.
 """
 import collections
+import hashlib
+from copy import deepcopy
+import heapq
 import java.lang.Exception
 import json
 import os
 import re
+import sys
+import threading
+import time
+import traceback
+import java.lang.System
+from java.io import IOException
+from java.util.concurrent import TimeoutException
+from java.util.concurrent.atomic import AtomicLong
 from com.inductiveautomation.ignition.common.model import ApplicationScope
 
 LOGGER = system.util.getLogger("General.Utilities")
 GLOBAL_SCOPE = ApplicationScope.getGlobalScope()
+IGNITION_GLOBALS = system.util.getGlobals()
+# NOTE: This key is the key inside the globals that results of cached functions are stored in
+CACHE_KEY = "utilities-cache-%s" % system.util.getProjectName()
+CACHE_MAX_ENTRIES = 1000
+# NOTE: Each initialization of this script, like when the project is saved, gets a higher generation. Cached results
+# NOTE: belong to the generation that stored them, so results of older code are never returned, see get_cache_registry
+CACHE_GENERATION_KEY = "utilities-cache-generation-%s" % system.util.getProjectName()
+CACHE_GENERATION = IGNITION_GLOBALS.setdefault(CACHE_GENERATION_KEY, AtomicLong()).incrementAndGet()
+CACHE_LOCK = threading.Lock()
+# NOTE: Compiled json paths by path string, see compile_json_path
+JSON_PATHS = {}
+JSON_PATH_CACHE_SIZE = 1000
+JSON_PATH_SEGMENT_PATTERN = re.compile(r'^([^\[\]]*)((?:\[(?:-?\d+|\*)\])*)$')
+JSON_PATH_INDEX_PATTERN = re.compile(r'\[(-?\d+|\*)\]')
+# NOTE: Stands for * in a compiled json path, which matches every element of a list or value of a dictionary
+JSON_PATH_WILDCARD = object()
+# NOTE: The default for read_json_paths, which raises for a missing path instead of returning a default
+JSON_PATH_REQUIRED = object()
+# NOTE: Splits a string into its text and number segments for natural sorting
+NATURAL_SORT_PATTERN = re.compile(r'(\d+)')
+# NOTE: How merge_objects combines two lists under the same key
+LIST_APPEND = "append"
+LIST_PREPEND = "prepend"
+LIST_REPLACE = "replace"
+LIST_UNION = "union"
+# NOTE: Recent results of merge_objects, by the identity of their inputs
+MERGE_RESULTS = collections.OrderedDict()
+MERGE_RESULTS_LOCK = threading.Lock()
+MERGE_RESULTS_SIZE = 100
+# NOTE: Translated strings by (string, locale), for the translation revision they were cached under. The revision is
+# NOTE: shared by every project in the globals, and invalidate_translation_cache moves it on. The cache is rebuilt
+# NOTE: when the project is saved, and entries are dropped after TRANSLATION_CACHE_SECONDS in case the translations
+# NOTE: changed without the revision being moved on
+TRANSLATION_REVISION = IGNITION_GLOBALS.setdefault("utilities-translation-revision", AtomicLong())
+TRANSLATION_CACHE = {'revision': TRANSLATION_REVISION.get(), 'loaded_at': time.time(), 'entries': {}}
+TRANSLATION_CACHE_LOCK = threading.Lock()
+TRANSLATION_CACHE_SECONDS = 300
+TRANSLATION_CACHE_SIZE = 50000
+FUNCTION_PATH_PATTERN = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z_][A-Za-z0-9_]*)+$')
+# NOTE: Project scripts are re-initialized whenever they are saved, which empties this cache,
+# NOTE: so a function is always resolved again after its script changes
+GATEWAY_FUNCTIONS = {}
+GATEWAY_FUNCTIONS_LOCK = threading.Lock()
+# NOTE: None allows every function path, see set_gateway_function_allowlist
+GATEWAY_FUNCTION_ALLOWLIST = None
+# NOTE: The shipped executeInGatewayScope handler calls the function path in 'func' with 'args' and 'kwargs'. Every request
+# NOTE: names this function, with the real call as its payload, so the handler's one lookup never changes
+GATEWAY_MESSAGE_RECEIVER = "General.Utilities.receive_execute_on_gateway_message"
+# NOTE: Holds the gateway_batch each thread is currently collecting calls into
+ACTIVE_GATEWAY_BATCHES = threading.local()
+# NOTE: The batches that calls made with coalesce_millis are currently joining, by remote server and timeout
+COALESCING_GATEWAY_BATCHES = {}
+COALESCING_LOCK = threading.Lock()
+# NOTE: One circuit breaker per remote server, see get_circuit_breaker
+CIRCUIT_BREAKERS = {}
+CIRCUIT_BREAKERS_LOCK = threading.Lock()
+CIRCUIT_CLOSED = "closed"
+CIRCUIT_OPEN = "open"
+CIRCUIT_HALF_OPEN = "half-open"
+CIRCUIT_FAILURE_THRESHOLD = 5
+CIRCUIT_RESET_SECONDS = 30
+# NOTE: Only errors that show a remote gateway could not be reached count against its circuit breaker. Besides
+# NOTE: timeouts and I/O errors, those are the errors of the Gateway Network, which come from these packages
+GATEWAY_NETWORK_PACKAGES = ("com.inductiveautomation.metro.",)
+# NOTE: The single-flight calls currently running on this gateway, by function path and arguments
+SINGLE_FLIGHT_CALLS = {}
+SINGLE_FLIGHT_LOCK = threading.Lock()
 
 class JsonPathException(Exception):
 	"""
 	DESCRIPTION: An exception that occurs when the Json path provided is invalid
 	"""
 
+class JsonPath(object):
+	"""
+	DESCRIPTION: A json path split into its keys and indexes once, so it can be read from many objects.
+				 Use compile_json_path to get one, so each path string is only compiled once.
+	"""
+	def __init__(self, path):
+		self.path = path
+		self.steps = parse_json_path(path)
+		self.has_wildcard = any(step is JSON_PATH_WILDCARD for step in self.steps)
+
+	def read(self, json_object):
+		"""
+		DESCRIPTION: Follows the path through an object
+		PARAMETERS: json_object (REQ, obj) - The dictionary or list to read from
+		RETURNS: obj - The value of the path, or a list of every matching value if the path contains a wildcard
+		"""
+		if self.has_wildcard:
+			values = [json_object]
+			for step in self.steps:
+				values = read_json_path_step(values, step)
+			return values
+
+		value = json_object
+		depth = 0
+		try:
+			for step in self.steps:
+				value = value[step]
+				depth += 1
+			return value
+		except Exception as exception:
+			raise JsonPathException("Failed to read json path %s at element %s : %s -  EXCEPTION:%s" %
+									(self.path, format_json_path(self.steps[:depth + 1]), value, exception))
+
+	def __repr__(self):
+		return "JsonPath(%r)" % self.path
+
+class GatewayDispatchException(Exception):
+	"""
+	DESCRIPTION: An exception that occurs when a function path sent to the gateway can not be dispatched
+	"""
+
+class GatewayBatchException(Exception):
+	"""
+	DESCRIPTION: An exception that occurs when a call sent to the gateway as part of a batch fails
+	"""
+
+class GatewayRequestException(Exception):
+	"""
+	DESCRIPTION: An exception that occurs when an asynchronous call to the gateway fails, times out or is cancelled
+	"""
+
+class GatewayCircuitOpenException(GatewayRequestException):
+	"""
+	DESCRIPTION: An exception that occurs when a call to a remote gateway is refused because its circuit breaker is open
+	"""
+
+class GatewayGatherException(Exception):
+	"""
+	DESCRIPTION: An exception that occurs when a call sent to several gateways fails on some of them.
+				 Holds the results from the gateways that succeeded, and the error from each one that failed.
+	"""
+	def __init__(self, func_path, results, errors):
+		Exception.__init__(self, "%s failed on %d of %d gateways: %s"
+							% (func_path, len(errors), len(results) + len(errors),
+								", ".join("%s (%s)" % (server, errors[server]) for server in sorted(errors))))
+		self.func_path = func_path
+		self.results = results
+		self.errors = errors
+
+class GatewayGatherResults(dict):
+	"""
+	DESCRIPTION: The results of a call sent to several gateways, keyed by gateway name.
+				 Gateways that failed are left out, and their errors are kept in errors.
+	"""
+	def __init__(self, results, errors):
+		dict.__init__(self, results)
+		self.errors = errors
+
+class GatewayCallResult(object):
+	"""
+	DESCRIPTION: A handle to the result of a call made inside a gateway_batch, available once the batch is sent
+	"""
+	def __init__(self, func_path):
+		self.func_path = func_path
+		self.completed = threading.Event()
+		self.value = None
+		self.error = None
+
+	def set_response(self, response):
+		"""
+		DESCRIPTION: Stores the response the gateway returned for this call
+		PARAMETERS: response (REQ, dict) - Either {'result': obj} or {'error': str}
+		"""
+		self.value = response.get('result')
+		self.error = response.get('error')
+		self.completed.set()
+
+	def set_error(self, error):
+		"""
+		DESCRIPTION: Marks the call as failed, because its batch could not be sent
+		PARAMETERS: error (REQ, str) - The reason the batch failed
+		"""
+		self.error = error
+		self.completed.set()
+
+	def result(self, timeout_seconds=None):
+		"""
+		DESCRIPTION: Returns the result of the call, waiting for its batch to be sent if needed
+		PARAMETERS: timeout_seconds (OPT, int) - The maximum number of seconds to wait for the batch
+		RETURNS: obj - The result of the function call
+		"""
+		if not self.completed.wait(timeout_seconds):
+			raise GatewayBatchException("The batch containing %s has not been sent" % self.func_path)
+		if self.error is not None:
+			raise GatewayBatchException("%s failed on the gateway: %s" % (self.func_path, self.error))
+		return self.value
+
+class GatewayBatch(object):
+	"""
+	DESCRIPTION: Collects calls to functions decorated with execute_on_gateway and sends them in a single request.
+				 Create one with gateway_batch.
+	"""
+	def __init__(self, timeout_seconds=60, remote_server=None):
+		self.timeout_seconds = timeout_seconds
+		self.remote_server = remote_server
+		self.calls = []
+
+	def add(self, func_path, args, kwargs, single_flight=False):
+		"""
+		DESCRIPTION: Adds a call to the batch
+		PARAMETERS: func_path (REQ, str) - The fully qualified path of the function
+					args (REQ, list) - The positional arguments for the function
+					kwargs (REQ, dict) - The keyword arguments for the function
+					single_flight (OPT, bool) - If true, the call shares one execution with identical running calls
+		RETURNS: GatewayCallResult - The handle the result will be available on once the batch is sent
+		"""
+		call_result = GatewayCallResult(func_path)
+		self.calls.append((call_result, {'func': func_path, 'args': args, 'kwargs': kwargs,
+											'single_flight': single_flight, 'timeout_seconds': self.timeout_seconds}))
+		return call_result
+
+	def send(self, raise_errors=True):
+		"""
+		DESCRIPTION: Sends every call in the batch to the gateway in a single request, and hands back each result
+		PARAMETERS: raise_errors (OPT, bool) - If false, a failed request is only reported through the call handles
+		"""
+		calls, self.calls = self.calls, []
+		if not calls:
+			return
+
+		project = system.util.getProjectName()
+		try:
+			responses = send_gateway_request(project, {'batch': [request for _, request in calls]},
+												self.timeout_seconds, self.remote_server)
+		except (GatewayRequestException, java.lang.Exception) as e:
+			LOGGER.error("Failed to send a batch of %d calls to the gateway: %s" % (len(calls), e))
+			self.fail_calls(calls, str(e))
+			if raise_errors:
+				raise
+			return
+
+		#NOTE: Responses are matched to calls by position, so a short or long list would hand calls the wrong results
+		try:
+			response_count = len(responses)
+		except TypeError:
+			response_count = None
+		if response_count != len(calls):
+			error = "The gateway returned %s responses for a batch of %d calls" % (response_count, len(calls))
+			LOGGER.error(error)
+			self.fail_calls(calls, error)
+			if raise_errors:
+				raise GatewayBatchException(error)
+			return
+
+		for (call_result, _), response in zip(calls, responses):
+			call_result.set_response(response)
+
+	@staticmethod
+	def fail_calls(calls, error):
+		"""
+		DESCRIPTION: Marks every call of a batch as failed
+		PARAMETERS: calls (REQ, list) - The call handles and requests of the batch
+					error (REQ, str) - The reason the batch failed
+		"""
+		for call_result, _ in calls:
+			call_result.set_error(error)
+
+	def __enter__(self):
+		if not hasattr(ACTIVE_GATEWAY_BATCHES, 'stack'):
+			ACTIVE_GATEWAY_BATCHES.stack = []
+		ACTIVE_GATEWAY_BATCHES.stack.append(self)
+		return self
+
+	def __exit__(self, exc_type, exc_value, exc_traceback):
+		ACTIVE_GATEWAY_BATCHES.stack.pop()
+		if exc_type is None:
+			self.send()
+		else:
+			calls, self.calls = self.calls, []
+			self.fail_calls(calls, "The batch was abandoned: %s" % exc_value)
+
+class GatewayFuture(object):
+	"""
+	DESCRIPTION: A handle to a call started with execute_on_gateway_async. The call runs in the background,
+				 and its result can be waited on, or handed to callbacks once it arrives.
+	"""
+	def __init__(self, func_path):
+		self.func_path = func_path
+		self.request = None
+		self.completed = threading.Event()
+		self.lock = threading.Lock()
+		self.callbacks = []
+		self.value = None
+		self.error = None
+		self.is_cancelled = False
+
+	def set_request(self, request):
+		"""
+		DESCRIPTION: Stores the request returned by system.util.sendRequestAsync, so it can be cancelled
+		PARAMETERS: request (REQ, Request) - The pending request
+		"""
+		self.request = request
+
+	def set_result(self, value):
+		"""
+		DESCRIPTION: Completes the future with the value the gateway returned
+		PARAMETERS: value (REQ, obj) - The result of the function call
+		"""
+		self._complete(value, None)
+
+	def set_error(self, error):
+		"""
+		DESCRIPTION: Completes the future with the error the call failed with
+		PARAMETERS: error (REQ, Exception) - The error raised by the request or the function
+		"""
+		self._complete(None, error)
+
+	def _complete(self, value, error):
+		"""
+		DESCRIPTION: Stores the outcome of the call once, and runs the callbacks waiting for it
+		"""
+		with self.lock:
+			#NOTE: A response that arrives after the call was cancelled is dropped
+			if self.completed.is_set():
+				return
+			self.value = value
+			self.error = error
+			self.completed.set()
+			callbacks, self.callbacks = self.callbacks, []
+		for callback in callbacks:
+			self._run_callback(callback)
+
+	def _run_callback(self, callback):
+		"""
+		DESCRIPTION: Runs a done callback, logging an error it raises instead of passing it to the caller
+		"""
+		try:
+			callback(self)
+		#NOTE: Callbacks run on the thread that completed the future, so an error is logged rather than allowed to
+		#NOTE: break that thread or stop the remaining callbacks from running
+		except (Exception, java.lang.Exception): # pylint: disable=broad-except
+			LOGGER.error("Callback for %s failed: %s" % (self.func_path, traceback.format_exc()))
+
+	def add_done_callback(self, callback):
+		"""
+		DESCRIPTION: Calls a function with this future once the call completes, fails or is cancelled.
+					 If the call has already completed, the function is called straight away.
+		PARAMETERS: callback (REQ, func) - A function that takes the future as its only argument.
+										   In Vision, wrap changes to components in system.util.invokeLater.
+		RETURNS: GatewayFuture - This future, so callbacks can be chained
+		"""
+		with self.lock:
+			if not self.completed.is_set():
+				self.callbacks.append(callback)
+				return self
+		self._run_callback(callback)
+		return self
+
+	def cancel(self):
+		"""
+		DESCRIPTION: Cancels the request if it has not completed yet. The function may still run on the gateway,
+					 but its result is discarded.
+		RETURNS: bool - True if the request was cancelled, False if it had already completed
+		"""
+		with self.lock:
+			if self.completed.is_set():
+				return False
+			self.is_cancelled = True
+			self.error = GatewayRequestException("The call to %s was cancelled" % self.func_path)
+			self.completed.set()
+			callbacks, self.callbacks = self.callbacks, []
+		if self.request is not None:
+			self.request.cancel()
+		for callback in callbacks:
+			self._run_callback(callback)
+		return True
+
+	def cancelled(self):
+		"""
+		DESCRIPTION: Checks whether the request was cancelled before it completed
+		RETURNS: bool - True if the request was cancelled
+		"""
+		return self.is_cancelled
+
+	def done(self):
+		"""
+		DESCRIPTION: Checks whether the call has completed, failed or been cancelled
+		RETURNS: bool - True if the call is no longer running
+		"""
+		return self.completed.is_set()
+
+	def exception(self, timeout_seconds=None):
+		"""
+		DESCRIPTION: Returns the error the call failed with, waiting for it to complete if needed
+		PARAMETERS: timeout_seconds (OPT, int) - The maximum number of seconds to wait
+		RETURNS: Exception - The error, or None if the call succeeded
+		"""
+		if not self.completed.wait(timeout_seconds):
+			raise GatewayRequestException("The call to %s has not completed after %s seconds"
+											% (self.func_path, timeout_seconds))
+		return self.error
+
+	def result(self, timeout_seconds=None):
+		"""
+		DESCRIPTION: Returns the result of the call, waiting for it to complete if needed
+		PARAMETERS: timeout_seconds (OPT, int) - The maximum number of seconds to wait
+		RETURNS: obj - The result of the function call
+		"""
+		error = self.exception(timeout_seconds)
+		if error is not None:
+			raise GatewayRequestException("The call to %s failed: %s" % (self.func_path, error))
+		return self.value
+
+class CircuitBreaker(object):
+	"""
+	DESCRIPTION: Tracks the health of a remote gateway. After too many failures in a row the circuit opens, and calls
+				 fail straight away instead of waiting out their timeout. Once reset_seconds have passed, a single probe
+				 call is let through, and the circuit closes again if it succeeds.
+	"""
+	def __init__(self, remote_server, failure_threshold=CIRCUIT_FAILURE_THRESHOLD, reset_seconds=CIRCUIT_RESET_SECONDS,
+					slow_call_millis=None):
+		self.remote_server = remote_server
+		self.failure_threshold = failure_threshold
+		self.reset_seconds = reset_seconds
+		self.slow_call_millis = slow_call_millis
+		self.lock = threading.Lock()
+		self.state = CIRCUIT_CLOSED
+		self.consecutive_failures = 0
+		self.opened_at = None
+		self.probe_in_flight = False
+		self.probe_started_at = None
+		self.call_count = 0
+		self.failure_count = 0
+		self.rejected_count = 0
+		self.total_millis = 0.0
+		self.last_millis = None
+		self.last_error = None
+
+	def before_call(self):
+		"""
+		DESCRIPTION: Checks whether a call may be sent to the remote gateway
+		RETURNS: long - The start time of the call in nanoseconds, to pass to record_success or record_failure
+		"""
+		with self.lock:
+			if self.state == CIRCUIT_OPEN and time.time() - self.opened_at >= self.reset_seconds:
+				self.state = CIRCUIT_HALF_OPEN
+			#NOTE: A probe that never reported back, like a cancelled async call, is replaced after reset_seconds
+			probe_pending = self.probe_in_flight and time.time() - self.probe_started_at < self.reset_seconds
+			if self.state == CIRCUIT_OPEN or (self.state == CIRCUIT_HALF_OPEN and probe_pending):
+				self.rejected_count += 1
+				raise GatewayCircuitOpenException("The circuit to %s is open after %d failures, last error: %s"
+													% (self.remote_server, self.consecutive_failures, self.last_error))
+			if self.state == CIRCUIT_HALF_OPEN:
+				self.probe_in_flight = True
+				self.probe_started_at = time.time()
+		return java.lang.System.nanoTime()
+
+	def record_success(self, start_nanos):
+		"""
+		DESCRIPTION: Records a call that returned. Calls slower than slow_call_millis count as failures.
+		PARAMETERS: start_nanos (REQ, long) - The value returned by before_call
+		"""
+		elapsed_millis = (java.lang.System.nanoTime() - start_nanos) / 1000000.0
+		if self.slow_call_millis is not None and elapsed_millis > self.slow_call_millis:
+			self._record(elapsed_millis, "Slow call of %d ms" % elapsed_millis)
+		else:
+			self._record(elapsed_millis, None)
+
+	def record_failure(self, start_nanos, error):
+		"""
+		DESCRIPTION: Records a call that failed or timed out
+		PARAMETERS: start_nanos (REQ, long) - The value returned by before_call
+					error (REQ, Exception) - The error the call failed with
+		"""
+		self._record((java.lang.System.nanoTime() - start_nanos) / 1000000.0, error)
+
+	def _record(self, elapsed_millis, error):
+		"""
+		DESCRIPTION: Adds a call to the statistics, and opens or closes the circuit based on its outcome
+		PARAMETERS: elapsed_millis (REQ, float) - How long the call took
+					error (REQ, obj) - The reason the call counts as a failure, or None if it succeeded
+		"""
+		with self.lock:
+			self.call_count += 1
+			self.total_millis += elapsed_millis
+			self.last_millis = elapsed_millis
+			self.probe_in_flight = False
+			if error is None:
+				if self.state != CIRCUIT_CLOSED:
+					LOGGER.info("Circuit to %s closed" % self.remote_server)
+				self.state = CIRCUIT_CLOSED
+				self.consecutive_failures = 0
+				return
+
+			self.failure_count += 1
+			self.consecutive_failures += 1
+			self.last_error = str(error)
+			if self.state == CIRCUIT_HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+				if self.state != CIRCUIT_OPEN:
+					LOGGER.warn("Circuit to %s opened after %d failures, last error: %s"
+								% (self.remote_server, self.consecutive_failures, error))
+				self.state = CIRCUIT_OPEN
+				self.opened_at = time.time()
+
+	def reset(self):
+		"""
+		DESCRIPTION: Closes the circuit, so calls are sent to the remote gateway again
+		"""
+		with self.lock:
+			self.state = CIRCUIT_CLOSED
+			self.consecutive_failures = 0
+			self.probe_in_flight = False
+
+	def get_status(self):
+		"""
+		DESCRIPTION: Reports the state and call statistics of the circuit
+		RETURNS: dict - The remote server, state, failure counts, and average and last call time in milliseconds
+		"""
+		with self.lock:
+			return {
+				'remote_server': self.remote_server,
+				'state': self.state,
+				'consecutive_failures': self.consecutive_failures,
+				'call_count': self.call_count,
+				'failure_count': self.failure_count,
+				'rejected_count': self.rejected_count,
+				'average_millis': self.total_millis / self.call_count if self.call_count else 0.0,
+				'last_millis': self.last_millis,
+				'last_error': self.last_error,
+				'opened_at': self.opened_at
+			}
+
+class SingleFlightCall(object):
+	"""
+	DESCRIPTION: A call running on the gateway that identical concurrent calls wait on instead of running again
+	"""
+	def __init__(self, func_path, key):
+		self.func_path = func_path
+		self.key = key
+		self.completed = threading.Event()
+		self.value = None
+		self.exc_info = None
+
+	def result(self, timeout_seconds=None):
+		"""
+		DESCRIPTION: Waits for the call to finish, and returns its result or raises its error
+		PARAMETERS: timeout_seconds (OPT, int) - The amount of time to wait, or None to wait until the call finishes
+		RETURNS: obj - The result of the function call
+		"""
+		self.completed.wait(timeout_seconds)
+		if not self.completed.is_set():
+			raise GatewayRequestException("Timed out after %s seconds waiting for an identical call to %s, key: %s"
+											% (timeout_seconds, self.func_path, self.key))
+		if self.exc_info is not None:
+			#NOTE: The error is raised again from this thread, so the traceback of the call that raised it is logged
+			LOGGER.debug("Identical call to %s failed, key: %s, %s"
+							% (self.func_path, self.key, "".join(traceback.format_exception(*self.exc_info))))
+			raise self.exc_info[1]
+		return self.value
+
+class GatewayFunction(object):
+	"""
+	DESCRIPTION: A function resolved for the executeInGatewayScope message handler, with its call statistics
+	"""
+	def __init__(self, func_path, func):
+		self.func_path = func_path
+		self.func = func
+		self.call_count = AtomicLong()
+		self.error_count = AtomicLong()
+		self.total_nanos = AtomicLong()
+		self.max_nanos = AtomicLong()
+		self.shared_count = AtomicLong()
+
+	def __call__(self, *args, **kwargs):
+		"""
+		DESCRIPTION: Calls the function, recording how long it took and whether it raised
+		"""
+		start_nanos = java.lang.System.nanoTime()
+		try:
+			return self.func(*args, **kwargs)
+		except (Exception, java.lang.Exception):
+			self.error_count.incrementAndGet()
+			raise
+		finally:
+			elapsed_nanos = java.lang.System.nanoTime() - start_nanos
+			self.call_count.incrementAndGet()
+			self.total_nanos.addAndGet(elapsed_nanos)
+			current_max = self.max_nanos.get()
+			while elapsed_nanos > current_max and not self.max_nanos.compareAndSet(current_max, elapsed_nanos):
+				current_max = self.max_nanos.get()
+
+	def get_status(self):
+		"""
+		DESCRIPTION: Reports the call statistics of the function
+		RETURNS: dict - The function path, call, error and single-flight shared counts, and average and maximum call
+						time in milliseconds
+		"""
+		call_count = self.call_count.get()
+		return {
+			'func_path': self.func_path,
+			'call_count': call_count,
+			'error_count': self.error_count.get(),
+			'shared_count': self.shared_count.get(),
+			'average_millis': self.total_nanos.get() / 1000000.0 / call_count if call_count else 0.0,
+			'max_millis': self.max_nanos.get() / 1000000.0
+		}
+
 def get_system_name():
 	"""
 	DESCRIPTION: Returns the name of the system
@@ -30,32 +635,402 @@ def get_system_name():
 
 def receive_execute_on_gateway_message(payload):
 	"""
-	DESCRIPTION: This message handler will be called each time a message of this type is received.
+	DESCRIPTION: Dispatches a call sent to the executeInGatewayScope message handler. Calls made through
+				 execute_on_gateway reach it through the handler, see build_gateway_message.
 	PARAMETERS: payload (REQ, dict) - A dictionary that holds the objects passed to this message handler
 
 	Example call in project scope: 
-		system.util.sendRequest(project, "executeInGatewayScope", 
-			{"func":"myScript.myFunction", 'kwargs':{"myParam1":123,"myParam2":456}}), 
+		system.util.sendRequest(project, "executeInGatewayScope", General.Utilities.build_gateway_message(
+			{"func":"myScript.myFunction", 'kwargs':{"myParam1":123,"myParam2":456}})), 
+	A payload with a 'batch' list of these payloads calls each function, and returns a list with either
+	{'result': obj} or {'error': str} for each of them.
+	A payload with 'single_flight' set shares one execution with identical calls already running, waiting at most
+	its 'timeout_seconds' for them.
 	RETURNS: obj - The result of the function call
 	"""
+	if payload.get('batch') is not None:
+		return [dispatch_batched_call(request) for request in payload['batch']]
+
 	if payload.get('func') is None:
 		raise TypeError("executeInGatewayScope expects a payload object named func")
 	
-	func_reference = eval(payload['func']) # pylint: disable=eval-used
+	func_reference = get_gateway_function(payload['func'])
 	args = payload.get('args', [])
 	kwargs = payload.get('kwargs', {})
 	
 	if payload.get('root_server'):
 		kwargs['root_server'] = payload.get('root_server')
 
+	if payload.get('single_flight'):
+		return call_single_flight(func_reference, args, kwargs, payload.get('timeout_seconds'))
 	return func_reference(*args, **kwargs)
 
-def execute_on_gateway(timeout_seconds=60, remote_server=None, func_path=None):
+def get_call_key(func_path, args, kwargs):
+	"""
+	DESCRIPTION: Builds the key that identifies identical calls, for single-flight de-duplication and caching
+	PARAMETERS: func_path (REQ, str) - The fully qualified path of the function
+				args (REQ, list) - The positional arguments for the function
+				kwargs (REQ, dict) - The keyword arguments for the function
+	RETURNS: str - The key, or None if the arguments can not be compared
+	"""
+	try:
+		return json.dumps([func_path, list(args), kwargs], sort_keys=True)
+	except (TypeError, ValueError):
+		return None
+
+def call_single_flight(func_reference, args, kwargs, timeout_seconds=None):
+	"""
+	DESCRIPTION: Calls a function, unless an identical call is already running. In that case it waits for that call
+				 and returns the same result, or raises the same error.
+	PARAMETERS: func_reference (REQ, GatewayFunction) - The function to call
+				args (REQ, list) - The positional arguments for the function
+				kwargs (REQ, dict) - The keyword arguments for the function
+				timeout_seconds (OPT, int) - How long to wait for an identical call, usually the caller's own timeout
+	RETURNS: obj - The result of the function call
+	"""
+	key = get_call_key(func_reference.func_path, args, kwargs)
+	if key is None:
+		return func_reference(*args, **kwargs)
+
+	with SINGLE_FLIGHT_LOCK:
+		call = SINGLE_FLIGHT_CALLS.get(key)
+		is_leader = call is None
+		if is_leader:
+			call = SINGLE_FLIGHT_CALLS[key] = SingleFlightCall(func_reference.func_path, key)
+
+	if not is_leader:
+		func_reference.shared_count.incrementAndGet()
+		return call.result(timeout_seconds)
+
+	try:
+		call.value = func_reference(*args, **kwargs)
+	except (Exception, java.lang.Exception):
+		call.exc_info = sys.exc_info()
+		raise
+	finally:
+		#NOTE: Calls that arrive after this one finished run again, so results are never stale
+		with SINGLE_FLIGHT_LOCK:
+			del SINGLE_FLIGHT_CALLS[key]
+		call.completed.set()
+	return call.value
+
+def dispatch_batched_call(request):
+	"""
+	DESCRIPTION: Calls a single function from a batched executeInGatewayScope message, so one failure
+				 does not fail the rest of the batch
+	PARAMETERS: request (REQ, dict) - The payload for the call, with the same keys as a single message
+	RETURNS: dict - {'result': obj} if the call succeeded, or {'error': str} if it raised
+	"""
+	try:
+		return {'result': receive_execute_on_gateway_message(request)}
+	#NOTE: Any error is returned as this call's result, so the rest of the batch still runs
+	except (Exception, java.lang.Exception) as e: # pylint: disable=broad-except
+		LOGGER.warn("Batched call to %s failed: %s" % (request.get('func'), traceback.format_exc()))
+		return {'error': "%s: %s" % (type(e).__name__, e)}
+
+def dispatch_local_call(func, args, kwargs):
+	"""
+	DESCRIPTION: Calls a function in this scope, returning its outcome the same way as a batched gateway call
+	PARAMETERS: func (REQ, func) - The function to call
+				args (REQ, list) - The positional arguments for the function
+				kwargs (REQ, dict) - The keyword arguments for the function
+	RETURNS: dict - {'result': obj} if the call succeeded, or {'error': str} if it raised
+	"""
+	try:
+		return {'result': func(*args, **kwargs)}
+	#NOTE: Any error is returned as this call's result, the same as a call batched to the gateway
+	except (Exception, java.lang.Exception) as e: # pylint: disable=broad-except
+		LOGGER.warn("Batched call to %s failed: %s" % (func.__name__, traceback.format_exc()))
+		return {'error': "%s: %s" % (type(e).__name__, e)}
+
+def gateway_batch(timeout_seconds=60, remote_server=None):
+	"""
+	DESCRIPTION: Returns a context manager that collects calls to functions decorated with execute_on_gateway,
+				 and sends them to the gateway in a single request when the block ends. Inside the block, each call
+				 returns a GatewayCallResult instead of its value. Calls made in the gateway scope run straight away,
+				 and return a GatewayCallResult that is already complete.
+	PARAMETERS: timeout_seconds (OPT, int) - The amount of time to wait for the whole batch to execute
+				remote_server (OPT, str) - The remote server to execute on, calls for other servers are not batched
+	RETURNS: GatewayBatch - The batch
+
+	Example:
+		with General.Utilities.gateway_batch():
+			ui_config = General.Files.get_gateway_file_contents("data/configs/ui.json")
+			line_config = General.Files.get_gateway_file_contents("data/configs/line.json")
+		build_screen(ui_config.result(), line_config.result())
+	"""
+	if remote_server == get_system_name():
+		remote_server = None
+	return GatewayBatch(timeout_seconds, remote_server)
+
+def get_active_gateway_batch():
+	"""
+	DESCRIPTION: Returns the innermost gateway_batch the current thread is collecting calls into
+	RETURNS: GatewayBatch - The batch, or None if there is not one
+	"""
+	stack = getattr(ACTIVE_GATEWAY_BATCHES, 'stack', None)
+	return stack[-1] if stack else None
+
+def send_coalesced_request(func_path, args, kwargs, timeout_seconds, remote_server, coalesce_millis,
+							single_flight=False):
+	"""
+	DESCRIPTION: Sends a call to the gateway together with any other calls made within the coalescing window.
+				 The first call starts a timer that sends the batch when the window ends, and every caller waits
+				 for its own result.
+	PARAMETERS: func_path (REQ, str) - The fully qualified path of the function
+				args (REQ, list) - The positional arguments for the function
+				kwargs (REQ, dict) - The keyword arguments for the function
+				timeout_seconds (REQ, int) - The amount of time to wait for the batch to execute
+				remote_server (REQ, str) - The remote server to execute on
+				coalesce_millis (REQ, int) - How long the first call waits for others to join it
+				single_flight (OPT, bool) - If true, the call shares one execution with identical running calls
+	RETURNS: obj - The result of the function call
+	"""
+	batch_key = (remote_server, timeout_seconds)
+	with COALESCING_LOCK:
+		batch = COALESCING_GATEWAY_BATCHES.get(batch_key)
+		is_sender = batch is None
+		if is_sender:
+			batch = COALESCING_GATEWAY_BATCHES[batch_key] = GatewayBatch(timeout_seconds, remote_server)
+		call_result = batch.add(func_path, args, kwargs, single_flight)
+
+	if is_sender:
+		timer = threading.Timer(coalesce_millis / 1000.0, send_coalesced_batch, [batch_key])
+		timer.daemon = True
+		timer.start()
+
+	return call_result.result(timeout_seconds + coalesce_millis / 1000.0)
+
+def send_coalesced_batch(batch_key):
+	"""
+	DESCRIPTION: Closes a coalescing batch and sends it, once its window has ended. Runs on the batch's timer thread.
+	PARAMETERS: batch_key (REQ, tuple) - The remote server and timeout of the batch
+	"""
+	#NOTE: Close the batch before sending it, later calls start a new one
+	with COALESCING_LOCK:
+		batch = COALESCING_GATEWAY_BATCHES.pop(batch_key)
+	batch.send(raise_errors=False)
+
+def get_circuit_breaker(remote_server):
+	"""
+	DESCRIPTION: Returns the circuit breaker for a remote server, creating it with the default settings if needed
+	PARAMETERS: remote_server (REQ, str) - The name of the remote server
+	RETURNS: CircuitBreaker - The circuit breaker
+	"""
+	breaker = CIRCUIT_BREAKERS.get(remote_server)
+	if breaker is None:
+		with CIRCUIT_BREAKERS_LOCK:
+			breaker = CIRCUIT_BREAKERS.setdefault(remote_server, CircuitBreaker(remote_server))
+	return breaker
+
+def configure_circuit_breaker(remote_server, failure_threshold=CIRCUIT_FAILURE_THRESHOLD,
+								reset_seconds=CIRCUIT_RESET_SECONDS, slow_call_millis=None):
+	"""
+	DESCRIPTION: Changes when the circuit to a remote server opens, and how long it stays open
+	PARAMETERS: remote_server (REQ, str) - The name of the remote server
+				failure_threshold (OPT, int) - The number of failures in a row that opens the circuit
+				reset_seconds (OPT, int) - How long the circuit stays open before a probe call is let through
+				slow_call_millis (OPT, int) - If set, calls that take longer than this count as failures
+	RETURNS: CircuitBreaker - The circuit breaker
+	"""
+	breaker = get_circuit_breaker(remote_server)
+	with breaker.lock:
+		breaker.failure_threshold = failure_threshold
+		breaker.reset_seconds = reset_seconds
+		breaker.slow_call_millis = slow_call_millis
+	return breaker
+
+def reset_circuit_breaker(remote_server):
+	"""
+	DESCRIPTION: Closes the circuit to a remote server, so calls are sent to it again straight away
+	PARAMETERS: remote_server (REQ, str) - The name of the remote server
+	"""
+	get_circuit_breaker(remote_server).reset()
+
+def get_circuit_breaker_status():
+	"""
+	DESCRIPTION: Reports the state of the circuit to each remote server that has been called
+	RETURNS: list - A dictionary per remote server, see CircuitBreaker.get_status
+	"""
+	return [CIRCUIT_BREAKERS[remote_server].get_status() for remote_server in sorted(CIRCUIT_BREAKERS.keys())]
+
+def build_gateway_message(payload):
+	"""
+	DESCRIPTION: Addresses a payload to receive_execute_on_gateway_message, through a message handler that calls the
+				 function path in 'func'. The shipped handler works this way, so batched, async and single-flight
+				 calls need no changes to it.
+	PARAMETERS: payload (REQ, dict) - The payload for receive_execute_on_gateway_message
+	RETURNS: dict - The payload to send to the executeInGatewayScope message handler
+	"""
+	return {'func': GATEWAY_MESSAGE_RECEIVER, 'kwargs': {'payload': payload}}
+
+def send_gateway_request(project, payload, timeout_seconds, remote_server):
+	"""
+	DESCRIPTION: Sends a payload to the executeInGatewayScope message handler and waits for the response.
+				 Calls to a remote server go through its circuit breaker.
+	PARAMETERS: project (REQ, str) - The project the message handler belongs to
+				payload (REQ, dict) - The payload for the message handler
+				timeout_seconds (REQ, int) - The amount of time to wait for the response
+				remote_server (REQ, str) - The remote server to send to, or None for this gateway
+	RETURNS: obj - The response of the message handler
+	"""
+	payload = build_gateway_message(payload)
+	if remote_server is None:
+		return system.util.sendRequest(project, "executeInGatewayScope", payload, timeoutSec=timeout_seconds)
+
+	breaker = get_circuit_breaker(remote_server)
+	start_nanos = breaker.before_call()
+	try:
+		response = system.util.sendRequest(project, "executeInGatewayScope", payload,
+											timeoutSec=timeout_seconds, remoteServer=remote_server)
+	except (Exception, java.lang.Exception) as e:
+		record_gateway_request_error(breaker, start_nanos, e)
+		raise
+	breaker.record_success(start_nanos)
+	return response
+
+def is_gateway_transport_error(error):
+	"""
+	DESCRIPTION: Checks whether a gateway request failed to reach the gateway or timed out, rather than the function
+				 raising an error on the gateway
+	PARAMETERS: error (REQ, Exception) - The error the request failed with
+	RETURNS: bool - True if the error, or an error that caused it, is a timeout, an I/O error or a Gateway Network error
+	"""
+	#NOTE: Errors are often wrapped, so the whole chain of causes is checked
+	while error is not None:
+		if isinstance(error, (TimeoutException, IOException)):
+			return True
+		if not isinstance(error, java.lang.Exception):
+			return False
+		error_class = error.getClass()
+		while error_class is not None:
+			if error_class.getName().startswith(GATEWAY_NETWORK_PACKAGES):
+				return True
+			error_class = error_class.getSuperclass()
+		cause = error.getCause()
+		error = cause if cause is not error else None
+	return False
+
+def record_gateway_request_error(breaker, start_nanos, error):
+	"""
+	DESCRIPTION: Records a failed gateway request with the circuit breaker of its remote server. Errors raised by the
+				 function on the remote gateway are recorded as successful calls, since the gateway responded.
+	PARAMETERS: breaker (REQ, CircuitBreaker) - The circuit breaker of the remote server
+				start_nanos (REQ, long) - The value returned by before_call
+				error (REQ, Exception) - The error the request failed with
+	"""
+	if is_gateway_transport_error(error):
+		breaker.record_failure(start_nanos, error)
+	else:
+		breaker.record_success(start_nanos)
+
+def send_gateway_request_async(project, payload, timeout_seconds, remote_server, future):
+	"""
+	DESCRIPTION: Sends a payload to the executeInGatewayScope message handler without waiting, and completes the
+				 future with the response. Calls to a remote server go through its circuit breaker.
+	PARAMETERS: project (REQ, str) - The project the message handler belongs to
+				payload (REQ, dict) - The payload for the message handler
+				timeout_seconds (REQ, int) - The amount of time to wait for the response
+				remote_server (REQ, str) - The remote server to send to, or None for this gateway
+				future (REQ, GatewayFuture) - The future to complete
+	"""
+	breaker = get_circuit_breaker(remote_server) if remote_server is not None else None
+	#NOTE: Stays None if the breaker refuses the call, so the refusal is not recorded as a failed call
+	start_nanos = None
+
+	def on_success(value):
+		if start_nanos is not None:
+			breaker.record_success(start_nanos)
+		future.set_result(value)
+
+	def on_error(error):
+		if start_nanos is not None:
+			record_gateway_request_error(breaker, start_nanos, error)
+		future.set_error(error)
+
+	try:
+		if breaker is not None:
+			start_nanos = breaker.before_call()
+		future.set_request(system.util.sendRequestAsync(project, "executeInGatewayScope", build_gateway_message(payload),
+												timeoutSec=timeout_seconds, remoteServer=remote_server,
+												onSuccess=on_success, onError=on_error))
+	except (GatewayRequestException, java.lang.Exception) as e:
+		on_error(e)
+
+def is_gateway_function_allowed(func_path):
+	"""
+	DESCRIPTION: Checks a function path against the allowlist for the executeInGatewayScope message handler
+	PARAMETERS: func_path (REQ, str) - The fully qualified path of the function
+	RETURNS: bool - True if there is no allowlist, or the path or one of its parent packages is on it
+	"""
+	if GATEWAY_FUNCTION_ALLOWLIST is None:
+		return True
+	return any(func_path == allowed_path or func_path.startswith(allowed_path + '.')
+				for allowed_path in GATEWAY_FUNCTION_ALLOWLIST)
+
+def set_gateway_function_allowlist(func_paths):
+	"""
+	DESCRIPTION: Limits which functions the executeInGatewayScope message handler may call.
+				 Since the allowlist is cleared when project scripts are saved, set it from a gateway startup script
+				 or at the top of a project library script.
+				 It applies to calls dispatched by receive_execute_on_gateway_message. The shipped handler calls any other
+				 'func' it is sent directly, so to check every request, change the handler in the Designer to return
+				 General.Utilities.receive_execute_on_gateway_message(payload).
+	PARAMETERS: func_paths (REQ, list) - Function paths, or package paths to allow every function inside of them.
+										 None allows every function path again.
+	"""
+	global GATEWAY_FUNCTION_ALLOWLIST
+	with GATEWAY_FUNCTIONS_LOCK:
+		GATEWAY_FUNCTION_ALLOWLIST = None if func_paths is None else frozenset(func_paths)
+		#NOTE: Functions resolved under the old allowlist have to be checked again
+		GATEWAY_FUNCTIONS.clear()
+
+def get_gateway_function(func_path):
+	"""
+	DESCRIPTION: Resolves a function path for the executeInGatewayScope message handler. Each path is only resolved
+				 the first time it is called, after that it is a dictionary lookup.
+	PARAMETERS: func_path (REQ, str) - The fully qualified path of the function
+	RETURNS: GatewayFunction - The callable function, which records its call statistics
+	"""
+	gateway_function = GATEWAY_FUNCTIONS.get(func_path)
+	if gateway_function is not None:
+		return gateway_function
+
+	if not FUNCTION_PATH_PATTERN.match(func_path):
+		raise GatewayDispatchException("Invalid function path for executeInGatewayScope: %s" % func_path)
+	if not is_gateway_function_allowed(func_path):
+		raise GatewayDispatchException("Function %s is not allowed by executeInGatewayScope" % func_path)
+
+	#NOTE: The path was validated as a dotted name above, so this can only look up a name
+	func = eval(func_path) # pylint: disable=eval-used
+	#NOTE: Functions decorated with execute_on_gateway_async are called directly, so the caller gets their value
+	func = getattr(func, 'gateway_target', func)
+	if not callable(func):
+		raise GatewayDispatchException("%s is not a function" % func_path)
+
+	with GATEWAY_FUNCTIONS_LOCK:
+		return GATEWAY_FUNCTIONS.setdefault(func_path, GatewayFunction(func_path, func))
+
+def get_gateway_function_status():
+	"""
+	DESCRIPTION: Reports the call statistics of each function called through the executeInGatewayScope message handler
+	RETURNS: list - A dictionary per function, see GatewayFunction.get_status
+	"""
+	return [GATEWAY_FUNCTIONS[func_path].get_status() for func_path in sorted(GATEWAY_FUNCTIONS.keys())]
+
+def execute_on_gateway(timeout_seconds=60, remote_server=None, func_path=None, coalesce_millis=None,
+						single_flight=False):
 	"""
 	DESCRIPTION: This decorator function wraps an entire function to verify that it is being executed in the correct scope
 	PARAMETERS: timeout_seconds (OPT, int) - The amount of time to wait for the function to execute
 				remote_server (OPT, str) - The remote server to execute on
 				func_path (OPT, str) - The path to the function to execute
+				coalesce_millis (OPT, int) - If set, calls made within this many milliseconds of each other are sent
+											 to the gateway in a single request. Inside a gateway_batch, calls are
+											 always batched and return a GatewayCallResult.
+				single_flight (OPT, bool) - If true, calls with the same arguments that reach the gateway while an
+											identical call is running wait for it and share its result, instead
+											of running again
 	RETURNS: obj - The result of the function call
 	"""
 	if remote_server == get_system_name():
@@ -84,9 +1059,25 @@ def execute_on_gateway(timeout_seconds=60, remote_server=None, func_path=None):
 				# NOTE: If we dont have a function path, then we need to get it from the function to pass to the gateway
 				if wrap_func_path is None:
 					wrap_func_path = get_function_qualified_path(func)
-				return system.util.sendRequest(project, "executeInGatewayScope", 
-													{"func":wrap_func_path, 'args':args, 'kwargs':kwargs}
-													, timeoutSec=timeout_seconds, remoteServer=remote_server)
+
+				# NOTE: Inside a batch for the same server, the call is sent with the rest of the batch
+				batch = get_active_gateway_batch()
+				if batch is not None and batch.remote_server == remote_server:
+					return batch.add(wrap_func_path, args, kwargs, single_flight)
+				if coalesce_millis:
+					return send_coalesced_request(wrap_func_path, args, kwargs, timeout_seconds, remote_server,
+													coalesce_millis, single_flight)
+
+				return send_gateway_request(project, {"func":wrap_func_path, 'args':args, 'kwargs':kwargs,
+														'single_flight':single_flight, 'timeout_seconds':timeout_seconds},
+											timeout_seconds, remote_server)
+
+			# NOTE: Already on the gateway, so a call inside a batch runs here and returns a completed handle
+			batch = get_active_gateway_batch()
+			if batch is not None and batch.remote_server is None:
+				call_result = GatewayCallResult(wrap_func_path or func.__name__)
+				call_result.set_response(dispatch_local_call(func, args, kwargs))
+				return call_result
 			#function_wrapper
 			return func(*args, **kwargs)
 		#wrapper
@@ -94,14 +1085,154 @@ def execute_on_gateway(timeout_seconds=60, remote_server=None, func_path=None):
 	#execute_on_gateway
 	return wrapper
 
-def execute_on_gateways(remote_servers=None, func_path=None):
+def execute_on_gateway_async(timeout_seconds=60, remote_server=None, func_path=None, single_flight=False):
 	"""
-	DESCRIPTION: This decorator function wraps an entire function to verify that it is being executed in the correct scope
-	PARAMETERS: remote_servers (OPT, list) - A list of remote servers to execute on
+	DESCRIPTION: This decorator function runs the wrapped function on the gateway without blocking the caller.
+				 Each call returns a GatewayFuture straight away, so a client can start many gateway calls at once
+				 and keep rendering while they run. In the gateway scope the function is called directly, and the
+				 future is already complete when it is returned.
+	PARAMETERS: timeout_seconds (OPT, int) - The amount of time to wait for the function to execute
+				remote_server (OPT, str) - The remote server to execute on
 				func_path (OPT, str) - The path to the function to execute
-	RETURNS: obj - The result of the function call
+				single_flight (OPT, bool) - If true, identical calls running on the gateway share one execution,
+											see execute_on_gateway
+	RETURNS: GatewayFuture - The handle the result will be available on
+
+	Example:
+		@General.Utilities.execute_on_gateway_async(timeout_seconds=30)
+		def get_line_status(line):
+			...
+
+		def show_status(future):
+			system.util.invokeLater(lambda: update_label(future.result()))
+		get_line_status("Line 1").add_done_callback(show_status)
+	"""
+	if remote_server == get_system_name():
+		remote_server = None
+
+	def wrapper(func):
+		"""
+		DESCRIPTION: Initialize wrapper function
+		"""
+		def gateway_async_wrapper(*args, **kwargs):
+			"""
+			DESCRIPTION: This is the wrapper function that will be returned
+			"""
+			wrap_func_path = func_path
+			if wrap_func_path is None:
+				wrap_func_path = get_function_qualified_path(func)
+			future = GatewayFuture(wrap_func_path)
+
+			if is_gateway_scope() and not remote_server:
+				try:
+					future.set_result(func(*args, **kwargs))
+				#NOTE: Any error is handed to the future, the same as an error raised by a call sent to the gateway
+				except (Exception, java.lang.Exception) as e: # pylint: disable=broad-except
+					future.set_error(e)
+				return future
+
+			project = system.util.getProjectName()
+			send_gateway_request_async(project, {"func":wrap_func_path, 'args':args, 'kwargs':kwargs,
+												'single_flight':single_flight, 'timeout_seconds':timeout_seconds},
+										timeout_seconds, remote_server, future)
+			return future
+
+		# NOTE: The message handler calls the undecorated function, see get_gateway_function
+		gateway_async_wrapper.gateway_target = func
+		#wrapper
+		return gateway_async_wrapper
+	#execute_on_gateway_async
+	return wrapper
+
+def send_to_gateways(project, payload, server_names, timeout_seconds, server_timeouts):
+	"""
+	DESCRIPTION: Sends a payload to the executeInGatewayScope message handler of several gateways at once, and waits
+				 for each of them up to its own timeout
+	PARAMETERS: project (REQ, str) - The project the message handler belongs to
+				payload (REQ, dict) - The payload for the message handler
+				server_names (REQ, list) - The gateways to send to, this gateway is called locally
+				timeout_seconds (REQ, int) - The amount of time to wait for each gateway
+				server_timeouts (REQ, dict) - The amount of time to wait for specific gateways, by gateway name
+	RETURNS: tuple - The result of each gateway that succeeded, and the error of each one that failed, by gateway name
+	"""
+	system_name = get_system_name()
+	start_time = time.time()
+	futures = collections.OrderedDict()
+	# NOTE: Send to every gateway before waiting on any of them
+	for server_name in server_names:
+		server_timeout = server_timeouts.get(server_name, timeout_seconds)
+		future = GatewayFuture(payload['func'])
+		send_gateway_request_async(project, payload, server_timeout,
+									None if server_name == system_name else server_name, future)
+		futures[server_name] = (future, start_time + server_timeout)
+
+	results = {}
+	errors = {}
+	for server_name, (future, deadline) in futures.items():
+		try:
+			results[server_name] = future.result(max(deadline - time.time(), 0))
+		except GatewayRequestException as e:
+			future.cancel()
+			LOGGER.error("Failed to execute on remote gateway %s: %s, %s" % (server_name, payload, e))
+			errors[server_name] = e
+	return results, errors
+
+def execute_on_gateways(remote_servers=None, func_path=None, timeout_seconds=10, server_timeouts=None):
+	"""
+	DESCRIPTION: This decorator function runs the wrapped function on several gateways at once. The call is sent to
+				 every gateway in parallel. Use gather_on_gateways to get the results by gateway name, or to keep the
+				 results of the gateways that succeeded when others fail.
+	PARAMETERS: remote_servers (OPT, list) - A list of remote servers to execute on, this gateway if not given
+				func_path (OPT, str) - The path to the function to execute
+				timeout_seconds (OPT, int) - The amount of time to wait for each gateway
+				server_timeouts (OPT, dict) - The amount of time to wait for specific gateways, by gateway name
+	RETURNS: list - The result of the function call on each gateway, in the order of remote_servers. If any gateway
+					fails, the error of the first one that failed is raised.
+	"""
+	server_names = remote_servers or [get_system_name()]
+
+	def wrapper(func):
+		"""
+		Description: Initialize wrapper function
+		"""
+		gathering_func = gather_on_gateways(remote_servers, func_path, timeout_seconds, server_timeouts,
+											partial_results=True)(func)
+
+		def function_wrapper(*args, **kwargs):
+			"""
+			DESCRIPTION: This is the wrapper function that will be returned
+			"""
+			# NOTE: If this was tagged with a root server, we should execute it here, as we were called to
+			if kwargs.get('root_server'):
+				return gathering_func(*args, **kwargs)
+
+			results = gathering_func(*args, **kwargs)
+			for server_name in server_names:
+				if server_name in results.errors:
+					raise results.errors[server_name]
+			return [results[server_name] for server_name in server_names]
+
+		#wrapper: 
+		return function_wrapper
+	#execute_on_gateways
+	return wrapper
+
+def gather_on_gateways(remote_servers=None, func_path=None, timeout_seconds=10, server_timeouts=None,
+						partial_results=False):
+	"""
+	DESCRIPTION: This decorator function runs the wrapped function on several gateways at once. The call is sent to
+				 every gateway in parallel, and the results are collected by gateway name.
+	PARAMETERS: remote_servers (OPT, list) - A list of remote servers to execute on, this gateway if not given
+				func_path (OPT, str) - The path to the function to execute
+				timeout_seconds (OPT, int) - The amount of time to wait for each gateway
+				server_timeouts (OPT, dict) - The amount of time to wait for specific gateways, by gateway name
+				partial_results (OPT, bool) - If true, return the results of the gateways that succeeded, with the
+											  failures in the errors of the result. Otherwise raise a
+											  GatewayGatherException if any gateway fails.
+	RETURNS: GatewayGatherResults - The result of the function call on each gateway, by gateway name
 	"""
 	system_name = get_system_name()
+	server_timeouts = server_timeouts or {}
 	
 	def wrapper(func):
 		"""
@@ -127,55 +1258,135 @@ def execute_on_gateways(remote_servers=None, func_path=None):
 				kwargs.pop('root_server')
 				return func(*args, **kwargs)
 
-
-			for remote_server in remote_servers:
-				try:
-					if remote_server == system_name:
-						remote_server = None
-					return system.util.sendRequest(project, "executeInGatewayScope", 
-								{"func":wrap_func_path, 'args':args, 'kwargs':kwargs, 'root_server':system_name}
-							, timeoutSec=10, remoteServer=remote_server)
-				except (java.lang.Exception, Exception) as e:
-					LOGGER.error("Failed to execute on remote gateway %s: %s" 
-				  					% (remote_server, {"func":wrap_func_path, 'args':args, 'kwargs':kwargs, 'root_server':system_name}))
-					raise e
+			payload = {"func":wrap_func_path, 'args':args, 'kwargs':kwargs, 'root_server':system_name}
+			results, errors = send_to_gateways(project, payload, remote_servers or [system_name], timeout_seconds,
+												server_timeouts)
+			if errors and not partial_results:
+				raise GatewayGatherException(wrap_func_path, results, errors)
+			return GatewayGatherResults(results, errors)
 
 		#wrapper: 
 		return function_wrapper
-	#execute_on_gateway
+	#gather_on_gateways
 	return wrapper
 
+def parse_json_path(json_path):
+	"""
+	DESCRIPTION: Splits a json path into the keys and indexes to follow
+	PARAMETERS: json_path (REQ, str) - A path like "lines[0].stations[-1].name". A * as a key or index matches every
+									   value of a dictionary or element of a list.
+	RETURNS: list - A str for each key, an int for each index, and JSON_PATH_WILDCARD for each *
+	"""
+	steps = []
+	for segment in json_path.split("."):
+		match = JSON_PATH_SEGMENT_PATTERN.match(segment)
+		if match is None or not (match.group(1) or match.group(2)):
+			raise JsonPathException("Invalid json path %s at element %s" % (json_path, segment))
+		key, indexes = match.groups()
+		if key:
+			steps.append(JSON_PATH_WILDCARD if key == "*" else key)
+		for index in JSON_PATH_INDEX_PATTERN.findall(indexes):
+			steps.append(JSON_PATH_WILDCARD if index == "*" else int(index))
+	return steps
+
+def format_json_path(steps):
+	"""
+	DESCRIPTION: Joins the steps of a compiled json path back into a path string, for error messages
+	PARAMETERS: steps (REQ, list) - The steps, see parse_json_path
+	RETURNS: str - The json path
+	"""
+	path = ""
+	for step in steps:
+		if isinstance(step, int):
+			path += "[%d]" % step
+		else:
+			path += "%s%s" % ("." if path else "", "*" if step is JSON_PATH_WILDCARD else step)
+	return path
+
+def compile_json_path(json_path):
+	"""
+	DESCRIPTION: Returns the compiled form of a json path, compiling it the first time it is used
+	PARAMETERS: json_path (REQ, str) - The json path, see parse_json_path
+	RETURNS: JsonPath - The compiled path
+	"""
+	if isinstance(json_path, JsonPath):
+		return json_path
+	compiled_path = JSON_PATHS.get(json_path)
+	if compiled_path is None:
+		compiled_path = JsonPath(json_path)
+		#NOTE: Paths normally come from code, so this only fills up if they are built from data
+		if len(JSON_PATHS) >= JSON_PATH_CACHE_SIZE:
+			JSON_PATHS.clear()
+		JSON_PATHS[json_path] = compiled_path
+	return compiled_path
+
+def read_json_path_step(values, step):
+	"""
+	DESCRIPTION: Follows one step of a json path from each of a list of values. Values that do not have the key or
+				 index are skipped.
+	PARAMETERS: values (REQ, list) - The values reached by the previous steps
+				step (REQ, obj) - The key, index or JSON_PATH_WILDCARD to follow
+	RETURNS: list - The values reached by the step
+	"""
+	next_values = []
+	for value in values:
+		if step is JSON_PATH_WILDCARD:
+			if hasattr(value, 'keys'):
+				next_values.extend(value[key] for key in value.keys())
+			elif isinstance(value, (list, tuple)):
+				next_values.extend(value)
+			continue
+		try:
+			next_values.append(value[step])
+		except (KeyError, IndexError, TypeError):
+			pass
+	return next_values
+
 def read_json_path(json_object, json_path):
 	"""
 	DESCRIPTION: Follows a JSON path to find the needed element. Will also handle a path relating to a list.
 					Returns a value based on the path.
-	PARAMETERS: path (REQ, str) - a path to the needed value. Can contain . and [].
-	RETURNS: obj - The value of the path
+	PARAMETERS: json_object (REQ, obj) - The dictionary or list to read from
+				json_path (REQ, str) - a path to the needed value. Can contain ., [] with positive or negative indexes,
+									   and * to match every element.
+	RETURNS: obj - The value of the path, or a list of every matching value if the path contains a *
 	"""
-	json_path = json_path.split(".")
-	current_path = json_path[0]
-
-	value = json_object
-	try:
-		for item in json_path:
-			current_path += ".%s" % item
-			if "[" in item:
-				# NOTE: Get the number at the end of the path and use it to get the element
-				index = int((item[item.find("[")+1]))
-				item = item[:item.find("[")]
+	return compile_json_path(json_path).read(json_object)
 
-				# NOTE: Add the most recent index item into the array path
-				current_path += "[%s]" % index
+def read_json_paths(json_object, json_paths, default=JSON_PATH_REQUIRED):
+	"""
+	DESCRIPTION: Reads many json paths from one object in a single pass, following the keys they share only once
+	PARAMETERS: json_object (REQ, obj) - The dictionary or list to read from
+				json_paths (REQ, list) - The json paths to read, see read_json_path
+				default (OPT, obj) - The value for a path that is not found. If not given, a missing path raises.
+	RETURNS: dict - The value of each path, by path
+	"""
+	# NOTE: Paths are merged into a tree of steps, each node holds its children and the paths that end there
+	root = ({}, [])
+	for json_path in json_paths:
+		compiled_path = compile_json_path(json_path)
+		node = root
+		for step in compiled_path.steps:
+			node = node[0].setdefault(step, ({}, []))
+		node[1].append(compiled_path)
 
-				value = value[item][index]
+	results = {}
+	pending = [(root, [json_object])]
+	while pending:
+		(children, compiled_paths), values = pending.pop()
+		for compiled_path in compiled_paths:
+			if compiled_path.has_wildcard:
+				results[compiled_path.path] = values
+			elif values:
+				results[compiled_path.path] = values[0]
+			elif default is JSON_PATH_REQUIRED:
+				raise JsonPathException("Failed to read json path %s" % compiled_path.path)
 			else:
-				value = value[item]
+				results[compiled_path.path] = default
+		for step, child in children.items():
+			pending.append((child, read_json_path_step(values, step)))
+	return results
 
-		return value
-	except Exception as exception:
-			# NOTE: We may be compiling something that we know isnt present sometimes, lets make this null if it isnt
-		raise JsonPathException("Failed to read json path for object %s element %s : %s -  EXCEPTION:%s" %
-																	(json_path, current_path, value, exception))
 def is_valid_json(data):
 	"""
 	DESCRIPTION: Checks to see if a string is valid JSON
@@ -201,6 +1412,9 @@ def get_function_qualified_path(func):
 	Example output: General.Files.get_function_qualified_path
 	RETURNS: str - The fully qualified path of the function
 	"""
+	# NOTE: Decorators like cached record the path of the function they wrap
+	if hasattr(func, 'qualified_path'):
+		return func.qualified_path
 	mqpath = func.func_code.co_filename.split(':', 1)[1].rsplit('>', 1)[0]
 	if hasattr(func, 'im_self'):
 		mqpath += '.' + func.im_self.__name__
@@ -220,18 +1434,45 @@ def is_valid_variable_name(name):
 	except (SyntaxError, ValueError, TypeError):
 		return False
 	
-def sort_list_by_alpha_numeric(the_list, key='label'):
+def get_natural_sort_key(value):
 	"""
-	DESCRIPTION: Sorts a list alphabetically
+	DESCRIPTION: Builds the key that sorts a string naturally, comparing each run of digits as a number,
+				 so "Pump 2" sorts before "Pump 10" and "Line 1 Pump 10" after "Line 1 Pump 9"
+	PARAMETERS: value (REQ, str) - The value to build the key for, None sorts as an empty string
+	RETURNS: tuple - The text and number segments of the value, always starting with text
+	"""
+	if value is None:
+		value = ""
+	elif not isinstance(value, basestring):
+		value = unicode(value)
+	segments = NATURAL_SORT_PATTERN.split(value)
+	# NOTE: split puts the numbers at the odd positions, so a number is only ever compared to a number
+	segments[1::2] = [int(segment) for segment in segments[1::2]]
+	return tuple(segments)
+
+def sort_list_by_alpha_numeric(the_list, key='label', top_k=None):
+	"""
+	DESCRIPTION: Sorts a list alphabetically, comparing numbers inside the values by their value
 	PARAMETERS: the_list (REQ, list): the list to be converted
+				key (OPT, str): the key to sort a list of dictionaries by
+				top_k (OPT, int): If set, only the first top_k values of the sorted list are returned,
+								  which is faster than sorting the whole list
 	RETURNS: list - The sorted list
 	"""
-	LOGGER.trace("sort_list_by_alpha_numeric(the_list=%s)" % (the_list))
-	try:
-		return sorted(the_list, key=lambda val: (re.sub(r'\d+', "", val), int(re.sub(r'\D+', "", val) or 0)))
-	except TypeError:
-		return sorted(the_list, key=lambda val: (re.sub(r'\d+', "", val.get(key)), 
-						int(re.sub(r'\D+', "", val.get(key)) or 0)))
+	if LOGGER.isTraceEnabled():
+		LOGGER.trace("sort_list_by_alpha_numeric(the_list=%d items, key=%s, top_k=%s)" % (len(the_list), key, top_k))
+	if not the_list:
+		return []
+
+	# NOTE: The key of each value is built once, and the values are sorted by their keys
+	if hasattr(the_list[0], 'get'):
+		sort_key = lambda val: get_natural_sort_key(val.get(key))
+	else:
+		sort_key = get_natural_sort_key
+
+	if top_k is not None:
+		return heapq.nsmallest(top_k, the_list, key=sort_key)
+	return sorted(the_list, key=sort_key)
 
 def round_to_next_hour(datetime):
 	"""
@@ -264,7 +1505,8 @@ def get_from_path(obj, path):
 
 def combine_objects(base_dict, dict_to_merge, prepend_list=False):
 	""" 
-	DESCRIPTION: This method takes 2 objects and returns a combined object without overwriting any of the keys or values
+	DESCRIPTION: This method takes 2 objects and returns a combined object without overwriting any of the keys or values.
+				 The base object is changed in place, use merge_objects to leave both objects unchanged.
 	PARAMETERS: dct (REQ, dictionary) -  dict onto which the merge is executed
 				merge_dct (REQ, dictionary) - dct merged into dct
 				prepend_list (OPT, boolean) - if true, the merge_dct is prepended to the base_dict
@@ -283,6 +1525,241 @@ def combine_objects(base_dict, dict_to_merge, prepend_list=False):
 			base_dict[k] = dict_to_merge[k]
 	return base_dict
 
+def get_cache_registry():
+	"""
+	DESCRIPTION: Returns the store of cached function results for this project. A store left by an earlier
+				 initialization of this script is replaced by an empty one, and code from an earlier initialization
+				 uses the newer store, so the two never replace each other back and forth.
+	RETURNS: dict - The generation that created the store, and the cache of each function by function path
+	"""
+	registry = IGNITION_GLOBALS.get(CACHE_KEY)
+	if registry is not None and registry.get('generation', 0) >= CACHE_GENERATION:
+		return registry
+
+	with CACHE_LOCK:
+		registry = IGNITION_GLOBALS.get(CACHE_KEY)
+		if registry is None or registry.get('generation', 0) < CACHE_GENERATION:
+			registry = IGNITION_GLOBALS[CACHE_KEY] = {'generation': CACHE_GENERATION, 'functions': {}}
+		return registry
+
+def get_function_cache(func_path):
+	"""
+	DESCRIPTION: Returns the cache of a function in the current store, creating it if needed
+	PARAMETERS: func_path (REQ, str) - The fully qualified path of the function
+	RETURNS: dict - The lock guarding the function's cache, its entries, and its hit, miss and eviction counts
+	"""
+	functions = get_cache_registry()['functions']
+	function_cache = functions.get(func_path)
+	if function_cache is not None:
+		return function_cache
+
+	with CACHE_LOCK:
+		function_cache = functions.get(func_path)
+		if function_cache is None:
+			function_cache = functions[func_path] = {
+				'lock': threading.Lock(), 'entries': collections.OrderedDict(), 'hits': 0, 'misses': 0, 'evictions': 0,
+				'ttl_seconds': None, 'max_entries': CACHE_MAX_ENTRIES
+			}
+		return function_cache
+
+def cached(ttl_seconds=300, max_entries=CACHE_MAX_ENTRIES, copy=True):
+	"""
+	DESCRIPTION: This decorator function stores the results of the wrapped function in the globals, by its arguments.
+				 Later calls with the same arguments return the stored result until it expires. Results are cleared
+				 when the project is saved, and put below execute_on_gateway, clients share the cache of the gateway.
+				 Calls that raise, or have arguments that can not be JSON encoded, are not cached.
+	PARAMETERS: ttl_seconds (OPT, int) - How long a result is kept, None to keep it until it is evicted or invalidated
+				max_entries (OPT, int) - The number of results kept, the least recently used is evicted first
+				copy (OPT, bool) - If true, each caller gets a deep copy of the result, so changing it does not change
+								   the cached result. Set it to false for results that can not be copied, like Java
+								   objects, or that callers never change.
+	RETURNS: func - The wrapped function
+
+	Example:
+		@General.Utilities.execute_on_gateway()
+		@General.Utilities.cached(ttl_seconds=60)
+		def get_recipe(recipe_name):
+			...
+	"""
+	def wrapper(func):
+		"""
+		DESCRIPTION: Initialize wrapper function
+		"""
+		func_path = get_function_qualified_path(func)
+		function_cache = get_function_cache(func_path)
+		with function_cache['lock']:
+			function_cache['ttl_seconds'] = ttl_seconds
+			function_cache['max_entries'] = max_entries
+		entries = function_cache['entries']
+		lock = function_cache['lock']
+
+		def cached_wrapper(*args, **kwargs):
+			"""
+			DESCRIPTION: This is the wrapper function that will be returned
+			"""
+			call_key = get_call_key(func_path, args, kwargs)
+			if call_key is None:
+				return func(*args, **kwargs)
+			key = "%s:%s" % (func_path, hashlib.sha1(call_key).hexdigest())
+
+			now = time.time()
+			with lock:
+				entry = entries.pop(key, None)
+				if entry is not None and (entry[0] is None or entry[0] > now):
+					#NOTE: Putting the entry back moves it to the end, as the most recently used
+					entries[key] = entry
+					function_cache['hits'] += 1
+					return deepcopy(entry[1]) if copy else entry[1]
+				function_cache['misses'] += 1
+
+			value = func(*args, **kwargs)
+			with lock:
+				entries[key] = (now + ttl_seconds if ttl_seconds is not None else None, value)
+				while len(entries) > max_entries:
+					entries.popitem(last=False)
+					function_cache['evictions'] += 1
+			return deepcopy(value) if copy else value
+
+		# NOTE: Lets execute_on_gateway find the path of the wrapped function, not this wrapper
+		cached_wrapper.qualified_path = func_path
+		#wrapper
+		return cached_wrapper
+	#cached
+	return wrapper
+
+def invalidate_cache(prefix=""):
+	"""
+	DESCRIPTION: Removes cached results whose key starts with a prefix. Keys are the function path, a colon
+				 and a hash of the arguments, so a function path or a package path removes all of their results.
+	PARAMETERS: prefix (OPT, str) - The start of the keys to remove, every result if not given
+	RETURNS: int - The number of results removed
+	"""
+	removed = 0
+	for function_cache in list(get_cache_registry()['functions'].values()):
+		with function_cache['lock']:
+			for key in [key for key in function_cache['entries'] if key.startswith(prefix)]:
+				del function_cache['entries'][key]
+				removed += 1
+	return removed
+
+def get_cache_status():
+	"""
+	DESCRIPTION: Reports how well the results of each cached function are being reused
+	RETURNS: list - A dictionary per function, with its size, settings, and hit, miss and eviction counts
+	"""
+	functions = get_cache_registry()['functions']
+	status = []
+	for func_path in sorted(functions.keys()):
+		function_cache = functions[func_path]
+		with function_cache['lock']:
+			lookups = function_cache['hits'] + function_cache['misses']
+			status.append({
+				'func_path': func_path,
+				'size': len(function_cache['entries']),
+				'max_entries': function_cache['max_entries'],
+				'ttl_seconds': function_cache['ttl_seconds'],
+				'hits': function_cache['hits'],
+				'misses': function_cache['misses'],
+				'evictions': function_cache['evictions'],
+				'hit_ratio': float(function_cache['hits']) / lookups if lookups else 0.0
+			})
+	return status
+
+def merge_lists(base_list, list_to_merge, strategy):
+	"""
+	DESCRIPTION: Combines two lists without changing either of them
+	PARAMETERS: base_list (REQ, list) - The list being merged onto
+				list_to_merge (REQ, list) - The list being merged in
+				strategy (REQ, str) - LIST_APPEND, LIST_PREPEND, LIST_REPLACE or LIST_UNION, which appends only the
+									  values that are not in the base list yet
+	RETURNS: list - The combined list, which is one of the inputs if the other adds nothing
+	"""
+	if strategy == LIST_REPLACE or not base_list:
+		return list_to_merge
+	if not list_to_merge:
+		return base_list
+	if strategy == LIST_PREPEND:
+		return list_to_merge + base_list
+	if strategy == LIST_UNION:
+		try:
+			seen = set(base_list)
+			new_values = [value for value in list_to_merge if value not in seen and not seen.add(value)]
+		except TypeError:
+			#NOTE: Lists of dictionaries can not be hashed, so they are compared one by one
+			new_values = []
+			for value in list_to_merge:
+				if value not in base_list and value not in new_values:
+					new_values.append(value)
+		return base_list + new_values if new_values else base_list
+	if strategy == LIST_APPEND:
+		return base_list + list_to_merge
+	raise ValueError("Unknown list strategy %s" % strategy)
+
+def merge_objects(base_dict, dict_to_merge, list_strategies=None, list_strategy=LIST_APPEND, use_cache=False):
+	"""
+	DESCRIPTION: Combines two objects into a new object, without changing either of them. Anything the merge does not
+				 change is shared with the inputs instead of copied, so the result and inputs must be treated as
+				 read only. This makes layering overrides onto a large cached config cheap.
+	PARAMETERS: base_dict (REQ, dict) - The object being merged onto
+				dict_to_merge (REQ, dict) - The object whose values are merged in, and win over the base values
+				list_strategies (OPT, dict) - The list strategy for specific keys, by dotted key path like
+											  "apps.sap.hosts" or by key name
+				list_strategy (OPT, str) - The list strategy for every other key, see merge_lists
+				use_cache (OPT, bool) - If true, merging the same two objects again returns the previous result.
+										Only use this for inputs that are never changed, like cached configs.
+	RETURNS: dict - The combined object
+	"""
+	list_strategies = list_strategies or {}
+	if not use_cache:
+		return merge_mappings(base_dict, dict_to_merge, "", list_strategies, list_strategy)
+
+	strategies_key = (tuple(sorted(list_strategies.items())), list_strategy)
+	cache_key = (id(base_dict), id(dict_to_merge), strategies_key)
+	with MERGE_RESULTS_LOCK:
+		entry = MERGE_RESULTS.get(cache_key)
+	#NOTE: The cache holds on to both inputs, so their ids can not be reused by other objects while cached
+	if entry is not None and entry[0] is base_dict and entry[1] is dict_to_merge:
+		return entry[2]
+
+	merged = merge_mappings(base_dict, dict_to_merge, "", list_strategies, list_strategy)
+	with MERGE_RESULTS_LOCK:
+		MERGE_RESULTS[cache_key] = (base_dict, dict_to_merge, merged)
+		while len(MERGE_RESULTS) > MERGE_RESULTS_SIZE:
+			MERGE_RESULTS.popitem(last=False)
+	return merged
+
+def merge_mappings(base_dict, dict_to_merge, path, list_strategies, list_strategy):
+	"""
+	DESCRIPTION: Merges one level of merge_objects, copying the base only if a value changes
+	PARAMETERS: base_dict (REQ, dict) - The object being merged onto
+				dict_to_merge (REQ, dict) - The object whose values are merged in
+				path (REQ, str) - The dotted key path of this level, empty at the top
+				list_strategies (REQ, dict) - The list strategy for specific keys
+				list_strategy (REQ, str) - The list strategy for every other key
+	RETURNS: dict - The merged object, which is base_dict itself if nothing changed
+	"""
+	merged = None
+	for k in dict_to_merge.keys():
+		value = dict_to_merge[k]
+		key_path = "%s.%s" % (path, k) if path else k
+		if k not in base_dict:
+			merged_value = value
+		else:
+			base_value = base_dict[k]
+			if isinstance(base_value, collections.Mapping) and isinstance(value, collections.Mapping):
+				merged_value = merge_mappings(base_value, value, key_path, list_strategies, list_strategy)
+			elif isinstance(base_value, list) and isinstance(value, list):
+				strategy = list_strategies.get(key_path, list_strategies.get(k, list_strategy))
+				merged_value = merge_lists(base_value, value, strategy)
+			else:
+				merged_value = value
+			if merged_value is base_value:
+				continue
+		if merged is None:
+			merged = dict(base_dict)
+		merged[k] = merged_value
+	return base_dict if merged is None else merged
+
 def get_millis_time():
 	"""
 	DESCRIPTION: Returns the current time in milliseconds
@@ -343,6 +1820,51 @@ def get_environment_variable(name):
 	"""
 	return os.environ.get(name)
 	
+def get_translation_cache():
+	"""
+	DESCRIPTION: Returns the cached translations, emptying them first if the translation revision has moved on since
+				 they were cached, or they are older than TRANSLATION_CACHE_SECONDS
+	RETURNS: dict - The translated strings by (string, locale)
+	"""
+	revision = TRANSLATION_REVISION.get()
+	if (TRANSLATION_CACHE['revision'] != revision
+			or time.time() - TRANSLATION_CACHE['loaded_at'] > TRANSLATION_CACHE_SECONDS):
+		with TRANSLATION_CACHE_LOCK:
+			if (TRANSLATION_CACHE['revision'] != revision
+					or time.time() - TRANSLATION_CACHE['loaded_at'] > TRANSLATION_CACHE_SECONDS):
+				TRANSLATION_CACHE['entries'] = {}
+				TRANSLATION_CACHE['revision'] = revision
+				TRANSLATION_CACHE['loaded_at'] = time.time()
+	return TRANSLATION_CACHE['entries']
+
+def invalidate_translation_cache():
+	"""
+	DESCRIPTION: Moves the translation revision on, so every project in this gateway or client empties its cached
+				 translations the next time it translates. Call this after changing the translation bundle to see
+				 the changes straight away.
+	"""
+	TRANSLATION_REVISION.incrementAndGet()
+
+def translate(text, locale, translations=None):
+	"""
+	DESCRIPTION: Translates a string, reusing the cached translation if it has already been translated
+	PARAMETERS: text (REQ, str) - The string to translate
+				locale (REQ, str) - The locale to translate the string to
+				translations (OPT, dict) - The cache to use, from get_translation_cache
+	RETURNS: str - The translated string
+	"""
+	if translations is None:
+		translations = get_translation_cache()
+	key = (text, locale)
+	translated = translations.get(key)
+	if translated is None:
+		translated = system.util.translate(text, locale)
+		#NOTE: Strings built from data could fill the cache, so it is emptied once it is full
+		if len(translations) >= TRANSLATION_CACHE_SIZE:
+			translations.clear()
+		translations[key] = translated
+	return translated
+
 def localize_object(obj, locale):
 	"""
 	DESCRIPTION: Converts properties from the view into a dictionary, if possible and translates
@@ -350,23 +1872,37 @@ def localize_object(obj, locale):
 				locale (REQ, string): The locale to which the object has to be translated
 	RETURNS: dict (dict): The dictionary of the properties with translated values
 	"""
-	if obj is None:
-		return None
+	translations = get_translation_cache()
+	# NOTE: The tree is walked with a stack instead of recursion, so deep objects can not overflow it.
+	# NOTE: Each entry is a value, and the container and key its localized value is stored at
+	root = [None]
+	pending = [(obj, root, 0)]
+	while pending:
+		value, parent, key = pending.pop()
+		if value is None:
+			parent[key] = None
+			continue
 
-	# NOTE: If this is a basic qualified value, and not a dictionary with the key 'value', 
-	# then replace the object with its value
-	if hasattr(obj, 'value') and not hasattr(obj, 'keys'):
-		obj = obj.value
+		# NOTE: If this is a basic qualified value, and not a dictionary with the key 'value', 
+		# then replace the object with its value
+		if hasattr(value, 'value') and not hasattr(value, 'keys'):
+			value = value.value
 
-	# NOTE: Then check for any kind of dictionary or list
-	if hasattr(obj, '__iter__'):
-		if hasattr(obj, 'keys'):
-			return dict((k, localize_object(obj[k], locale)) for k in obj.keys())
+		# NOTE: Then check for any kind of dictionary or list
+		if hasattr(value, '__iter__'):
+			if hasattr(value, 'keys'):
+				localized = {}
+				pending.extend((value[k], localized, k) for k in value.keys())
+			else:
+				items = list(value)
+				localized = [None] * len(items)
+				pending.extend((item, localized, index) for index, item in enumerate(items))
+			parent[key] = localized
+		elif isinstance(value, (str, unicode)):
+			# NOTE: Repeated strings, like the labels of every table row, are only translated once
+			parent[key] = translate(value, locale, translations)
 		else:
-			return list(localize_object(x, locale) for x in obj)
-	else:
-		# anything else
-		if isinstance(obj, (str, unicode)):
-			obj = system.util.translate(obj, locale)
-		
-		return obj
+			# anything else
+			parent[key] = value
+
+	return root[0]
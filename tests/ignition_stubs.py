@@ -0,0 +1,383 @@
+"""
+DESCRIPTION: Stand-ins for the Java and Ignition classes the project library imports, so its scripts can be loaded
+			and run by the tests outside of Ignition. Works on Python 2.7, like the gateway's Jython, and Python 3.
+"""
+
+import collections
+import os
+import sys
+import threading
+import time
+import types
+
+SCRIPT_PYTHON_PATH = os.path.abspath(os.path.join(os.path.abspath(__file__), os.pardir, os.pardir, "projects",
+													"gateway-utilities", "ignition", "script-python"))
+
+
+class Namespace(object):
+	"""
+	DESCRIPTION: An object that holds the attributes it is created with
+	"""
+
+	def __init__(self, **attributes):
+		self.__dict__.update(attributes)
+
+
+class StubLogger(object):
+	"""
+	DESCRIPTION: Stands in for the logger returned by system.util.getLogger
+	"""
+
+	def __getattr__(self, name):
+		return lambda *args, **kwargs: None
+
+
+class JavaException(Exception):
+	"""
+	DESCRIPTION: Stands in for java.lang.Exception
+	"""
+
+	def __init__(self, message=None, cause=None):
+		Exception.__init__(self, message)
+		self.cause = cause
+
+	def getCause(self): # pylint: disable=invalid-name
+		"""
+		DESCRIPTION: Returns the exception that caused this one
+		"""
+		return self.cause
+
+	def getClass(self): # pylint: disable=invalid-name
+		"""
+		DESCRIPTION: Returns the class of the exception
+		"""
+		return JavaClass(type(self))
+
+
+class JavaClass(object):
+	"""
+	DESCRIPTION: Stands in for java.lang.Class, for the stand-in exception classes
+	"""
+
+	def __init__(self, python_class):
+		self.python_class = python_class
+
+	def getName(self): # pylint: disable=invalid-name
+		"""
+		DESCRIPTION: Returns the name of the class
+		"""
+		return getattr(self.python_class, 'java_name', self.python_class.__name__)
+
+	def getSuperclass(self): # pylint: disable=invalid-name
+		"""
+		DESCRIPTION: Returns the parent class, or None past java.lang.Exception
+		"""
+		if self.python_class is JavaException:
+			return None
+		return JavaClass(self.python_class.__bases__[0])
+
+
+class TimeoutException(JavaException):
+	"""
+	DESCRIPTION: Stands in for java.util.concurrent.TimeoutException
+	"""
+	java_name = "java.util.concurrent.TimeoutException"
+
+
+class IOException(JavaException):
+	"""
+	DESCRIPTION: Stands in for java.io.IOException
+	"""
+	java_name = "java.io.IOException"
+
+
+class AtomicLong(object):
+	"""
+	DESCRIPTION: Stands in for java.util.concurrent.atomic.AtomicLong
+	"""
+
+	def __init__(self, value=0):
+		self.value = value
+		self.lock = threading.Lock()
+
+	def get(self):
+		"""
+		DESCRIPTION: Returns the value
+		"""
+		return self.value
+
+	def incrementAndGet(self): # pylint: disable=invalid-name
+		"""
+		DESCRIPTION: Adds one to the value
+		"""
+		return self.addAndGet(1)
+
+	def addAndGet(self, delta): # pylint: disable=invalid-name
+		"""
+		DESCRIPTION: Adds to the value
+		"""
+		with self.lock:
+			self.value += delta
+			return self.value
+
+	def decrementAndGet(self): # pylint: disable=invalid-name
+		"""
+		DESCRIPTION: Takes one from the value
+		"""
+		return self.addAndGet(-1)
+
+	def compareAndSet(self, expected, value): # pylint: disable=invalid-name
+		"""
+		DESCRIPTION: Sets the value if it is the expected one
+		"""
+		with self.lock:
+			if self.value != expected:
+				return False
+			self.value = value
+			return True
+
+
+class InterruptedException(JavaException):
+	"""
+	DESCRIPTION: Stands in for java.lang.InterruptedException
+	"""
+	java_name = "java.lang.InterruptedException"
+
+
+class ArrayBlockingQueue(object):
+	"""
+	DESCRIPTION: Stands in for java.util.concurrent.ArrayBlockingQueue
+	"""
+
+	def __init__(self, capacity):
+		self.capacity = capacity
+		self.items = collections.deque()
+		self.condition = threading.Condition()
+
+	def put(self, item):
+		"""
+		DESCRIPTION: Adds an item, waiting for room
+		"""
+		self.offer(item, None, None)
+
+	def offer(self, item, timeout=0, unit=None):
+		"""
+		DESCRIPTION: Adds an item, waiting up to the timeout for room
+		RETURNS: bool - True if the item was added
+		"""
+		with self.condition:
+			deadline = None if unit is None else time.time() + timeout * unit
+			while len(self.items) >= self.capacity:
+				if deadline is not None and time.time() >= deadline:
+					return False
+				self.condition.wait(None if deadline is None else deadline - time.time())
+			self.items.append(item)
+			self.condition.notify_all()
+			return True
+
+	def take(self):
+		"""
+		DESCRIPTION: Removes the oldest item, waiting for one to be added
+		"""
+		with self.condition:
+			while not self.items:
+				self.condition.wait()
+			item = self.items.popleft()
+			self.condition.notify_all()
+			return item
+
+	def clear(self):
+		"""
+		DESCRIPTION: Removes every item
+		"""
+		with self.condition:
+			self.items.clear()
+			self.condition.notify_all()
+
+	def size(self):
+		"""
+		DESCRIPTION: Returns the number of items
+		"""
+		return len(self.items)
+
+
+class UninterruptibleExecutor(object):
+	"""
+	DESCRIPTION: Stands in for a java.util.concurrent.ExecutorService whose tasks never respond to being interrupted,
+				 like tasks busy in code that does not check for it
+	"""
+
+	def __init__(self):
+		self.threads = []
+		self.shutdown_requested = False
+
+	def execute(self, runnable):
+		"""
+		DESCRIPTION: Runs the runnable on a new thread
+		"""
+		thread = threading.Thread(target=runnable.run)
+		thread.daemon = True
+		thread.start()
+		self.threads.append(thread)
+
+	def shutdown(self):
+		"""
+		DESCRIPTION: Stops accepting tasks
+		"""
+		self.shutdown_requested = True
+
+	def shutdownNow(self): # pylint: disable=invalid-name
+		"""
+		DESCRIPTION: Stops accepting tasks, without interrupting the running ones
+		"""
+		self.shutdown_requested = True
+
+	def isShutdown(self): # pylint: disable=invalid-name
+		"""
+		DESCRIPTION: Checks whether the executor was shut down
+		"""
+		return self.shutdown_requested
+
+	def awaitTermination(self, timeout, unit): # pylint: disable=invalid-name
+		"""
+		DESCRIPTION: Waits up to the timeout for every task to finish
+		RETURNS: bool - True if every task finished
+		"""
+		deadline = time.time() + timeout * unit
+		for thread in self.threads:
+			thread.join(max(deadline - time.time(), 0))
+		return not any(thread.is_alive() for thread in self.threads)
+
+
+def java_class(name, base=object):
+	"""
+	DESCRIPTION: Creates a placeholder for a Java class the scripts only subclass or refer to
+	PARAMETERS: name (REQ, str) - The name of the class
+				base (OPT, type) - The class it extends
+	RETURNS: type - The placeholder class
+	"""
+	return type(name, (base,), {})
+
+
+class ApplicationScope(object):
+	"""
+	DESCRIPTION: Reports the scope each script is being loaded in
+	"""
+	scope = None
+
+	@staticmethod
+	def getGlobalScope(): # pylint: disable=invalid-name
+		"""
+		DESCRIPTION: Returns the scope being loaded
+		"""
+		return ApplicationScope.scope
+
+	@staticmethod
+	def isGateway(scope): # pylint: disable=invalid-name
+		"""
+		DESCRIPTION: Checks for the gateway scope
+		"""
+		return scope == "gateway"
+
+	@staticmethod
+	def isClient(scope): # pylint: disable=invalid-name
+		"""
+		DESCRIPTION: Checks for the client scope
+		"""
+		return scope == "client"
+
+	@staticmethod
+	def isDesigner(scope): # pylint: disable=invalid-name
+		"""
+		DESCRIPTION: Checks for the designer scope
+		"""
+		return scope == "designer"
+
+
+def install_module(name, **attributes):
+	"""
+	DESCRIPTION: Adds a module to sys.modules, along with its parent packages
+	PARAMETERS: name (REQ, str) - The dotted name of the module
+				attributes (OPT, dict) - The names the module holds
+	RETURNS: module - The module
+	"""
+	parent = None
+	for depth in range(1, name.count(".") + 2):
+		package_name = ".".join(name.split(".")[:depth])
+		package = sys.modules.get(package_name)
+		if package is None:
+			package = sys.modules[package_name] = types.ModuleType(package_name)
+		if parent is not None:
+			setattr(parent, package_name.split(".")[-1], package)
+		parent = package
+	for attribute_name, value in attributes.items():
+		setattr(parent, attribute_name, value)
+	return parent
+
+
+def install_java_stubs():
+	"""
+	DESCRIPTION: Adds the Java and Ignition classes the project library imports to sys.modules
+	"""
+	java_system = Namespace(nanoTime=lambda: int(time.time() * 1e9), currentTimeMillis=lambda: int(time.time() * 1000))
+	thread = java_class("Thread")
+	thread.UncaughtExceptionHandler = java_class("UncaughtExceptionHandler")
+	install_module("java.lang", Exception=JavaException, System=java_system, Thread=thread,
+					Runnable=java_class("Runnable"), InterruptedException=InterruptedException,
+					Runtime=Namespace(getRuntime=lambda: Namespace(availableProcessors=lambda: 2)),
+					Integer=Namespace(MAX_VALUE=2 ** 31 - 1), Math=java_class("Math"))
+	#NOTE: Scripts that import java.lang.Exception as a module get the class itself
+	sys.modules["java.lang.Exception"] = JavaException
+	sys.modules["java.lang.System"] = java_system
+	install_module("java.io", IOException=IOException)
+	fork_join_pool = java_class("ForkJoinPool")
+	fork_join_pool.ForkJoinWorkerThreadFactory = java_class("ForkJoinWorkerThreadFactory")
+	install_module("java.util.concurrent", TimeoutException=TimeoutException, ArrayBlockingQueue=ArrayBlockingQueue,
+					Executors=Namespace(newFixedThreadPool=lambda count, factory: UninterruptibleExecutor()),
+					TimeUnit=Namespace(MILLISECONDS=0.001, SECONDS=1), ForkJoinPool=fork_join_pool,
+					ExecutionException=java_class("ExecutionException", JavaException),
+					CancellationException=java_class("CancellationException", JavaException),
+					RejectedExecutionException=java_class("RejectedExecutionException", JavaException),
+					**dict((name, java_class(name)) for name in [
+						"ThreadFactory", "ThreadPoolExecutor", "LinkedBlockingQueue", "ConcurrentHashMap",
+						"ExecutorCompletionService", "FutureTask", "ScheduledThreadPoolExecutor", "Semaphore",
+						"ForkJoinTask", "RecursiveTask"]))
+	install_module("java.util.concurrent.atomic", AtomicLong=AtomicLong, AtomicInteger=AtomicLong,
+					AtomicLongArray=java_class("AtomicLongArray"))
+	install_module("com.inductiveautomation.ignition.common.model", ApplicationScope=ApplicationScope)
+	install_module("com.inductiveautomation.ignition.common.script",
+					ScriptContext=Namespace(setDescription=lambda description: None))
+	install_module("com.inductiveautomation.ignition.common.execution",
+					TPC=Namespace(newThreadFactory=lambda name, system_name: None))
+
+
+def build_system(**functions):
+	"""
+	DESCRIPTION: Builds a stand-in for the system functions of one scope, with its own globals
+	PARAMETERS: functions (OPT, dict) - Extra system.util functions, like sendRequest
+	RETURNS: Namespace - The system object
+	"""
+	ignition_globals = {}
+	util = Namespace(getLogger=lambda name: StubLogger(), getGlobals=lambda: ignition_globals,
+						getProjectName=lambda: "gateway-utilities")
+	util.__dict__.update(functions)
+	tag = Namespace(readBlocking=lambda paths: [Namespace(value="test-gateway")])
+	return Namespace(util=util, tag=tag)
+
+
+def load_script(script_path, scope, stub_system):
+	"""
+	DESCRIPTION: Loads a project library script as it would run in a scope
+	PARAMETERS: script_path (REQ, str) - The path of the script, like "General/Utilities"
+				scope (REQ, str) - "gateway" or "client"
+				stub_system (REQ, Namespace) - The system functions for that scope, see build_system
+	RETURNS: module - The loaded script
+	"""
+	install_java_stubs()
+	ApplicationScope.scope = scope
+	code_path = os.path.join(SCRIPT_PYTHON_PATH, *(script_path.split("/") + ["code.py"]))
+	module = types.ModuleType("%s_%s" % (script_path.replace("/", "_"), scope))
+	module.system = stub_system
+	with open(code_path) as code_file:
+		exec(compile(code_file.read(), code_path, "exec"), module.__dict__) # pylint: disable=exec-used
+	return module
@@ -0,0 +1,307 @@
+"""
+DESCRIPTION: Checks that calls made through General.Utilities.execute_on_gateway run through the executeInGatewayScope
+			message handler shipped with the project, including batched, async and single-flight calls
+"""
+
+import copy
+import gzip
+import io
+import os
+import struct
+import sys
+import threading
+
+import pytest
+
+from ignition_stubs import Namespace, build_system, load_script
+
+EVENT_SCRIPTS_PATH = os.path.abspath(os.path.join(os.path.abspath(__file__), os.pardir, os.pardir, "projects",
+													"gateway-utilities", "ignition", "event-scripts", "data.bin"))
+
+
+class StubRequest(object):
+	"""
+	DESCRIPTION: Stands in for the request returned by system.util.sendRequestAsync
+	"""
+
+	def cancel(self):
+		"""
+		DESCRIPTION: The request has already completed, so there is nothing to cancel
+		"""
+
+
+def read_message_handler_script():
+	"""
+	DESCRIPTION: Reads the source of the message handler out of the serialized event scripts resource
+	RETURNS: str - The source of the handleMessage function
+	"""
+	with open(EVENT_SCRIPTS_PATH, "rb") as data_file:
+		data = gzip.GzipFile(fileobj=io.BytesIO(data_file.read())).read()
+
+	#NOTE: Strings in the resource are stored after a 3 byte length
+	start = data.find(b"def handleMessage")
+	if start < 0:
+		pytest.fail("No message handler found in %s" % EVENT_SCRIPTS_PATH)
+	length = struct.unpack(">I", b"\x00" + data[start - 3:start])[0]
+	return data[start:start + length].decode("utf-8")
+
+
+def build_remote_script(utilities):
+	"""
+	DESCRIPTION: Defines the project script the client calls into, decorated by a copy of General.Utilities
+	PARAMETERS: utilities (REQ, module) - The copy of General.Utilities for the scope
+	RETURNS: Namespace - The script, with the same function paths in every scope
+	"""
+	@utilities.execute_on_gateway(func_path="Remote.add")
+	def add(first, second):
+		return first + second
+
+	@utilities.execute_on_gateway(func_path="Remote.fail")
+	def fail():
+		raise ValueError("invalid input")
+
+	@utilities.execute_on_gateway(func_path="Remote.shared_add", single_flight=True)
+	def shared_add(first, second):
+		return first + second
+
+	@utilities.execute_on_gateway_async(func_path="Remote.add_async")
+	def add_async(first, second):
+		return first + second
+
+	@utilities.execute_on_gateway(func_path="Remote.add_coalesced", coalesce_millis=200)
+	def add_coalesced(first, second):
+		return first + second
+
+	@utilities.execute_on_gateways(func_path="Remote.add_everywhere")
+	def add_everywhere(first, second):
+		return first + second
+
+	@utilities.gather_on_gateways(func_path="Remote.add_gathered")
+	def add_gathered(first, second):
+		return first + second
+
+	return Namespace(add=add, fail=fail, shared_add=shared_add, add_async=add_async, add_coalesced=add_coalesced,
+						add_everywhere=add_everywhere, add_gathered=add_gathered)
+
+
+@pytest.fixture(name="scopes")
+def fixture_scopes():
+	"""
+	DESCRIPTION: Loads General.Utilities for a client and a gateway. The client's requests are sent through the
+				 message handler shipped in the event scripts resource, which runs against the gateway's copy.
+	RETURNS: Namespace - The client and gateway copies of General.Utilities and of the project script, and the
+						 requests the client sent
+	"""
+	handler_namespace = {}
+	exec(compile(read_message_handler_script(), "executeInGatewayScope", "exec"), handler_namespace) # pylint: disable=exec-used
+	requests = []
+
+	def send_request(project, message_type, payload, timeoutSec=None, remoteServer=None): # pylint: disable=invalid-name,unused-argument
+		assert message_type == "executeInGatewayScope"
+		requests.append(payload)
+		#NOTE: Requests are serialized, so the gateway never shares objects with the client
+		return copy.deepcopy(handler_namespace["handleMessage"](copy.deepcopy(payload)))
+
+	def send_request_async(project, message_type, payload, timeoutSec=None, remoteServer=None, # pylint: disable=invalid-name
+							onSuccess=None, onError=None): # pylint: disable=invalid-name
+		try:
+			response = send_request(project, message_type, payload, timeoutSec, remoteServer)
+		except Exception as e: # pylint: disable=broad-except
+			onError(e)
+		else:
+			onSuccess(response)
+		return StubRequest()
+
+	gateway = load_script("General/Utilities", "gateway", build_system())
+	client = load_script("General/Utilities", "client",
+							build_system(sendRequest=send_request, sendRequestAsync=send_request_async))
+	gateway_remote = build_remote_script(gateway)
+	#NOTE: The gateway resolves function paths against its own project scripts
+	gateway.Remote = gateway_remote
+	handler_namespace["General"] = Namespace(Utilities=gateway)
+	return Namespace(client=client, gateway=gateway, client_remote=build_remote_script(client),
+						gateway_remote=gateway_remote, requests=requests)
+
+
+def test_shipped_handler_calls_function_path():
+	"""
+	DESCRIPTION: Checks the handler exported from the Designer still calls the function path in 'func' with 'args'
+				 and 'kwargs', which is how requests reach receive_execute_on_gateway_message
+	"""
+	calls = []
+	handler_namespace = {"General": Namespace(Utilities=Namespace(
+		receive_execute_on_gateway_message=lambda payload: calls.append(payload) or "received"))}
+	exec(compile(read_message_handler_script(), "executeInGatewayScope", "exec"), handler_namespace) # pylint: disable=exec-used
+
+	message = {"func": "General.Utilities.receive_execute_on_gateway_message", "kwargs": {"payload": {"func": "a.b"}}}
+	assert handler_namespace["handleMessage"](message) == "received"
+	assert calls == [{"func": "a.b"}]
+
+
+def test_round_trip_call(scopes):
+	"""
+	DESCRIPTION: Checks that a client call runs on the gateway through the shipped handler
+	"""
+	assert scopes.client_remote.add(1, 2) == 3
+	assert scopes.gateway.get_gateway_function_status()[0]['func_path'] == "Remote.add"
+
+
+def test_round_trip_async_call_returns_value(scopes):
+	"""
+	DESCRIPTION: Checks that the gateway runs the function behind an async wrapper, so the client gets the value
+				 instead of a future created on the gateway
+	"""
+	future = scopes.client_remote.add_async(2, 3)
+	assert future.result(5) == 5
+	assert future.done()
+
+
+def test_round_trip_batch(scopes):
+	"""
+	DESCRIPTION: Checks that a batch is sent as one request, and one failing call does not fail the others
+	"""
+	with scopes.client.gateway_batch():
+		total = scopes.client_remote.add(1, 2)
+		failure = scopes.client_remote.fail()
+	assert total.result(5) == 3
+	with pytest.raises(scopes.client.GatewayBatchException):
+		failure.result(5)
+
+
+def test_batch_fails_every_call_when_responses_are_missing():
+	"""
+	DESCRIPTION: Checks that a batch response that does not have one result per call fails every call, instead of
+				 handing results to the wrong calls
+	"""
+	client = load_script("General/Utilities", "client", build_system(sendRequest=lambda *args, **kwargs: [{'result': 3}]))
+	remote = build_remote_script(client)
+
+	with pytest.raises(client.GatewayBatchException):
+		with client.gateway_batch():
+			total = remote.add(1, 2)
+			product = remote.add(2, 3)
+	for call_result in [total, product]:
+		with pytest.raises(client.GatewayBatchException):
+			call_result.result(0)
+
+
+def test_coalesced_calls_share_one_request(scopes):
+	"""
+	DESCRIPTION: Checks that calls made within the coalescing window are sent to the gateway in a single request
+	"""
+	results = []
+
+	def call(value):
+		results.append(scopes.client_remote.add_coalesced(value, 1))
+
+	threads = [threading.Thread(target=call, args=(value,)) for value in range(3)]
+	for thread in threads:
+		thread.start()
+	for thread in threads:
+		thread.join(5)
+
+	assert sorted(results) == [1, 2, 3]
+	assert len(scopes.requests) == 1
+
+
+def test_round_trip_on_gateways(scopes):
+	"""
+	DESCRIPTION: Checks that execute_on_gateways returns a list of results, and gather_on_gateways returns them by
+				 gateway name
+	"""
+	assert scopes.client_remote.add_everywhere(1, 2) == [3]
+	assert scopes.client_remote.add_gathered(1, 2) == {"test-gateway": 3}
+
+
+def test_gateway_scope_batch_returns_completed_results(scopes):
+	"""
+	DESCRIPTION: Checks that calls made inside a batch in the gateway scope return completed handles
+	"""
+	with scopes.gateway.gateway_batch():
+		total = scopes.gateway_remote.add(1, 2)
+	assert total.result(0) == 3
+
+
+def test_round_trip_single_flight(scopes):
+	"""
+	DESCRIPTION: Checks that a single-flight call runs through the shipped handler
+	"""
+	assert scopes.client_remote.shared_add(4, 5) == 9
+
+
+def test_single_flight_follower_times_out(scopes):
+	"""
+	DESCRIPTION: Checks that a call waiting on an identical running call gives up after its own timeout, while the
+				 running call still completes
+	"""
+	started = threading.Event()
+	release = threading.Event()
+
+	def wait_for_release(value):
+		started.set()
+		release.wait(5)
+		return value
+
+	client_wait = scopes.client.execute_on_gateway(func_path="Remote.wait_for_release", timeout_seconds=0.05,
+													single_flight=True)(wait_for_release)
+	scopes.gateway.Remote.wait_for_release = scopes.gateway.execute_on_gateway(
+		func_path="Remote.wait_for_release", single_flight=True)(wait_for_release)
+
+	results = []
+	leader = threading.Thread(target=lambda: results.append(client_wait(7)))
+	leader.start()
+	assert started.wait(5)
+	try:
+		#NOTE: The stand-in request passes the gateway's error straight back to the client
+		with pytest.raises(scopes.gateway.GatewayRequestException) as error:
+			client_wait(7)
+		assert "Timed out" in str(error.value)
+		assert "Remote.wait_for_release" in str(error.value)
+	finally:
+		release.set()
+		leader.join(5)
+	assert results == [7]
+
+
+def test_circuit_breaker_ignores_remote_function_errors():
+	"""
+	DESCRIPTION: Checks that only failures to reach a remote gateway count against its circuit breaker, including
+				 when they are wrapped in another error
+	"""
+	java_lang = sys.modules["java.lang"]
+	java_io = sys.modules["java.io"]
+	errors = []
+
+	def send_request(project, message_type, payload, timeoutSec=None, remoteServer=None): # pylint: disable=invalid-name,unused-argument
+		raise errors.pop(0)
+
+	utilities = load_script("General/Utilities", "client", build_system(sendRequest=send_request))
+
+	@utilities.execute_on_gateway(remote_server="site-b", func_path="Remote.add")
+	def add(first, second):
+		return first + second
+
+	def get_state():
+		return [status['state'] for status in utilities.get_circuit_breaker_status()]
+
+	utilities.configure_circuit_breaker("site-b", failure_threshold=2)
+	errors.extend([java_lang.Exception("Traceback (most recent call last):\nValueError: invalid input"),
+					java_lang.Exception("java.lang.ArithmeticException: / by zero"),
+					java_lang.Exception("java.lang.ArithmeticException: / by zero")])
+	for _ in range(3):
+		with pytest.raises(java_lang.Exception):
+			add(1, 2)
+	assert get_state() == ["closed"]
+
+	errors.extend([sys.modules["java.util.concurrent"].TimeoutException("No response from site-b"),
+					java_lang.Exception("Request failed", java_io.IOException("Connection refused"))])
+	for _ in range(2):
+		with pytest.raises(java_lang.Exception):
+			add(1, 2)
+	assert get_state() == ["open"]
+	with pytest.raises(utilities.GatewayCircuitOpenException):
+		add(1, 2)
+
+
+if __name__ == "__main__":
+	pytest.main(["-s", __file__])
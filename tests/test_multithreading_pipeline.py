@@ -0,0 +1,38 @@
+"""
+DESCRIPTION: Checks that a General.Multithreading Pipeline stops cleanly when one of its stages fails
+"""
+
+import time
+
+import pytest
+
+from ignition_stubs import build_system, load_script
+
+
+def test_pipeline_stops_when_middle_stage_raises():
+	"""
+	DESCRIPTION: Checks that a failure in a middle stage is raised from run, and the stages after it are told the
+				 stream ended, even when their workers are not interrupted
+	"""
+	multithreading = load_script("General/Multithreading", "gateway", build_system())
+
+	def transform(item):
+		if item == 2:
+			#NOTE: Gives the last stage time to write the first item and start waiting for the next one
+			time.sleep(0.2)
+			raise ValueError("invalid item")
+		return item
+
+	written = []
+	pipeline = multithreading.Pipeline("test-pipeline")
+	pipeline.add_stage(lambda item: item, name="read").add_stage(transform, name="transform")
+	pipeline.add_stage(written.append, name="write")
+
+	with pytest.raises(multithreading.MultiThreadedException) as error:
+		pipeline.run(range(1, 10), timeout_seconds=5)
+	assert [error_info['stage_name'] for error_info in error.value.exceptions] == ["transform"]
+	assert written == [1]
+
+
+if __name__ == "__main__":
+	pytest.main(["-s", __file__])